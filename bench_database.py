@@ -0,0 +1,108 @@
+# bench_database.py
+"""
+Микробенчмарк сохранения игр: сколько save_game в секунду
+
+Сравнивает прежнюю схему (новое соединение, SELECT COUNT, UPDATE/INSERT,
+построчная вставка игроков) с текущим GameDatabase (одно соединение,
+WAL, UPSERT, executemany).
+
+Запуск: python bench_database.py [сохранений] [игроков]
+"""
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, 'src', 'backend'))
+
+from src.backend.game import Game
+from src.backend.database import GameDatabase
+
+
+def legacy_save_game(db_path: str, game: Game):
+    """Прежняя реализация save_game (без отладочного вывода)"""
+    game_data = json.dumps(game.to_dict())
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COUNT(*) FROM games WHERE game_id = ?", (game.game_id,))
+    exists = cursor.fetchone()[0] > 0
+
+    if exists:
+        cursor.execute('''
+            UPDATE games
+            SET game_data = ?, updated_at = ?, is_active = ?
+            WHERE game_id = ?
+        ''', (game_data, datetime.now().isoformat(), 1, game.game_id))
+        cursor.execute("DELETE FROM game_players WHERE game_id = ?", (game.game_id,))
+    else:
+        cursor.execute('''
+            INSERT INTO games (game_id, creator_id, created_at, updated_at, game_data)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (game.game_id, game.creator_id, game.created_at.isoformat(),
+              datetime.now().isoformat(), game_data))
+
+    for player_id in game.players:
+        cursor.execute("INSERT INTO game_players (game_id, player_id) VALUES (?, ?)",
+                       (game.game_id, player_id))
+
+    conn.commit()
+    conn.close()
+
+
+def make_games(count: int, players: int):
+    """Тестовые игры"""
+    games = []
+    for i in range(count):
+        game = Game(f"G{i:05d}", 1000 + i)
+        for p in range(players):
+            game.add_player(i * 100 + p, f"user{p}", f"Игрок {p}")
+        games.append(game)
+    return games
+
+
+def run(label: str, save, games, saves: int) -> float:
+    """Выполнить saves сохранений по кругу и вернуть сохранений в секунду"""
+    # Отладочный вывод to_dict не должен попадать в отчет
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for i in range(saves):
+            save(games[i % len(games)])
+        elapsed = time.perf_counter() - started
+    rate = saves / elapsed
+    print(f"{label:<28}{rate:>10.0f} сохр/с   ({elapsed * 1000 / saves:.3f} мс на сохранение)")
+    return rate
+
+
+def main():
+    saves = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with contextlib.redirect_stdout(io.StringIO()):
+        games = make_games(50, players)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n💾 Сохранений: {saves}, игроков в игре: {players}")
+        print("=" * 70)
+
+        legacy_path = os.path.join(tmp, "legacy", "games.db")
+        GameDatabase(legacy_path).close()  # создаем схему
+        before = run("До (connect на запрос)", lambda g: legacy_save_game(legacy_path, g), games, saves)
+
+        db = GameDatabase(os.path.join(tmp, "pooled", "games.db"))
+        after = run("После (WAL + UPSERT)", db.save_game, games, saves)
+        db.close()
+
+        print("-" * 70)
+        print(f"Ускорение: x{after / before:.1f}")
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
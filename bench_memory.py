@@ -0,0 +1,98 @@
+# bench_memory.py
+"""
+Память на одну игру
+
+Создает много одинаковых игр на 2, 4 и 8 игроков и считает через
+tracemalloc, сколько байт занимает одна игра в трех состояниях:
+- лобби: игроки собраны, игра не начата;
+- начата: start_game, поле еще пустое;
+- в процессе: сыграно N ходов (все покупают), висит одно предложение обмена.
+
+По последней колонке видно, сколько одновременных игр помещается в воркер.
+
+Запуск: python bench_memory.py [игр на замер] [ходов]
+"""
+import contextlib
+import logging
+import os
+import random
+import sys
+import tracemalloc
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, 'src', 'backend'))
+
+from src.backend.game import Game
+
+PLAYER_COUNTS = (2, 4, 8)
+
+
+def make_lobby(index: int, players: int) -> Game:
+    game = Game(f"mem-{index}", 1)
+    for user_id in range(1, players + 1):
+        game.add_player(user_id, f"player{user_id}", f"Игрок {user_id}")
+    return game
+
+
+def make_started(index: int, players: int) -> Game:
+    game = make_lobby(index, players)
+    game.start_game()
+    return game
+
+
+def make_in_progress(index: int, players: int, turns: int) -> Game:
+    """Игра после turns ходов: все покупают, в тюрьме платят, одно предложение обмена"""
+    game = make_started(index, players)
+    game.event_log.enabled = False
+    rng = random.Random(index)
+    while game.state.value == "in_game" and game.turn_count < turns:
+        player = game.get_current_player()
+        if player.in_jail:
+            action = "jail_pay" if player.money >= 50 else "jail_skip"
+            result = game.perform_action(player.user_id, action)
+        elif game.pending_purchase:
+            result = game.perform_action(player.user_id, "buy")
+            if not result["success"]:
+                game.perform_action(player.user_id, "skip")
+        else:
+            game.perform_action(player.user_id, "roll", dice=(rng.randint(1, 6), rng.randint(1, 6)))
+
+    game.trade_manager.create_trade(1, 2, {"money": 100, "properties": []}, {"money": 0, "properties": []})
+    return game
+
+
+def bytes_per_game(factory, count: int) -> float:
+    """Средний прирост памяти на одну игру"""
+    factory(-1)  # прогрев: импорты и кэши модулей не должны попасть в замер
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    games = [factory(index) for index in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del games
+    return (after - before) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    logging.disable(logging.INFO)
+    print(f"\n🧠 Память на игру ({count} игр на замер, в процессе - {turns} ходов)")
+    print("=" * 70)
+    print(f"{'игроков':>8} {'лобби':>12} {'начата':>12} {'в процессе':>12} {'игр на 1 ГБ':>14}")
+
+    for players in PLAYER_COUNTS:
+        # Game печатает отладку сделок - в замер она не нужна
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            lobby = bytes_per_game(lambda index: make_lobby(index, players), count)
+            started = bytes_per_game(lambda index: make_started(index, players), count)
+            in_progress = bytes_per_game(lambda index: make_in_progress(index, players, turns), count)
+        print(f"{players:>8} {lobby:>10,.0f} Б {started:>10,.0f} Б {in_progress:>10,.0f} Б "
+              f"{2 ** 30 / in_progress:>14,.0f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# bench_owner_index.py
+"""
+Проверка индекса собственности Board против обхода поля
+
+Случайные последовательности операций над настоящей игрой: покупки, сделки
+через propose_trade/accept_trade, залог и выкуп, постройки, банкротства,
+сохранение и восстановление (Game.to_dict/from_dict, в том числе старый
+формат без "board"). После каждой операции get_owner_assets() для всех
+игроков сравнивается с scan_owner_assets(), проверки монополии - с
+проверкой по всем клеткам группы, а analyze_building() - с проверками
+can_build_house/can_build_hotel/can_sell_house по каждой клетке.
+
+В конце - замер get_owner_assets и ренты: индекс против обхода поля.
+
+Запуск: python bench_owner_index.py [последовательностей] [операций] [зерно]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, 'src', 'backend'))
+
+from src.backend.game import Game
+from board import GROUP_SIZES, PropertyCell, StationCell, UtilityCell
+
+PLAYERS = 4
+ASSET_TYPES = (PropertyCell, StationCell, UtilityCell)
+
+
+def normalize(assets):
+    """Активы -> {категория: [номера клеток]} без пустых цветовых групп"""
+    return {key: [cell.id for cell in cells] for key, cells in assets.items()
+            if cells or key in ('properties', 'stations', 'utilities')}
+
+
+def check(game, step: str):
+    """Сравнить индекс с обходом поля для всех игроков"""
+    board = game.board
+    for player_id in game.players:
+        indexed = normalize(board.get_owner_assets(player_id))
+        scanned = normalize(board.scan_owner_assets(player_id))
+        if indexed != scanned:
+            raise AssertionError(f"{step}: игрок {player_id}\n  индекс: {indexed}\n  обход:  {scanned}")
+
+        for group in GROUP_SIZES:
+            owns = all(cell.owner_id == player_id for cell in board.get_color_group_cells(group))
+            if board.owns_color_group(player_id, group) != owns:
+                raise AssertionError(f"{step}: игрок {player_id}, группа {group}: монополия не совпадает")
+
+        check_building(board, player_id, step)
+
+    # Ничейные клетки не должны оставаться в индексе
+    indexed_cells = sum(len(assets['properties']) + len(assets['stations']) + len(assets['utilities'])
+                        for assets in board._owner_assets.values())
+    owned_cells = sum(1 for cell in board.cells if isinstance(cell, ASSET_TYPES) and cell.owner_id is not None)
+    if indexed_cells != owned_cells:
+        raise AssertionError(f"{step}: в индексе {indexed_cells} клеток, владельцев у {owned_cells}")
+
+
+def check_building(board, player_id: int, step: str):
+    """Сравнить analyze_building с проверками по каждой клетке"""
+    analysis = board.analyze_building(player_id)
+    expected = {"buildable": {}, "hotel": {}, "sellable": {}}
+    for cell in board.get_property_cells():
+        house = board.can_build_house(cell.id, player_id)
+        if house["can_build"]:
+            expected["buildable"][cell.id] = house["house_price"]
+        hotel = board.can_build_hotel(cell.id, player_id)
+        if hotel["can_build"]:
+            expected["hotel"][cell.id] = hotel["hotel_price"]
+        sale = board.can_sell_house(cell.id, player_id)
+        if sale["can_sell"]:
+            expected["sellable"][cell.id] = sale["sell_price"]
+
+    for kind, prices in expected.items():
+        actual = {position: row["price"] for position, row in analysis[kind].items()}
+        if actual != prices:
+            raise AssertionError(f"{step}: игрок {player_id}, {kind}\n  анализ:   {actual}\n  проверки: {prices}")
+
+
+def new_game(rng: random.Random) -> Game:
+    game = Game(f"bench-{rng.random()}", 1)
+    game.event_log.enabled = False
+    for user_id in range(1, PLAYERS + 1):
+        game.add_player(user_id, f"p{user_id}", f"Игрок {user_id}")
+    game.start_game()
+    return game
+
+
+def owned_by(game, player_id: int):
+    return [cell for cell in game.board.cells if isinstance(cell, ASSET_TYPES) and cell.owner_id == player_id]
+
+
+def random_step(game, rng: random.Random) -> str:
+    """Одна случайная операция; возвращает ее описание"""
+    board = game.board
+    active = game.get_active_player_ids()
+    player = game.players[rng.choice(active)]
+    roll = rng.random()
+
+    if roll < 0.3:
+        free = [cell for cell in board.cells if isinstance(cell, ASSET_TYPES) and cell.owner_id is None]
+        if free:
+            cell = rng.choice(free)
+            player.money = max(player.money, cell.price)
+            game.buy_property(player, cell.id)
+            return f"buy {player.user_id} {cell.id}"
+
+    if roll < 0.45 and len(active) > 1:
+        other = game.players[rng.choice([pid for pid in active if pid != player.user_id])]
+        give = [cell.id for cell in owned_by(game, player.user_id) if not cell.mortgaged]
+        take = [cell.id for cell in owned_by(game, other.user_id) if not cell.mortgaged]
+        offer = {"properties": rng.sample(give, min(len(give), rng.randint(0, 2))), "money": 0}
+        request = {"properties": rng.sample(take, min(len(take), rng.randint(0, 2))), "money": 0}
+        result = game.propose_trade(player.user_id, other.user_id, offer, request)
+        if result.get("success"):
+            game.accept_trade(result["trade_id"], other.user_id)
+        return f"trade {player.user_id}->{other.user_id} {offer['properties']} / {request['properties']}"
+
+    if roll < 0.55:
+        cells = owned_by(game, player.user_id)
+        if cells:
+            cell = rng.choice(cells)
+            if cell.mortgaged:
+                board.unmortgage_property(cell.id)
+            elif not (isinstance(cell, PropertyCell) and (cell.houses or cell.hotel)):
+                board.mortgage_property(cell.id)
+            return f"mortgage {cell.id}"
+
+    if roll < 0.8:
+        cells = [cell for cell in owned_by(game, player.user_id) if isinstance(cell, PropertyCell)]
+        if cells:
+            # Дом на каждую улицу группы: застройка растет до отелей
+            cell = rng.choice(cells)
+            for other in board.get_color_group_cells(cell.color_group):
+                if other.houses == 4:
+                    board.build_hotel(other.id, player.user_id)
+                else:
+                    board.build_house(other.id, player.user_id)
+            return f"build {cell.color_group}"
+
+    if roll < 0.87:
+        cells = [cell for cell in owned_by(game, player.user_id) if cell.houses or cell.hotel]
+        if cells:
+            cell = rng.choice(cells)
+            board.sell_house(cell.id, player.user_id)
+            return f"sell {cell.id}"
+
+    if roll < 0.9 and len(active) > 2:
+        game.declare_bankrupt(player, rng.choice([pid for pid in active if pid != player.user_id]))
+        return f"bankrupt {player.user_id}"
+
+    if roll < 0.95:
+        data = game.to_dict()
+        if rng.random() < 0.3:
+            data.pop("board", None)  # старый формат: владельцы по спискам игроков
+        restored = Game.from_dict(data)
+        restored.event_log.enabled = False
+        game.__dict__.update(restored.__dict__)
+        return "restore"
+
+    return "noop"
+
+
+def validate(sequences: int, steps: int, seed: int) -> int:
+    """Прогнать случайные последовательности; вернуть число проверок"""
+    checks = 0
+    for sequence in range(sequences):
+        rng = random.Random(f"{seed}:{sequence}")
+        game = new_game(rng)
+        history = []
+        for _ in range(steps):
+            history.append(random_step(game, rng))
+            try:
+                check(game, history[-1])
+            except AssertionError:
+                print(f"❌ Последовательность {sequence}, операции: {history[-10:]}")
+                raise
+            checks += 1
+    return checks
+
+
+def fill_board(rng: random.Random) -> Game:
+    """Игра, где почти все поле раскуплено"""
+    game = new_game(rng)
+    for cell in game.board.cells:
+        if isinstance(cell, ASSET_TYPES) and rng.random() < 0.9:
+            player = game.players[rng.randint(1, PLAYERS)]
+            player.money = max(player.money, cell.price)
+            game.buy_property(player, cell.id)
+    return game
+
+
+def measure(label: str, func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - started
+    print(f"   {label:<34} {elapsed / repeat * 1e6:8.2f} мкс")
+    return elapsed
+
+
+def bench(seed: int, repeat: int = 20000):
+    game = fill_board(random.Random(seed))
+    board = game.board
+    owned = [cell for cell in board.cells if cell.owner_id is not None]
+
+    print("\n⏱ Замер (на одну операцию):")
+    scan = measure("scan_owner_assets (обход поля)", lambda: board.scan_owner_assets(owned[0].owner_id), repeat)
+    index = measure("get_owner_assets (индекс)", lambda: board.get_owner_assets(owned[0].owner_id), repeat)
+    print(f"   ускорение: x{scan / index:.0f}")
+
+    def rent_scan():
+        for cell in owned:
+            cell.get_rent(7, board.scan_owner_assets(cell.owner_id))
+
+    def rent_index():
+        for cell in owned:
+            board.get_rent_for_cell(cell.id, 7)
+
+    scan = measure(f"рента {len(owned)} клеток, обход", rent_scan, repeat // 20)
+    index = measure(f"рента {len(owned)} клеток, индекс", rent_index, repeat // 20)
+    print(f"   ускорение: x{scan / index:.0f}")
+
+    # Меню застройки: игрок с полной группой и домами
+    player_id = owned[0].owner_id
+    for cell in board.get_property_cells():
+        if cell.color_group == "orange":
+            board.set_owner(cell, player_id)
+    for position in (16, 18, 19, 16, 18):
+        board.build_house(position, player_id)
+
+    def building_per_cell():
+        for cell in board.get_property_cells():
+            board.can_build_house(cell.id, player_id)
+            board.can_build_hotel(cell.id, player_id)
+            board.can_sell_house(cell.id, player_id)
+
+    def building_fresh():
+        board.touch()
+        board.analyze_building(player_id)
+
+    scan = measure("застройка: can_* по клеткам", building_per_cell, repeat // 20)
+    fresh = measure("застройка: analyze_building", building_fresh, repeat // 20)
+    cached = measure("застройка: analyze_building (кэш)", lambda: board.analyze_building(player_id), repeat)
+    print(f"   ускорение: x{scan / fresh:.0f}, из кэша x{scan / cached * 20:.0f}")
+
+
+def main():
+    sequences = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    print(f"\n🔎 Индекс собственности: {sequences} последовательностей по {steps} операций, зерно {seed}")
+    # Game печатает отладку сделок и сохранения - здесь она не нужна
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        checks = validate(sequences, steps, seed)
+    print(f"✅ Индекс и анализ застройки совпали с обходом поля во всех {checks} проверках")
+
+    bench(seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# bench_render_profiles.py
+"""
+Бенчмарк профилей изображения поля: время кодирования и размер файла
+
+Запуск: python bench_render_profiles.py [повторов]
+"""
+import sys
+import time
+
+from src.frontend.graphics import board_renderer, RENDER_PROFILES
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    image = board_renderer.create_test_image()
+    print(f"\n📐 Исходное изображение: {image.size[0]}x{image.size[1]}, повторов: {repeats}")
+    print("=" * 60)
+    print(f"{'Профиль':<14}{'Формат':<8}{'Размер':>12}{'Кодирование':>16}")
+    print("-" * 60)
+
+    for name, settings in RENDER_PROFILES.items():
+        data = b""
+        started = time.perf_counter()
+        for _ in range(repeats):
+            data = board_renderer.save_to_bytes(image, profile=name)
+        elapsed = (time.perf_counter() - started) / repeats
+
+        print(f"{name:<14}{settings['format']:<8}{len(data) / 1024:>9.1f} КБ{elapsed * 1000:>13.1f} мс")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# bench_send_scheduler.py
+"""
+Проверка планировщика отправки на локальном "Bot API"
+
+FakeBotAPI подменяет HTTP-запросы бота: отвечает как Telegram и, как Telegram,
+возвращает 429 (RetryAfter), если в чат или всем вместе отправляется слишком
+много. Сценарий - всплеск уведомлений в игре: каждому чату "ваш ход",
+несколько правок "живого" поля и информационные сообщения одновременно.
+
+Сравнивается отправка напрямую и через SendScheduler.
+
+Запуск: python bench_send_scheduler.py [чатов] [правок поля на чат]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from src.frontend.send_scheduler import (SendScheduler, TokenBucket, send_args,
+                                         PRIORITY_TURN, PRIORITY_INFO)
+
+
+class FakeBotAPI(BaseRequest):
+    """Локальный Bot API: отвечает на запросы и соблюдает лимиты Telegram"""
+
+    def __init__(self, latency: float = 0.02, global_rate: float = 30.0, chat_rate: float = 1.0,
+                 chat_burst: float = 3.0):
+        self.latency = latency
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        # +1 токен запаса: задержка сети немного сдвигает моменты прихода запросов
+        self.global_bucket = TokenBucket(global_rate, global_rate + 1)
+        self.chat_buckets = {}
+        self.message_ids = defaultdict(int)
+
+        self.accepted = 0
+        self.rejected = 0  # ответов 429
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _reply(self, status: int, payload: dict):
+        return status, json.dumps(payload).encode("utf-8")
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        await asyncio.sleep(self.latency)
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+
+        if endpoint == "getMe":
+            return self._reply(200, {"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "GUAPoly", "username": "guapoly_bot"}})
+
+        chat_id = int(params["chat_id"])
+        bucket = self.chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate, self.chat_burst + 1))
+        now = time.monotonic()
+        if bucket.ready_at(now) > now or self.global_bucket.ready_at(now) > now:
+            self.rejected += 1
+            return self._reply(429, {"ok": False, "error_code": 429,
+                                     "description": "Too Many Requests: retry after 1",
+                                     "parameters": {"retry_after": 1}})
+        bucket.take(now)
+        self.global_bucket.take(now)
+        self.accepted += 1
+
+        if endpoint == "sendMessage":
+            self.message_ids[chat_id] += 1
+        message_id = int(params.get("message_id", self.message_ids[chat_id]))
+        return self._reply(200, {"ok": True, "result": {
+            "message_id": message_id, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"}, "text": params.get("text", "")}})
+
+
+async def notify_burst(bot, chats: int, edits: int):
+    """Всплеск уведомлений: время доставки по приоритетам и число ошибок"""
+    started = time.monotonic()
+    delays = defaultdict(list)
+    errors = 0
+
+    async def call(priority, coroutine):
+        nonlocal errors
+        try:
+            await coroutine
+            delays[priority].append(time.monotonic() - started)
+        except (RetryAfter, TelegramError):
+            errors += 1
+
+    def args(priority, coalesce=None):
+        # Без rate limiter бот не принимает rate_limit_args
+        return {"rate_limit_args": send_args(priority, coalesce)} if bot.rate_limiter else {}
+
+    calls = []
+    for chat_id in range(1, chats + 1):
+        for i in range(edits):
+            calls.append(call(PRIORITY_INFO, bot.edit_message_text(
+                f"🗺️ Поле, обновление {i}", chat_id=chat_id, message_id=1,
+                **args(PRIORITY_INFO, "live:1"))))
+        calls.append(call(PRIORITY_INFO, bot.send_message(
+            chat_id, "🏠 Игрок купил собственность", **args(PRIORITY_INFO))))
+        calls.append(call(PRIORITY_TURN, bot.send_message(
+            chat_id, "🎯 Ваш ход!", **args(PRIORITY_TURN))))
+
+    await asyncio.gather(*calls)
+    return time.monotonic() - started, delays, errors, len(calls)
+
+
+def report(label: str, api: FakeBotAPI, result):
+    elapsed, delays, errors, total = result
+    turn = delays[PRIORITY_TURN]
+    info = delays[PRIORITY_INFO]
+    print(f"{label:<22}{elapsed:>7.2f} с  вызовов {total}, доставлено {total - errors}, ошибок {errors}, "
+          f"429 от API {api.rejected}")
+    if turn:
+        print(f"{'':<22}'ваш ход': среднее {sum(turn) / len(turn):.2f} с, максимум {max(turn):.2f} с")
+    if info:
+        print(f"{'':<22}информационные: среднее {sum(info) / len(info):.2f} с, максимум {max(info):.2f} с")
+
+
+async def run(chats: int, edits: int):
+    print(f"\n📤 Чатов: {chats}, правок поля на чат: {edits}")
+    print("=" * 70)
+
+    api = FakeBotAPI()
+    bot = ExtBot("123:TEST", request=api, get_updates_request=FakeBotAPI())
+    async with bot:
+        report("Напрямую", api, await notify_burst(bot, chats, edits))
+
+    await asyncio.sleep(1.5)  # лимиты фейкового API восстанавливаются
+
+    api = FakeBotAPI()
+    scheduler = SendScheduler()
+    bot = ExtBot("123:TEST", request=api, get_updates_request=FakeBotAPI(), rate_limiter=scheduler)
+    async with bot:
+        report("Через планировщик", api, await notify_burst(bot, chats, edits))
+        stats = scheduler.get_stats()
+    print(f"{'':<22}отправлено {stats['sent']}, объединено {stats['coalesced']}, "
+          f"RetryAfter {stats['retried']}")
+    print("=" * 70)
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    asyncio.run(run(chats, edits))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# check_roundtrip.py
+"""
+Проверка сохранения игры: Game.to_dict -> from_dict -> to_dict
+
+Случайные партии на движке (броски, покупки, постройки, залог, сделки,
+банкротства) останавливаются в случайный момент - в том числе с висящим
+предложением покупки и неотвеченными предложениями обмена - и сохраняются.
+Для каждого снимка проверяется:
+- Game: from_dict(to_dict(g)).to_dict() == to_dict(g), в том числе после
+  json (так снимок хранится в базе);
+- Board, SimplePlayer, TradeManager по отдельности;
+- старый формат без "board" и "format": владельцы восстанавливаются по
+  спискам игроков (дома и залог старый формат не хранил);
+- board_messages и pending_purchase переживают восстановление.
+
+Запуск: python check_roundtrip.py [партий] [зерно]
+"""
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, 'src', 'backend'))
+
+from src.backend.game import Game, SimplePlayer
+from board import Board
+from src.backend.trade_manager import TradeManager
+
+
+def check_equal(label: str, expected, actual):
+    if expected != actual:
+        diff = [key for key in expected if expected.get(key) != actual.get(key)] \
+            if isinstance(expected, dict) and isinstance(actual, dict) else []
+        raise AssertionError(f"{label}: после восстановления не совпадает {diff or ''}\n"
+                             f"  было:  {expected}\n  стало: {actual}")
+
+
+def play(game: Game, rng: random.Random, actions: int):
+    """Случайные действия движка; может остановиться посреди предложения покупки"""
+    for _ in range(actions):
+        if game.state.value != "in_game":
+            return
+        player = game.get_current_player()
+        if player.in_jail:
+            game.perform_action(player.user_id, rng.choice(("jail_roll", "jail_pay", "jail_card", "jail_skip")))
+        elif game.pending_purchase:
+            if not game.perform_action(player.user_id, rng.choice(("buy", "buy", "skip")))["success"]:
+                game.perform_action(player.user_id, "skip")
+        else:
+            game.perform_action(player.user_id, "roll", dice=(rng.randint(1, 6), rng.randint(1, 6)))
+
+        roll = rng.random()
+        board = game.board
+        if roll < 0.1:
+            for row in board.analyze_building(player.user_id)["buildable"].values():
+                game.perform_action(player.user_id, "build", position=row["id"])
+        elif roll < 0.15 and player.properties:
+            position = rng.choice(player.properties)
+            if board.get_cell(position).mortgaged:
+                board.unmortgage_property(position)
+            else:
+                board.mortgage_property(position)
+        elif roll < 0.2:
+            propose_trade(game, player, rng)
+
+
+def propose_trade(game: Game, player, rng: random.Random):
+    """Предложение обмена; часть из них сразу принимается или отклоняется"""
+    others = [pid for pid in game.get_active_player_ids() if pid != player.user_id]
+    if not others:
+        return
+    other = game.players[rng.choice(others)]
+    give = [position for position in player.properties + player.stations if not game.board.get_cell(position).mortgaged]
+    offer = {"properties": rng.sample(give, min(len(give), 1)), "money": rng.choice((0, 10, 50))}
+    request = {"properties": [], "money": 0}
+    result = game.propose_trade(player.user_id, other.user_id, offer, request)
+    if result.get("success"):
+        answer = rng.random()
+        if answer < 0.3:
+            game.accept_trade(result["trade_id"], other.user_id)
+        elif answer < 0.5:
+            game.reject_trade(result["trade_id"], other.user_id)
+
+
+def new_game(index: int, rng: random.Random) -> Game:
+    game = Game(f"roundtrip-{index}", 1)
+    game.event_log.enabled = False
+    for user_id in range(1, rng.randint(2, 6) + 1):
+        game.add_player(user_id, f"p{user_id}", f"Игрок {user_id}")
+    if rng.random() < 0.9:
+        game.start_game()
+    for chat_id in rng.sample(range(-100, 100), rng.randint(0, 3)):
+        game.board_messages[chat_id] = rng.randint(1, 10 ** 6)
+    return game
+
+
+def legacy(data: dict) -> dict:
+    """Снимок в старом формате: без "format" и "board" """
+    data = dict(data)
+    data.pop("format", None)
+    data.pop("board", None)
+    return data
+
+
+def check_game(game: Game, label: str) -> int:
+    """Все проверки для одного снимка; вернуть число проверок"""
+    data = game.to_dict()
+    check_equal(f"{label} Game", data, Game.from_dict(data).to_dict())
+    check_equal(f"{label} Game (json)", data, Game.from_dict(json.loads(json.dumps(data))).to_dict())
+
+    board = Board()
+    board.load_state(data["board"])
+    check_equal(f"{label} Board", data["board"], board.to_dict())
+
+    for player in game.players.values():
+        player_data = player.to_dict()
+        check_equal(f"{label} SimplePlayer {player.user_id}", player_data,
+                    SimplePlayer.from_dict(player_data).to_dict())
+
+    trades = TradeManager()
+    trades.load_state(data["trade_manager"])
+    check_equal(f"{label} TradeManager", data["trade_manager"], trades.to_dict())
+
+    # Старый формат не хранил дома и залог: сравниваем с тем же полем без них
+    restored = Game.from_dict(legacy(data))
+    expected = dict(data, board=dict(data["board"], houses=[0] * len(data["board"]["houses"]), mortgaged=[]))
+    check_equal(f"{label} старый формат", expected, restored.to_dict())
+    check_equal(f"{label} старый формат, повторно", expected, Game.from_dict(restored.to_dict()).to_dict())
+
+    restored = Game.from_dict(data)
+    check_equal(f"{label} board_messages", game.board_messages, restored.board_messages)
+    check_equal(f"{label} pending_purchase", {"offer": game.pending_purchase},
+                {"offer": restored.pending_purchase})
+    return 7 + len(game.players)
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    logging.disable(logging.INFO)
+    print(f"\n🔎 Сохранение игры: {games} партий, зерно {seed}")
+    checks = 0
+    seen = {"pending_purchase": 0, "active_trades": 0, "trade_history": 0, "houses": 0, "mortgaged": 0,
+            "bankrupt": 0, "board_messages": 0}
+    # Game печатает отладку сделок и сохранения - здесь она не нужна
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        for index in range(games):
+            rng = random.Random(f"{seed}:{index}")
+            random.seed(f"{seed}:{index}")
+            game = new_game(index, rng)
+            for snapshot in range(3):
+                if game.state.value == "in_game":
+                    play(game, rng, rng.randint(1, 150))
+                checks += check_game(game, f"партия {index}, снимок {snapshot}")
+
+                data = game.to_dict()
+                seen["pending_purchase"] += game.pending_purchase is not None
+                seen["active_trades"] += bool(data["trade_manager"]["active"])
+                seen["trade_history"] += bool(data["trade_manager"]["history"])
+                seen["houses"] += any(data["board"]["houses"])
+                seen["mortgaged"] += bool(data["board"]["mortgaged"])
+                seen["bankrupt"] += any(p["status"] == "bankrupt" for p in data["players"].values())
+                seen["board_messages"] += bool(data["board_messages"])
+
+    print(f"✅ Все {checks} проверок прошли")
+    print("   снимков с: " + ", ".join(f"{name} {count}" for name, count in seen.items()))
+
+
+if __name__ == "__main__":
+    main()
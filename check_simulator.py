@@ -0,0 +1,51 @@
+# check_simulator.py
+"""
+Проверка быстрого броска симулятора против движка хода
+
+Одни и те же партии играются дважды: с lean_roll (по умолчанию) и целиком
+через Game.perform_action. Партии засеваются одинаково, поэтому вся
+статистика - попадания на клетки, рента по уровням застройки, длины партий,
+победы стратегий и число действий - должна совпасть точно.
+
+Запуск: python check_simulator.py [партий] [зерно]
+"""
+import logging
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, 'src', 'backend'))
+
+from src.backend.simulator import run_simulation
+
+STRATEGY_SETS = (
+    ["buy_all", "cautious"],
+    ["buy_all", "cautious", "builder", "never_buy"],
+    ["builder", "builder", "builder"],
+    ["never_buy", "never_buy"],
+)
+
+FIELDS = ("games", "finished", "capped", "turns", "actions", "landings", "rent_count", "rent_total",
+          "lengths", "wins")
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    logging.disable(logging.INFO)
+    print(f"\n🔎 lean_roll против perform_action: {games} партий на набор, зерно {seed}")
+    for strategies in STRATEGY_SETS:
+        lean = run_simulation(games, strategies, seed=seed, processes=1, lean=True)
+        engine = run_simulation(games, strategies, seed=seed, processes=1, lean=False)
+        for field in FIELDS:
+            if getattr(lean, field) != getattr(engine, field):
+                raise AssertionError(f"{', '.join(strategies)}: {field} не совпадает\n"
+                                     f"  lean:   {getattr(lean, field)}\n  движок: {getattr(engine, field)}")
+        print(f"✅ {', '.join(strategies):<36} ходов {lean.turns:>7}, "
+              f"ходов/с: {lean.turns / lean.elapsed:>9,.0f} против {engine.turns / engine.elapsed:>8,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,56 @@ class Config:
     # Путь к базе данных
     DB_PATH = "data/games.db"
 
+    # Отложенное сохранение: максимальная задержка (сек) и число игр для досрочной записи
+    SAVE_FLUSH_INTERVAL = float(os.getenv("SAVE_FLUSH_INTERVAL", "2.0"))
+    SAVE_MAX_DIRTY = int(os.getenv("SAVE_MAX_DIRTY", "50"))
+
+    # Сколько обновлений обрабатывать параллельно (действия в одной игре все равно идут по очереди)
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+
+    # Журнал событий игры: через сколько событий записывать полный снимок
+    EVENT_SNAPSHOT_INTERVAL = int(os.getenv("EVENT_SNAPSHOT_INTERVAL", "50"))
+
+    # Рендеринг поля: количество процессов (0 - фоновый поток) и лимит задач в работе
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+    RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", "32"))
+
+    # Профили изображения поля (full - PNG, preview - 900px JPEG, thumbnail - 400px JPEG)
+    RENDER_PROFILE = os.getenv("RENDER_PROFILE", "full")
+    NOTIFY_RENDER_PROFILE = os.getenv("NOTIFY_RENDER_PROFILE", "preview")
+
+    # Сколько часов хранить данные кнопок, не поместившихся в callback_data
+    # (хранятся в базе игр: кнопки работают после перезапуска и в других процессах)
+    CALLBACK_TOKEN_TTL = float(os.getenv("CALLBACK_TOKEN_TTL_HOURS", "24")) * 3600
+
+    # "Живое" сообщение с полем редактируется, пока после него не больше N сообщений
+    LIVE_BOARD_MAX_DISTANCE = int(os.getenv("LIVE_BOARD_MAX_DISTANCE", "6"))
+
+    # Лимиты отправки: всего в секунду, в личный чат в секунду (и запас подряд), в группу в минуту
+    SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+    SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+    SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", "3"))
+    SEND_GROUP_RATE = float(os.getenv("SEND_GROUP_PER_MINUTE", "20")) / 60
+    # Сколько раз повторять запрос после RetryAfter
+    SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+
+    # Режим получения обновлений: polling или webhook
+    BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+    # Webhook: где слушает HTTP-сервер бота и какой адрес сообщить Telegram (адрес обратного прокси)
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # например https://bot.example.com
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+    # Адрес Bot API (пусто - api.telegram.org), например http://localhost:8081/bot
+    BOT_API_URL = os.getenv("BOT_API_URL", "")
+
+    # Сколько file_id загруженных изображений поля помнить
+    PHOTO_CACHE_SIZE = int(os.getenv("PHOTO_CACHE_SIZE", "1024"))
+
     # Цвета для игроков
     PLAYER_COLORS = ["🔴", "🔵", "🟢", "🟡", "🟣", "🟠", "⚫", "⚪"]
 
@@ -9,14 +9,20 @@ import random
 from datetime import datetime
 # Для таймера очистки предложений
 import asyncio
+import functools
 import io
+from typing import Optional
 from PIL import Image
-from src.frontend.graphics import board_renderer
+from src.frontend.render_service import RenderService
+from src.frontend.photo_cache import PhotoCache
+from src.frontend.live_board import LiveBoardTracker
+from src.frontend.send_scheduler import SendScheduler, send_args, PRIORITY_TURN, PRIORITY_REPLY, PRIORITY_INFO
+from src.frontend.callback_router import CallbackRouter, CallbackFormatError, CallbackExpiredError
 
 # При запуске бота добавьте задачу
 # application.job_queue.run_repeating(clear_buy_offer, interval=30, first=10)
 
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, JobQueue
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, JobQueue, MessageHandler, filters
 
@@ -33,9 +39,10 @@ sys.path.insert(0, src_backend_dir)  # папка src/backend
 from config import Config
 from src.backend.game import Game, GameState
 from src.backend.player import Player, PlayerStatus
-from src.backend.board import Board, PropertyCell, StationCell, UtilityCell, CellType
+from src.backend.board import Board, StationCell, UtilityCell, CellType
 from src.backend.game_manager import GameManager
-from src.frontend.combined_graphics import create_game_message_with_board, get_combined_board_bytes
+from src.backend.analytics import get_board_analytics, best_investments, next_house_payback
+from src.frontend.combined_graphics import create_game_message_with_board
 
 # удалить потом
 import telegram
@@ -69,6 +76,145 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # Инициализация
 game_manager = GameManager()
+render_service = RenderService(Config.RENDER_WORKERS, Config.RENDER_MAX_PENDING, Config.RENDER_PROFILE)
+photo_cache = PhotoCache(Config.PHOTO_CACHE_SIZE)
+live_boards = LiveBoardTracker(Config.LIVE_BOARD_MAX_DISTANCE)
+# Все сообщения бота сдвигают конец чата для "живого" поля
+send_scheduler = SendScheduler(Config.SEND_GLOBAL_RATE, Config.SEND_CHAT_RATE, Config.SEND_CHAT_BURST,
+                               Config.SEND_GROUP_RATE, Config.SEND_MAX_RETRIES, on_sent=live_boards.seen)
+
+
+def serialized_by_game(handler, target=None):
+    """
+    Обработчик выполняется под блокировкой игры пользователя (для concurrent_updates)
+
+    target(update, context) -> id игры, которую меняет обработчик, даже если
+    пользователь еще не в ней (вход в игру, кнопки лобби); блокируется и она.
+    """
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        message = update.effective_message
+        if message is not None:
+            live_boards.seen(message.chat_id, message.message_id)
+
+        user = update.effective_user
+        if user is None:
+            return await handler(update, context)
+
+        game_id = target(update, context) if target else None
+        async with game_manager.game_action(user.id, game_id=game_id):
+            return await handler(update, context)
+
+    return wrapper
+
+
+def join_target(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Игра из /join КОД_ИГРЫ"""
+    return context.args[0].upper() if context.args else None
+
+
+def callback_target(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Игра из поля game_id кнопки"""
+    return callback_router.game_id_of(update.callback_query.data or "")
+
+
+async def send_board_photo(send_photo, game_data: dict, text_message: str = None,
+                           player_color: str = "🔴", profile: str = None, **kwargs):
+    """
+    Отправить изображение поля, переиспользуя file_id уже загруженной картинки
+
+    Args:
+        send_photo: reply_photo или bot.send_photo
+        game_data: данные для рендера
+        text_message: текст для совмещенного изображения (None - только поле)
+        player_color: цвет игрока для совмещенного изображения
+        profile: профиль изображения (None - Config.RENDER_PROFILE)
+    """
+    profile = profile or Config.RENDER_PROFILE
+    key = board_photo_key(game_data, text_message, player_color, profile)
+
+    file_id = photo_cache.get(key)
+    if file_id:
+        try:
+            return await send_photo(photo=file_id, **kwargs)
+        except telegram.error.BadRequest as e:
+            print(f"⚠️ file_id не принят, загружаем изображение заново: {e}")
+            photo_cache.discard(key)
+
+    photo = await render_board_photo(game_data, text_message, player_color, profile)
+    message = await send_photo(photo=photo, **kwargs)
+    photo_cache.remember(key, message)
+    return message
+
+
+def board_photo_key(game_data: dict, text_message: str, player_color: str, profile: str) -> str:
+    """Ключ кэша file_id для изображения поля"""
+    if text_message is None:
+        return photo_cache.make_key(game_data, profile)
+    return photo_cache.make_key(game_data, profile, text_message, player_color)
+
+
+async def render_board_photo(game_data: dict, text_message: str, player_color: str, profile: str) -> bytes:
+    """Отрисовать поле (или совмещенное изображение) в пуле рендеринга"""
+    if text_message is None:
+        return await render_service.render_board_bytes(game_data, profile=profile)
+    return await render_service.render_combined_bytes(game_data, text_message, player_color, profile=profile)
+
+
+async def update_live_board(bot, game, chat_id: int, caption: str, text_message: str = None,
+                            player_color: str = "🔴", profile: str = None, reply_markup=None,
+                            notify: bool = False, priority: int = PRIORITY_REPLY):
+    """
+    Обновить "живое" сообщение с полем игры в чате
+
+    Если сообщение недалеко от конца чата - меняется подпись, а картинка
+    только если поле изменилось. Иначе (или если Telegram не дает изменить
+    сообщение) отправляется новое, и оно становится "живым".
+
+    Args:
+        notify: всегда отправлять новое сообщение (редактирование не дает уведомления)
+        priority: приоритет в очереди отправки (notify - всегда PRIORITY_TURN)
+    """
+    profile = profile or Config.RENDER_PROFILE
+    game_data = game.render_snapshot()
+    key = board_photo_key(game_data, text_message, player_color, profile)
+    caption = caption[:1024]  # Ограничение Telegram для подписи
+
+    message_id = game.board_messages.get(chat_id)
+    if not notify and live_boards.can_edit(chat_id, message_id):
+        # Правки одного сообщения, ждущие в очереди, заменяют друг друга
+        edit_args = send_args(priority, coalesce=f"live:{message_id}")
+        try:
+            if live_boards.photo_key(message_id) == key:
+                message = await bot.edit_message_caption(chat_id=chat_id, message_id=message_id,
+                                                         caption=caption, reply_markup=reply_markup,
+                                                         rate_limit_args=edit_args)
+                live_boards.edited += 1
+            else:
+                photo = photo_cache.get(key) or await render_board_photo(game_data, text_message,
+                                                                         player_color, profile)
+                message = await bot.edit_message_media(chat_id=chat_id, message_id=message_id,
+                                                       media=InputMediaPhoto(photo, caption=caption),
+                                                       reply_markup=reply_markup,
+                                                       rate_limit_args=edit_args)
+                photo_cache.remember(key, message)
+                live_boards.media_edited += 1
+
+            live_boards.shown(chat_id, message_id, key)
+            return message
+        except telegram.error.BadRequest as e:
+            if "not modified" in str(e).lower():
+                live_boards.shown(chat_id, message_id, key)
+                return None
+            print(f"⚠️ Не удалось изменить поле в чате {chat_id}, отправляем новое: {e}")
+
+    message = await send_board_photo(bot.send_photo, game_data, text_message, player_color, profile,
+                                     chat_id=chat_id, caption=caption, reply_markup=reply_markup,
+                                     rate_limit_args=send_args(PRIORITY_TURN if notify else priority))
+    game.board_messages[chat_id] = message.message_id
+    live_boards.shown(chat_id, message.message_id, key, old_message_id=message_id)
+    live_boards.sent += 1
+    return message
 
 def escape_markdown(text: str) -> str:
     """Экранирование для Markdown"""
@@ -118,6 +264,190 @@ def format_trade_summary(trade_items: dict, game, player_id=None) -> str:
         lines.append("(ничего)")
 
     return "\n".join(lines)
+
+
+# ========== СОБЫТИЯ ХОДА ==========
+
+JAIL_REASON_TEXT = {
+    "no_double": "🎲 Нет дубля",
+    "no_money": "❌ Недостаточно денег!",
+    "no_card": "❌ Нет карт освобождения!",
+    "skip": "⏳ Ход пропущен",
+}
+
+
+def player_label(game, user_id: int) -> str:
+    """Цвет и имя игрока"""
+    player = game.players.get(user_id)
+    if not player:
+        return "🎲 Игрок"
+    return f"{player.color if hasattr(player, 'color') else '🎲'} {player.full_name}"
+
+
+def has_event(result: dict, event_type: str) -> bool:
+    """Есть ли в результате действия событие нужного типа"""
+    return any(event["type"] == event_type for event in result.get("events", []))
+
+
+def describe_turn_events(game, events: list) -> list:
+    """Текст хода по событиям движка (строки сообщения)"""
+    lines = []
+    for event in events:
+        kind = event["type"]
+        player = game.players.get(event.get("player"))
+
+        if kind == "roll":
+            dice1, dice2 = event["dice"]
+            if event.get("jail"):
+                lines.append(f"🎲 Попытка выбросить дубль: {dice1} + {dice2} = {event['total']}")
+            else:
+                lines.append(f"{player_label(game, event['player'])} бросает кубики:")
+                lines.append(f"🎯 {dice1} + {dice2} = {event['total']}")
+            lines.append("")
+
+        elif kind == "move":
+            if event.get("card"):
+                lines.append(f"📍 Карточка переносит: {event['old_position']} → {event['new_position']}")
+                continue
+            if event["passed_start"]:
+                lines.append(f"💰 Прошли СТАРТ! +${event['salary']}")
+                lines.append("")
+            lines.append(f"📍 Перемещение: {event['old_position']} → {event['new_position']}")
+            lines.append(f"💰 Баланс: ${player.money if player else 0}")
+            lines.append("")
+
+        elif kind == "cell":
+            lines.append(f"🏠 Клетка {event['position']}: {event['name']}")
+
+        elif kind == "offer":
+            lines.append("")
+            lines.append("🏠 СОБСТВЕННОСТЬ СВОБОДНА!")
+            lines.append(f"🏷 {event['name']}")
+            lines.append(f"💵 Цена покупки: ${event['price']}")
+            lines.append(f"💰 У вас: ${player.money if player else 0}")
+            lines.append("")
+            lines.append("✅ Достаточно средств для покупки!" if event["can_afford"] else "❌ Недостаточно средств!")
+
+        elif kind == "rent":
+            owner = game.players.get(event["owner"])
+            lines.append("")
+            lines.append("💸 Чужая собственность!")
+            lines.append(f"👤 Владелец: {owner.full_name if owner else 'неизвестен'}")
+            lines.append(f"💰 Рента: ${event['amount']}")
+            lines.append("✅ Рента уплачена" if event["paid"] else "❌ Недостаточно средств!")
+
+        elif kind == "tax":
+            lines.append(f"💸 Налог: ${event['amount']}")
+            lines.append("✅ Налог уплачен" if event["paid"] else "❌ Недостаточно средств!")
+
+        elif kind == "parking":
+            lines.append("")
+            if event["amount"] > 0:
+                lines.append("🎉 Бесплатная стоянка!")
+                lines.append(f"💰 Вы получаете: ${event['amount']}")
+            else:
+                lines.append("🅿️ Бесплатная стоянка")
+                lines.append("💰 В банке: $0")
+
+        elif kind == "card":
+            lines.append("")
+            lines.append(f"🎯 {event['text']}")
+            if event["message"] and event["message"] != event["text"]:
+                lines.append(f"📝 {event['message']}")
+
+        elif kind == "jail":
+            lines.append("")
+            if event["reason"] == "third_double":
+                lines.append("🎲 Выброшен третий дубль!")
+            lines.append("🔒 ВЫ ОТПРАВЛЕНЫ В ТЮРЬМУ!")
+            lines.append("📍 Позиция: Тюрьма (клетка 10)")
+            lines.append("")
+            lines.append("🎮 В следующий ваш ход используйте:")
+            lines.append("• /jail - меню тюрьмы")
+            lines.append(f"• /jail_pay - заплатить ${Config.JAIL_FINE}")
+            lines.append("• /jail_roll - попытать удачу")
+            lines.append("• /jail_card - использовать карту")
+
+        elif kind == "jail_release":
+            method = event["method"]
+            if method == "double":
+                lines.append("🔓 ДУБЛЬ! Вы вышли из тюрьмы!")
+            elif method == "pay":
+                lines.append(f"💵 Вы заплатили ${event['amount']}")
+                lines.append("🔓 Вы вышли из тюрьмы!")
+                lines.append(f"💰 Баланс: ${player.money if player else 0}")
+            elif method == "card":
+                lines.append("🎫 Карта использована!")
+                lines.append("🔓 Вы вышли из тюрьмы!")
+                lines.append(f"📊 Осталось карт: {event['cards_left']}")
+            else:
+                lines.append(JAIL_REASON_TEXT.get(event.get("reason"), "🔒 Выход из тюрьмы"))
+                lines.append("⏰ Прошло 3 круга!")
+                lines.append("🔓 Вы вышли автоматически!")
+            if event.get("reason") != "skip":
+                lines.append("🎲 Теперь ваш ход! Используйте /roll.")
+
+        elif kind == "jail_stay":
+            lines.append(JAIL_REASON_TEXT.get(event["reason"], "🔒 Тюрьма"))
+            lines.append("🔒 Остаётесь в тюрьме")
+            lines.append(f"📅 Круг: {event['turns']}/{event['max_turns']}")
+
+        elif kind == "buy":
+            lines.append(f"✅ {player.full_name if player else 'Игрок'} купил(а) {event['name']} за ${event['price']}!")
+
+        elif kind == "skip":
+            lines.append(f"⏭️ {player.full_name if player else 'Игрок'} пропустил(а) покупку {event['name']}")
+
+        elif kind == "bankrupt":
+            lines.append("")
+            lines.append(f"💥 {player.full_name if player else 'Игрок'} - БАНКРОТ!")
+            if event["released"]:
+                lines.append(f"🏦 Собственность возвращается банку: {len(event['released'])}")
+
+        elif kind == "double":
+            lines.append("")
+            lines.append("🎲 ДУБЛЬ! Ходите еще раз!")
+
+        elif kind == "turn":
+            lines.append("")
+            lines.append("⏭️ Ход переходит")
+            lines.append(f"🎯 {player_label(game, event['player'])}")
+
+        elif kind == "game_over":
+            winner = game.players.get(event["winner"]) if event["winner"] else None
+            lines.append("")
+            lines.append("🏁 ИГРА ОКОНЧЕНА!")
+            if winner:
+                lines.append(f"🏆 Победитель: {winner.full_name}")
+
+    return lines
+
+
+def get_jail_keyboard(game_id: str) -> InlineKeyboardMarkup:
+    """Кнопки действий в тюрьме"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("🎲 Попытаться выбросить дубль", callback_data=callback_router.build("jail_", "roll", game_id))],
+        [InlineKeyboardButton(f"💵 Заплатить ${Config.JAIL_FINE}", callback_data=callback_router.build("jail_", "pay", game_id))],
+        [InlineKeyboardButton("🎫 Использовать карту", callback_data=callback_router.build("jail_", "card", game_id))],
+        [InlineKeyboardButton("⏳ Пропустить ход", callback_data=callback_router.build("jail_", "skip", game_id))]
+    ])
+
+
+async def announce_turn_result(game, context, user_id: int, result: dict):
+    """После действия: уведомить следующего игрока или всех об окончании игры"""
+    if has_event(result, "game_over"):
+        text = "\n".join(describe_turn_events(game, [e for e in result["events"] if e["type"] == "game_over"]))
+        for other_id in game.players:
+            if other_id != user_id:
+                try:
+                    await context.bot.send_message(chat_id=other_id, text=text.strip(),
+                                                   rate_limit_args=send_args(PRIORITY_INFO))
+                except Exception as e:
+                    print(f"❌ Не удалось уведомить игрока {other_id}: {e}")
+    elif has_event(result, "turn"):
+        await notify_next_player(game, context, user_id)
+
+
 # ========== КЛАВИАТУРЫ ==========
 
 def get_main_menu_keyboard() -> InlineKeyboardMarkup:
@@ -136,11 +466,11 @@ def get_lobby_keyboard(game_id: str, is_creator: bool = False) -> InlineKeyboard
     keyboard = []
 
     if is_creator:
-        keyboard.append([InlineKeyboardButton("🚀 Начать игру", callback_data=f"lobby_start_{game_id}")])
+        keyboard.append([InlineKeyboardButton("🚀 Начать игру", callback_data=callback_router.build("lobby_start_", game_id))])
 
     keyboard.extend([
-        [InlineKeyboardButton("👥 Пригласить друзей", callback_data=f"lobby_invite_{game_id}")],
-        [InlineKeyboardButton("📊 Статистика лобби", callback_data=f"lobby_stats_{game_id}")],
+        [InlineKeyboardButton("👥 Пригласить друзей", callback_data=callback_router.build("lobby_invite_", game_id))],
+        [InlineKeyboardButton("📊 Статистика лобби", callback_data=callback_router.build("lobby_stats_", game_id))],
         [InlineKeyboardButton("❌ Покинуть лобби", callback_data="lobby_leave")]
     ])
 
@@ -363,6 +693,7 @@ async def startgame_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 try:
                     await context.bot.send_message(
                         chat_id=player.user_id,
+                        rate_limit_args=send_args(PRIORITY_INFO),
                         text=f"🎮 *Игра началась!*\n\n"
                              f"Первый ходит: {escape_markdown(first_player.full_name)}\n"
                              f"Используйте /roll когда наступит ваш ход!",
@@ -433,336 +764,48 @@ async def roll_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ Игра еще не началась!")
             return
 
-        current_player = game.get_current_player()
-        if not current_player:
-            await update.message.reply_text("❌ Ошибка: текущий игрок не найден!")
-            return
-
-        # Проверяем, чей сейчас ход
-        if current_player.user_id != user.id:
-            await update.message.reply_text(
-                f"❌ Сейчас не ваш ход!\n\n🎯 Сейчас ходит: {current_player.full_name}\n⏳ Ожидайте своей очереди"
-            )
-            return
-
-        # Проверка тюрьмы
-        if current_player.in_jail:
-            jail_keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("🎲 Попытаться выбросить дубль", callback_data=f"jail_roll_{game.game_id}")],
-                [InlineKeyboardButton("💵 Заплатить $200", callback_data=f"jail_pay_{game.game_id}")],
-                [InlineKeyboardButton("🎫 Использовать карту", callback_data=f"jail_card_{game.game_id}")],
-                [InlineKeyboardButton("⏳ Пропустить ход", callback_data=f"jail_skip_{game.game_id}")]
-            ])
-
-            await update.message.reply_text(
-                f"🔒 Вы в тюрьме!\n\nХод в тюрьме: {current_player.jail_turns + 1}/3\n\nВыберите действие:",
-                reply_markup=jail_keyboard
-            )
-            return
-
-        # Бросок кубиков
-        dice1, dice2, total = game.roll_dice()
+        # Правила хода - в движке игры, здесь только показываем события
+        result = game.perform_action(user.id, "roll")
 
-        # Обработка дублей для тюрьмы
-        if dice1 == dice2:
-            game.double_count += 1
-            if game.double_count >= 3:
+        if not result["success"]:
+            if result["error"] == "in_jail":
+                player = game.players[user.id]
                 await update.message.reply_text(
-                    f"🎲 Выброшен третий дубль!\n🎯 {dice1} + {dice2} = {total}\n\n🔒 Вы отправляетесь в тюрьму!"
+                    f"🔒 Вы в тюрьме!\n\nХод в тюрьме: {player.jail_turns + 1}/3\n\nВыберите действие:",
+                    reply_markup=get_jail_keyboard(game.game_id)
                 )
-                current_player.go_to_jail()
-                game.next_turn()
-                game_manager.save_game_state(game.game_id)
-                await notify_next_player(game, context, current_player.user_id)
-                return
-        else:
-            game.double_count = 0
-
-        # Перемещаем игрока
-        old_position = current_player.position
-        move_result = game.move_player(current_player, total)
-
-        # Получаем клетку
-        cell = game.board.get_cell(current_player.position)
-        cell_action = game.process_cell_action(current_player, total)
-
-        # Обработка отправки в тюрьму
-        if cell_action.get("action") == "go_to_jail":
-            current_player.position = 10
-            current_player.in_jail = True
-            current_player.jail_turns = 0
-
-            jail_response = f"{current_player.color if hasattr(current_player, 'color') else '🎲'} {current_player.full_name} бросает кубики:\n"
-            jail_response += f"🎯 {dice1} + {dice2} = {total}\n\n"
-
-            if move_result.get("passed_start"):
-                jail_response += f"💰 Прошли СТАРТ! +${Config.SALARY}\n\n"
-
-            jail_response += f"📍 Перемещение: {old_position} → {current_player.position}\n"
-            jail_response += f"💰 Баланс: ${current_player.money}\n\n"
-
-            cell_name = cell.name if cell else "Неизвестно"
-            jail_response += f"🏠 Клетка {current_player.position}: {cell_name}\n"
-            jail_response += f"\n🔒 ВЫ ОТПРАВЛЕНЫ В ТЮРЬМУ!\n"
-            jail_response += f"📍 Позиция: Тюрьма (клетка 10)\n"
-            jail_response += f"📅 Круг: 1/3\n\n"
-            jail_response += f"🎮 В следующий ваш ход используйте:\n"
-            jail_response += f"• /jail - меню тюрьмы\n"
-            jail_response += f"• /jail_pay - заплатить ${Config.JAIL_FINE}\n"
-            jail_response += f"• /jail_roll - попытать удачу\n"
-            jail_response += f"• /jail_card - использовать карту\n\n"
-
-            # Передаем ход
-            game.next_turn()
-            next_player = game.get_current_player()
-            if next_player:
-                next_color = next_player.color if hasattr(next_player, 'color') else '🎲'
-                jail_response += f"⏭️ Ход переходит\n🎯 {next_color} {next_player.full_name}"
-
-            await update.message.reply_text(jail_response)
-            game_manager.save_game_state(game.game_id)
+            elif result["error"] == "not_your_turn":
+                current_player = game.get_current_player()
+                await update.message.reply_text(
+                    f"❌ Сейчас не ваш ход!\n\n🎯 Сейчас ходит: {current_player.full_name}\n⏳ Ожидайте своей очереди"
+                )
+            else:
+                await update.message.reply_text(f"❌ {result['message']}")
             return
 
-        # Формируем текстовое сообщение
-        response_lines = []
-
-        # 1. Первая строка: имя игрока
-        player_name = current_player.full_name
-        player_icon = current_player.color if hasattr(current_player, 'color') else '🎲'
-        response_lines.append(f"{player_icon} {player_name} бросает кубики:")
-
-        # 2. Результат броска
-        response_lines.append(f"🎯 {dice1} + {dice2} = {total}")
-        response_lines.append("")
-
-        # 3. Прошли старт
-        if move_result.get("passed_start"):
-            response_lines.append(f"💰 Прошли СТАРТ! +${Config.SALARY}")
-            response_lines.append("")
-
-        # 4. Перемещение и баланс
-        response_lines.append(f"📍 Перемещение: {old_position} → {current_player.position}")
-        response_lines.append(f"💰 Баланс: ${current_player.money}")
-        response_lines.append("")
-
-        # 5. Информация о клетке
-        cell_name = cell.name if cell else "Неизвестно"
-        response_lines.append(f"🏠 Клетка {current_player.position}: {cell_name}")
-
-        # Подготавливаем данные для отображения
-        players_data = []
-        properties_data = {}
-
-        for player_id, player in game.players.items():
-            players_data.append({
-                "id": player_id,
-                "name": player.full_name,
-                "position": player.position,
-                "color": getattr(player, 'color', '🔴'),
-                "money": player.money
-            })
-
-        for board_cell in game.board.cells:
-            if hasattr(board_cell, 'owner_id') and board_cell.owner_id:
-                properties_data[board_cell.id] = {
-                    "owner": board_cell.owner_id,
-                    "houses": getattr(board_cell, 'houses', 0),
-                    "hotel": getattr(board_cell, 'hotel', False)
-                }
-
-        game_data = {
-            "players": players_data,
-            "properties": properties_data
-        }
-
-        # Создаем клавиатуру
+        # Предложение покупки - кнопки купить/пропустить
         keyboard = None
-
-        # Проверяем действия на клетке
-        if cell_action["action"] == "buy_property":
-            # Кнопки для покупки
-            price = cell.price if hasattr(cell, 'price') else 0
-            response_lines.append("")
-            response_lines.append("🏠 СОБСТВЕННОСТЬ СВОБОДНА!")
-            response_lines.append(f"🏷 {cell_name}")
-            response_lines.append(f"💵 Цена покупки: ${price}")
-            response_lines.append(f"💰 У вас: ${current_player.money}")
-            response_lines.append("")
-
-            if current_player.money >= price:
-                response_lines.append("✅ Достаточно средств для покупки!")
-            else:
-                response_lines.append("❌ Недостаточно средств!")
-
-            # Сохраняем информацию о покупке в user_data
-            context.user_data[f'buy_offer_{game.game_id}_{current_player.position}'] = {
-                'game_id': game.game_id,
-                'position': current_player.position,
-                'player_id': user.id,
-                'price': price,
-                'cell_name': cell_name,
-                'player_name': player_name,
-                'double': (dice1 == dice2),
-                'timestamp': datetime.now()
-            }
-
+        offer = result["pending"]
+        if offer and offer["player"] == user.id:
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(f"✅ Купить за ${price}",
-                                      callback_data=f"buy_{game.game_id}_{current_player.position}"),
+                [InlineKeyboardButton(f"✅ Купить за ${offer['price']}",
+                                      callback_data=callback_router.build("buy_", game.game_id, offer["position"])),
                  InlineKeyboardButton("❌ Пропустить",
-                                      callback_data=f"skip_{game.game_id}_{current_player.position}")]
+                                      callback_data=callback_router.build("skip_", game.game_id, offer["position"]))]
             ])
 
-        elif cell_action["action"] == "pay_rent":
-            rent = cell_action.get("rent", 0)
-            owner_id = cell_action.get("owner_id")
-            owner = game.players.get(owner_id) if owner_id else None
-
-            if owner:
-                response_lines.append("")
-                response_lines.append("💸 Чужая собственность!")
-                response_lines.append(f"👤 Владелец: {owner.full_name}")
-                response_lines.append(f"💰 Рента: ${rent}")
-
-                # Автоматически списываем ренту
-                if current_player.deduct_money(rent):
-                    owner.add_money(rent)
-                    response_lines.append("✅ Рента уплачена")
-                else:
-                    response_lines.append("❌ Недостаточно средств!")
-                    current_player.status = "bankrupt"
-
-            # ПЕРЕДАЧА ХОДА БЕЗ КНОПКИ
-            if dice1 != dice2:
-                game.next_turn()
-                next_player = game.get_current_player()
-                if next_player:
-                    response_lines.append("")
-                    response_lines.append(f"⏭️ Ход переходит")
-                    response_lines.append(
-                        f"🎯 {next_player.color if hasattr(next_player, 'color') else '🎲'} {next_player.full_name}")
-            else:
-                response_lines.append("")
-                response_lines.append("🎲 ДУБЛЬ! Ходите еще раз!")
-
-            # НЕ создаем клавиатуру - передача автоматическая
-            keyboard = None
-
-        elif cell_action["action"] == "pay_tax":
-            tax = cell_action.get("amount", 0)
-            response_lines.append(f"💸 Налог: ${tax}")
-            if current_player.deduct_money(tax):
-                game.free_parking_pot += tax
-                response_lines.append("✅ Налог уплачен")
-            else:
-                response_lines.append("❌ Недостаточно средств!")
-
-            # ПЕРЕДАЧА ХОДА БЕЗ КНОПКИ
-            if dice1 != dice2:
-                game.next_turn()
-                next_player = game.get_current_player()
-                if next_player:
-                    response_lines.append("")
-                    response_lines.append(f"⏭️ Ход переходит")
-                    response_lines.append(
-                        f"🎯 {next_player.color if hasattr(next_player, 'color') else '🎲'} {next_player.full_name}")
-            else:
-                response_lines.append("")
-                response_lines.append("🎲 ДУБЛЬ! Ходите еще раз!")
-            # НЕ создаем клавиатуру
-            keyboard = None
-
-        elif cell_action["action"] == "free_parking":
-            response_lines.append("")
-            if game.free_parking_pot > 0:
-                amount = game.free_parking_pot
-                current_player.add_money(amount)
-                game.free_parking_pot = 0
-                response_lines.append("🎉 Бесплатная стоянка!")
-                response_lines.append(f"💰 Вы получаете: ${amount}")
-            else:
-                response_lines.append("🅿️ Бесплатная стоянка")
-                response_lines.append("💰 В банке: $0")
-
-            # ПЕРЕДАЧА ХОДА БЕЗ КНОПКИ
-            if dice1 != dice2:
-                game.next_turn()
-                next_player = game.get_current_player()
-                if next_player:
-                    response_lines.append("")
-                    response_lines.append(f"⏭️ Ход переходит")
-                    response_lines.append(
-                        f"🎯 {next_player.color if hasattr(next_player, 'color') else '🎲'} {next_player.full_name}")
-            else:
-                response_lines.append("")
-                response_lines.append("🎲 ДУБЛЬ! Ходите еще раз!")
-            # НЕ создаем клавиатуру
-            keyboard = None
-
-        elif cell_action["action"] in ["chance_card", "chest_card"]:
-            card = cell_action.get("card")
-            if card:
-                response_lines.append("")
-                card_text = card.get('text', '')
-                response_lines.append(f"🎯 {card_text}")
-                # Применяем действие карты
-                card_result = game.apply_card_action(current_player, card)
-                if card_result.get("message"):
-                    card_msg = card_result['message']
-                    response_lines.append(f"📝 {card_msg}")
-
-            # ПЕРЕДАЧА ХОДА БЕЗ КНОПКИ
-            if dice1 != dice2:
-                game.next_turn()
-                next_player = game.get_current_player()
-                if next_player:
-                    response_lines.append("")
-                    response_lines.append(f"⏭️ Ход переходит")
-                    response_lines.append(
-                        f"🎯 {next_player.color if hasattr(next_player, 'color') else '🎲'} {next_player.full_name}")
-            else:
-                response_lines.append("")
-                response_lines.append("🎲 ДУБЛЬ! Ходите еще раз!")
-            # НЕ создаем клавиатуру
-            keyboard = None
-
-        else:
-            # Для остальных действий
-            if dice1 != dice2:
-                game.next_turn()
-                next_player = game.get_current_player()
-                if next_player:
-                    response_lines.append("")
-                    response_lines.append(f"⏭️ Ход переходит")
-                    response_lines.append(
-                        f"🎯 {next_player.color if hasattr(next_player, 'color') else '🎲'} {next_player.full_name}")
-            else:
-                response_lines.append("")
-                response_lines.append("🎲 ДУБЛЬ! Ходите еще раз!")
-            # НЕ создаем клавиатуру
-            keyboard = None
-
         # Создаем текстовое сообщение
-        text_message = "\n".join(response_lines)
+        text_message = "\n".join(describe_turn_events(game, result["events"]))
 
-        # ПОМЕНЯЙТЕ ЭТОТ БЛОК - УБЕРИТЕ ЗАПАСНОЙ ВАРИАНТ:
         try:
-            # Создаем изображение игрового поля БЕЗ текста
-            board_image = board_renderer.render_board(game_data)
-            img_bytes = board_renderer.save_to_bytes(board_image)
-
-            # Отправляем ТОЛЬКО изображение с текстом как подпись
-            if keyboard:
-                await update.message.reply_photo(
-                    photo=img_bytes,
-                    caption=text_message[:1024],
-                    reply_markup=keyboard
-                )
-            else:
-                await update.message.reply_photo(
-                    photo=img_bytes,
-                    caption=text_message[:1024]
-                )
+            # Обновляем "живое" поле в чате, текст хода - в подписи
+            await update_live_board(
+                context.bot,
+                game,
+                update.message.chat_id,
+                text_message,
+                reply_markup=keyboard
+            )
 
         except Exception as e:
             # ТОЛЬКО если не удалось создать/отправить изображение, отправляем текст
@@ -774,6 +817,7 @@ async def roll_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # Сохраняем игру
         game_manager.save_game_state(game.game_id)
+        await announce_turn_result(game, context, user.id, result)
 
         print(f"=== ROLL COMMAND FINISHED ===\n")
 
@@ -796,64 +840,26 @@ async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         print(f"\n=== BUY COMMAND STARTED ===")
 
-        # Проверяем активное предложение покупки
-        buy_offer = context.user_data.get('buy_offer')
+        game = game_manager.get_player_game(user.id)
+        if not game:
+            await update.message.reply_text("❌ Вы не в игре!")
+            return
 
-        if not buy_offer:
+        # Предложение покупки хранится в состоянии игры
+        buy_offer = game.pending_purchase
+        if not buy_offer or buy_offer["player"] != user.id:
             await update.message.reply_text(
                 "❌ Нет активного предложения покупки!\n\n"
                 "Используйте /buy только когда вам предложили купить собственность."
             )
             return
 
-        # Проверяем, что предложение для этого игрока
-        if buy_offer.get('player_id') != user.id:
-            await update.message.reply_text("❌ Это предложение покупки не для вас!")
-            return
-
-        # Получаем игру
-        game = game_manager.get_game(buy_offer['game_id'])
-        if not game:
-            await update.message.reply_text("❌ Игра не найдена!")
-            return
-
         player = game.players.get(user.id)
-        if not player:
-            await update.message.reply_text("❌ Игрок не найден!")
-            return
 
         # Покупаем собственность
-        success = game.board.buy_property(player, buy_offer['position'])
-
-        # Очищаем предложение покупки
-        context.user_data.pop('buy_offer', None)
-
-        # Подготавливаем данные для отображения
-        players_data = []
-        properties_data = {}
-
-        for player_id, game_player in game.players.items():
-            players_data.append({
-                "id": player_id,
-                "name": game_player.full_name,
-                "position": game_player.position,
-                "color": getattr(game_player, 'color', '🔴'),
-                "money": game_player.money
-            })
-
-        # Собираем обновленную информацию о собственности
-        for board_cell in game.board.cells:
-            if hasattr(board_cell, 'owner_id') and board_cell.owner_id:
-                properties_data[board_cell.id] = {
-                    "owner": board_cell.owner_id,
-                    "houses": getattr(board_cell, 'houses', 0),
-                    "hotel": getattr(board_cell, 'hotel', False)
-                }
-
-        game_data = {
-            "players": players_data,
-            "properties": properties_data
-        }
+        result = game.perform_action(user.id, "buy")
+        success = result["success"]
+        double = has_event(result, "double")
 
         cell = game.board.get_cell(buy_offer['position'])
         cell_name = cell.name if cell else "недвижимость"
@@ -944,21 +950,16 @@ async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             text_lines.append("")
             text_lines.append("🎮 Что дальше:")
-            if buy_offer.get('double'):
+            if double:
                 text_lines.append("🎲 ДУБЛЬ! Ходите еще раз!")
             else:
                 text_lines.append("⏭️ Ход переходит следующему игроку")
 
             # Создаем изображение
             text_message = "\n".join(text_lines)
-            board_image = board_renderer.render_board(game_data)
-            img_bytes = board_renderer.save_to_bytes(board_image)
 
-            # Отправляем изображение с результатом покупки
-            await update.message.reply_photo(
-                photo=img_bytes,
-                caption=text_message[:1024]  # Ограничение Telegram для подписи
-            )
+            # Показываем результат покупки на "живом" поле
+            await update_live_board(context.bot, game, update.message.chat_id, text_message)
 
             # Если текст слишком длинный, отправляем остальное отдельным сообщением
             if len(text_message) > 1024:
@@ -978,51 +979,30 @@ async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                             other_text += f"\n🎨 Группа: {cell.color_group}"
                         other_text += f"\n💰 Цена: ${cell.price if hasattr(cell, 'price') else 0}"
 
-                        other_board_image = board_renderer.render_board(game_data)
-                        other_img_bytes = board_renderer.save_to_bytes(other_board_image)
-
-                        await context.bot.send_photo(
-                            chat_id=other_id,
-                            photo=other_img_bytes,
-                            caption=other_text
+                        await update_live_board(
+                            context.bot,
+                            game,
+                            other_id,
+                            other_text,
+                            profile=Config.NOTIFY_RENDER_PROFILE,
+                            priority=PRIORITY_INFO
                         )
                     except Exception as e:
                         print(f"❌ Не удалось уведомить игрока {other_id}: {e}")
 
-            # Переход хода (если не дубль)
-            if not buy_offer.get('double'):
-                game.next_turn()
-                next_player = game.get_current_player()
-
-                if next_player:
-                    try:
-                        # Уведомляем следующего игрока с изображением
-                        next_text = f"🎯 Ваш ход!\n\nИспользуйте /roll"
-                        next_board_image = board_renderer.render_board(game_data)
-                        next_img_bytes = board_renderer.save_to_bytes(next_board_image)
-
-                        await context.bot.send_photo(
-                            chat_id=next_player.user_id,
-                            photo=next_img_bytes,
-                            caption=next_text
-                        )
-                    except Exception as e:
-                        print(f"❌ Не удалось уведомить следующего игрока: {e}")
-
-                    # Добавляем сообщение о передаче хода текущему игроку
-                    transfer_text = f"⏭️ Ход переходит\n🎯 {next_player.color if hasattr(next_player, 'color') else '🎲'} {next_player.full_name}"
-                    await update.message.reply_text(transfer_text)
-            else:
+            # Ход уже передан движком
+            if double:
                 # При дубле игрок ходит еще раз
                 double_text = f"🎲 ДУБЛЬ!\n🎯 Ходите еще раз!\n\nИспользуйте /roll"
-                double_board_image = board_renderer.render_board(game_data)
-                double_img_bytes = board_renderer.save_to_bytes(double_board_image)
 
-                await context.bot.send_photo(
-                    chat_id=user.id,
-                    photo=double_img_bytes,
-                    caption=double_text
-                )
+                # Поле с результатом покупки уже показано выше
+                await context.bot.send_message(chat_id=user.id, text=double_text)
+            else:
+                transfer_events = [event for event in result["events"] if event["type"] in ("turn", "game_over")]
+                transfer_text = "\n".join(describe_turn_events(game, transfer_events)).strip()
+                if transfer_text:
+                    await update.message.reply_text(transfer_text)
+                await announce_turn_result(game, context, user.id, result)
 
             print(f"=== BUY COMMAND FINISHED SUCCESS ===")
 
@@ -1033,21 +1013,12 @@ async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text_lines.append("")
             text_lines.append(f"🏠 {cell_name}")
             text_lines.append("")
-            text_lines.append("📋 Возможные причины:")
-            text_lines.append("1. Недостаточно денег")
-            text_lines.append("2. Собственность уже куплена")
-            text_lines.append("3. Ошибка системы")
+            text_lines.append(f"📋 Причина: {result['message']}")
 
             text_message = "\n".join(text_lines)
 
-            # Создаем изображение для неудачной покупки
-            board_image = board_renderer.render_board(game_data)
-            img_bytes = board_renderer.save_to_bytes(board_image)
-
-            await update.message.reply_photo(
-                photo=img_bytes,
-                caption=text_message[:1024]
-            )
+            # Показываем неудачную покупку на "живом" поле
+            await update_live_board(context.bot, game, update.message.chat_id, text_message)
 
         # Сохраняем игру
         game_manager.save_game_state(game.game_id)
@@ -1074,49 +1045,21 @@ async def notify_next_player(game, context, current_user_id=None):
 
     print(f"📨 Отправляем уведомление игроку {next_player.full_name} (ID: {next_player.user_id})")
 
-    # Подготавливаем данные для изображения
-    players_data = []
-    properties_data = {}
-
-    for player_id, player in game.players.items():
-        players_data.append({
-            "id": player_id,
-            "name": player.full_name,
-            "position": player.position,
-            "color": getattr(player, 'color', '🔴'),
-            "money": player.money
-        })
-
-    # Собираем информацию о собственности
-    for cell in game.board.cells:
-        if hasattr(cell, 'owner_id') and cell.owner_id:
-            properties_data[cell.id] = {
-                "owner": cell.owner_id,
-                "houses": getattr(cell, 'houses', 0),
-                "hotel": getattr(cell, 'hotel', False)
-            }
-
-    game_data = {
-        "players": players_data,
-        "properties": properties_data
-    }
-
     try:
-        # Создаем изображение игрового поля
-        board_image = board_renderer.render_board(game_data)
-        img_bytes = board_renderer.save_to_bytes(board_image)
-
-        # Отправляем личное сообщение с изображением
+        # Отправляем личное сообщение с изображением (новое - чтобы пришло уведомление)
         next_player_color = next_player.color if hasattr(next_player, 'color') else '🎲'
         caption = f"🎯 ВАШ ХОД, {next_player.full_name}!\n\n"
         caption += f"📊 Игроков: {len(game.players)}\n"
         caption += f"💰 Ваш баланс: ${next_player.money}\n\n"
         caption += f"Используйте /roll чтобы бросить кубики"
 
-        await context.bot.send_photo(
-            chat_id=next_player.user_id,
-            photo=img_bytes,
-            caption=caption
+        await update_live_board(
+            context.bot,
+            game,
+            next_player.user_id,
+            caption,
+            profile=Config.NOTIFY_RENDER_PROFILE,
+            notify=True
         )
         print(f"✅ Уведомление с изображением отправлено игроку {next_player.full_name}")
 
@@ -1127,6 +1070,7 @@ async def notify_next_player(game, context, current_user_id=None):
         try:
             await context.bot.send_message(
                 chat_id=next_player.user_id,
+                rate_limit_args=send_args(PRIORITY_TURN),
                 text=f"🎯 Ваш ход, {next_player.full_name}!\n\nИспользуйте /roll для броска кубиков"
             )
             print(f"✅ Текстовое уведомление отправлено игроку {next_player.full_name}")
@@ -1138,49 +1082,27 @@ async def send_combined_game_board(update: Update, context: ContextTypes.DEFAULT
                                    player_color: str = "🔴") -> bool:
     """Отправляет совмещенное изображение игрового поля с текстом"""
     try:
-        # Подготавливаем данные для рендерера
-        players_data = []
-        properties_data = {}
-
-        for player_id, player in game.players.items():
-            players_data.append({
-                "id": player_id,
-                "name": player.full_name,
-                "position": player.position,
-                "color": getattr(player, 'color', '🔴'),
-                "money": player.money
-            })
-
-        # Собираем информацию о собственности
-        for cell in game.board.cells:
-            if hasattr(cell, 'owner_id') and cell.owner_id:
-                properties_data[cell.id] = {
-                    "owner": cell.owner_id,
-                    "houses": getattr(cell, 'houses', 0),
-                    "hotel": getattr(cell, 'hotel', False)
-                }
-
-        # Генерируем совмещенное изображение
-        game_data = {
-            "players": players_data,
-            "properties": properties_data
-        }
-
-        combined_bytes = get_combined_board_bytes(game_data, caption, player_color)
+        # Подготавливаем данные для отображения
+        game_data = game.render_snapshot()
 
         # Отправляем в Telegram
         if update.callback_query:
-            await update.callback_query.message.reply_photo(
-                photo=combined_bytes,
-                caption=caption[:1024],  # Ограничение Telegram
-                parse_mode="Markdown"
-            )
+            reply_photo = update.callback_query.message.reply_photo
         else:
-            await update.message.reply_photo(
-                photo=combined_bytes,
-                caption=caption[:1024],
-                parse_mode="Markdown"
-            )
+            reply_photo = update.message.reply_photo
+
+        message = await send_board_photo(
+            reply_photo,
+            game_data,
+            text_message=caption,
+            player_color=player_color,
+            caption=caption[:1024],  # Ограничение Telegram
+            parse_mode="Markdown"
+        )
+
+        # Новое поле становится "живым" сообщением чата
+        game.board_messages[message.chat_id] = message.message_id
+        live_boards.seen(message.chat_id, message.message_id)
 
         return True
 
@@ -1197,37 +1119,28 @@ async def skip_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         print(f"\n=== SKIP COMMAND STARTED ===")
 
-        # Проверяем активное предложение покупки
-        buy_offer = context.user_data.get('buy_offer')
+        game = game_manager.get_player_game(user.id)
+        if not game:
+            await update.message.reply_text("❌ Вы не в игре!")
+            return
 
-        if not buy_offer:
+        # Предложение покупки хранится в состоянии игры
+        buy_offer = game.pending_purchase
+        if not buy_offer or buy_offer["player"] != user.id:
             await update.message.reply_text(
                 "❌ Нет активного предложения покупки!\n\n"
                 "Используйте /skip только когда вам предложили купить собственность."
             )
             return
 
-        # Проверяем, что предложение для этого игрока
-        if buy_offer.get('player_id') != user.id:
-            await update.message.reply_text("❌ Это предложение покупки не для вас!")
-            return
-
-        # Получаем игру
-        game = game_manager.get_game(buy_offer['game_id'])
-        if not game:
-            await update.message.reply_text("❌ Игра не найдена!")
-            return
-
         player = game.players.get(user.id)
-        if not player:
-            await update.message.reply_text("❌ Игрок не найден!")
+        result = game.perform_action(user.id, "skip")
+        if not result["success"]:
+            await update.message.reply_text(f"❌ {result['message']}")
             return
 
         cell = game.board.get_cell(buy_offer['position'])
 
-        # Очищаем предложение покупки
-        context.user_data.pop('buy_offer', None)
-
         # Формируем текст уведомления
         response_lines = []
         response_lines.append("⏭️ ПОКУПКА ПРОПУЩЕНА")
@@ -1236,33 +1149,12 @@ async def skip_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         response_lines.append(f"💰 Цена: ${cell.price if hasattr(cell, 'price') else 0}")
         response_lines.append(f"🏦 Ваш баланс: ${player.money}")
 
-        # Проверяем дубль
-        if buy_offer.get('double'):
-            response_lines.append("")
-            response_lines.append("🎲 ДУБЛЬ!")
-            response_lines.append("🎯 Ходите еще раз!")
+        # Дубль или передача хода - по событиям движка
+        response_lines.extend(describe_turn_events(
+            game, [event for event in result["events"] if event["type"] in ("double", "turn", "game_over")]))
+        if has_event(result, "double"):
             response_lines.append("")
             response_lines.append("Используйте /roll")
-            # При дубле НЕ передаем ход
-        else:
-            # Переход хода ТОЛЬКО если не дубль
-            game.next_turn()
-            next_player = game.get_current_player()
-
-            response_lines.append("")
-            response_lines.append("⏭️ Ход переходит")
-            response_lines.append(
-                f"🎯 {next_player.color if hasattr(next_player, 'color') else '🎲'} {next_player.full_name}")
-
-            # Уведомляем следующего игрока
-            if next_player and next_player.user_id != user.id:  # Проверяем, что это не тот же игрок
-                try:
-                    await context.bot.send_message(
-                        chat_id=next_player.user_id,
-                        text=f"🎯 Ваш ход!\n\nИспользуйте /roll"
-                    )
-                except Exception as e:
-                    print(f"❌ Не удалось уведомить следующего игрока: {e}")
 
         text_message = "\n".join(response_lines)
 
@@ -1271,6 +1163,7 @@ async def skip_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # Сохраняем игру
         game_manager.save_game_state(game.game_id)
+        await announce_turn_result(game, context, user.id, result)
 
         print(f"=== SKIP COMMAND FINISHED SUCCESS ===")
 
@@ -1362,6 +1255,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /roll - Бросить кубики
 /myid - Узнать свой ID
 /games - Список доступных игр
+/analytics - Окупаемость улиц и домов
 /leave - Покинуть игру
 /help - Правила игры"""
 
@@ -1417,1163 +1311,1011 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ========== ОБРАБОТЧИКИ КНОПОК ==========
 
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработчик всех кнопок"""
+async def buy_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, position: int):
+    """Кнопка покупки собственности"""
     query = update.callback_query
-    await query.answer()
-
-    data = query.data
     user = query.from_user
+    print(f"🎯 Кнопка ПОКУПКА нажата")
 
-    # ДОБАВЬТЕ ЭТОТ ОТЛАДОЧНЫЙ ВЫВОД
-    print(f"\n🔘 ========== КНОПКА НАЖАТА ==========")
-    print(f"👤 Пользователь: {user.id} ({user.full_name})")
-    print(f"📱 Callback_data: {data}")
-    print(f"💬 Chat ID: {query.message.chat_id}")
-    print(f"📄 Message ID: {query.message.message_id}")
-    print(f"=====================================\n")
-
-    try:
-        # ========== ОБРАБОТКА КНОПКИ ПОКУПКИ ==========
-        if data.startswith("buy_"):
-            print(f"🎯 Кнопка ПОКУПКА нажата")
-            parts = data.split("_")
-            print(f"🔍 Части callback_data: {parts}")
+    print(f"✅ Извлечено: game_id={game_id}, position={position}")
 
-            if len(parts) >= 3:
-                game_id = parts[1]
-                position = int(parts[2])
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена", show_alert=True)
+        return
 
-                print(f"✅ Извлечено: game_id={game_id}, position={position}")
+    player = game.players.get(user.id)
+    if not player:
+        await query.answer("❌ Вы не в этой игре", show_alert=True)
+        return
 
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена", show_alert=True)
-                    return
+    # Проверки хода, предложения и денег - в движке
+    result = game.perform_action(user.id, "buy", position=position)
+    if not result["success"]:
+        await query.answer(f"❌ {result['message']}", show_alert=True)
+        return
 
-                player = game.players.get(user.id)
-                if not player:
-                    await query.answer("❌ Вы не в этой игре", show_alert=True)
-                    return
+    print(f"✅ Покупка успешна!")
+    cell = game.board.get_cell(position)
+    price = cell.price
+    double = has_event(result, "double")
+
+    # Формируем основной текст
+    text_lines = []
+    text_lines.append(f"✅ {player.full_name} купил(а) {cell.name} за ${price}!")
+    text_lines.append("")
+    text_lines.append(f"💰 Баланс: ${player.money}")
+    text_lines.append("")
+
+    # Считаем количество собственности
+    properties_count = len(getattr(player, 'properties', []))
+    stations_count = len(getattr(player, 'stations', []))
+    utilities_count = len(getattr(player, 'utilities', []))
+
+    text_lines.append("🎲 Теперь у вас:")
+    text_lines.append(f"• Улиц: {properties_count}")
+    text_lines.append(f"• Вокзалов: {stations_count}")
+    text_lines.append(f"• Предприятий: {utilities_count}")
+
+    # Дубль или передача хода - по событиям движка
+    text_lines.extend(describe_turn_events(
+        game, [event for event in result["events"] if event["type"] in ("double", "turn", "game_over")]))
+    if double:
+        text_lines.append("")
+        text_lines.append("Используйте /roll")
+
+    # Объединяем все строки
+    final_response = "\n".join(text_lines)
+
+    # Обновляем сообщение
+    await query.edit_message_caption(
+        caption=final_response,
+        parse_mode=None,
+        reply_markup=None
+    )
 
-                # Дополнительная проверка на текущего игрока
-                current_player = game.get_current_player()
-                if current_player and current_player.user_id != user.id:
-                    await query.answer(f"❌ Сейчас ходит {current_player.full_name}!", show_alert=True)
-                    return
-
-                cell = game.board.get_cell(position)
-                if not cell:
-                    await query.answer("❌ Клетка не найдена", show_alert=True)
-                    return
-
-                # Проверяем, что клетка свободна
-                if cell.owner_id:
-                    await query.answer("❌ Собственность уже куплена", show_alert=True)
-                    return
-
-                # Проверяем деньги
-                price = cell.price if hasattr(cell, 'price') else 0
-                if player.money < price:
-                    await query.answer(f"❌ Недостаточно денег! Нужно ${price}", show_alert=True)
-                    return
-
-                # Покупаем собственность
-                success = game.board.buy_property(player, position)
-
-                if success:
-                    print(f"✅ Покупка успешна!")
-
-                    # Очищаем предложение покупки
-                    key = f'buy_offer_{game_id}_{position}'
-                    context.user_data.pop(key, None)
-
-                    # Проверяем дубль
-                    double = False
-                    buy_offer_key = f'buy_offer_{game_id}_{position}'
-                    if buy_offer_key in context.user_data:
-                        double = context.user_data[buy_offer_key].get('double', False)
-                        context.user_data.pop(buy_offer_key, None)
-
-                    # Формируем основной текст
-                    text_lines = []
-                    text_lines.append(f"✅ {player.full_name} купил(а) {cell.name} за ${price}!")
-                    text_lines.append("")
-                    text_lines.append(f"💰 Баланс: ${player.money}")
-                    text_lines.append("")
-
-                    # Считаем количество собственности
-                    properties_count = len(getattr(player, 'properties', []))
-                    stations_count = len(getattr(player, 'stations', []))
-                    utilities_count = len(getattr(player, 'utilities', []))
-
-                    text_lines.append("🎲 Теперь у вас:")
-                    text_lines.append(f"• Улиц: {properties_count}")
-                    text_lines.append(f"• Вокзалов: {stations_count}")
-                    text_lines.append(f"• Предприятий: {utilities_count}")
-                    text_lines.append("")
-
-                    if not double:
-                        # Переход хода
-                        game.next_turn()
-
-                        # Получаем следующего игрока
-                        next_player = game.get_current_player()
-                        if next_player:
-                            text_lines.append(f"⏭️ Ход переходит")
-                            text_lines.append(f"🎯 {next_player.full_name}")
-
-                    else:
-                        # При дубле игрок ходит еще раз
-                        text_lines.append("🎲 ДУБЛЬ!")
-                        text_lines.append("🎯 Ходите еще раз!")
-                        text_lines.append("")
-                        text_lines.append("Используйте /roll")
-
-                    # Объединяем все строки
-                    final_response = "\n".join(text_lines)
-
-                    # Обновляем сообщение
-                    await query.edit_message_caption(
-                        caption=final_response,
-                        parse_mode=None,
-                        reply_markup=None
-                    )
+    if double:
+        # При дубле отправляем сообщение игроку
+        await context.bot.send_message(
+            chat_id=user.id,
+            text=f"🎲 ДУБЛЬ!\n🎯 Ходите еще раз!\n\nИспользуйте /roll"
+        )
+    else:
+        try:
+            await announce_turn_result(game, context, user.id, result)
+        except Exception as e:
+            print(f"❌ Не удалось уведомить следующего игрока: {e}")
 
-                    if not double:
-                        # Уведомляем следующего игрока
-                        next_player = game.get_current_player()
-                        if next_player and next_player.user_id != user.id:
-                            try:
-                                await notify_next_player(game, context, user.id)
-                            except Exception as e:
-                                print(f"❌ Не удалось уведомить следующего игрока: {e}")
-                    else:
-                        # При дубле отправляем сообщение игроку
-                        await context.bot.send_message(
-                            chat_id=user.id,
-                            text=f"🎲 ДУБЛЬ!\n🎯 Ходите еще раз!\n\nИспользуйте /roll"
-                        )
+    game_manager.save_game_state(game_id)
 
-                    game_manager.save_game_state(game_id)
+    # Уведомляем других игроков
+    for other_id, other_player in game.players.items():
+        if other_id != user.id:
+            try:
+                next_player_info = ""
+                if has_event(result, "turn"):
+                    next_player = game.get_current_player()
+                    if next_player:
+                        next_player_info = f"\n⏭️ Следующий ход: {next_player.full_name}"
+
+                await context.bot.send_message(
+                    chat_id=other_id,
+                    rate_limit_args=send_args(PRIORITY_INFO),
+                    text=f"🏠 {player.full_name} купил(а) {cell.name} за ${price}!\n"
+                         f"💰 Баланс игрока: ${player.money}"
+                         f"{next_player_info}"
+                )
+            except Exception as e:
+                print(f"❌ Не удалось уведомить игрока {other_id}: {e}")
 
-                    # Уведомляем других игроков
-                    for other_id, other_player in game.players.items():
-                        if other_id != user.id:
-                            try:
-                                next_player_info = ""
-                                if not double:
-                                    next_player = game.get_current_player()
-                                    if next_player:
-                                        next_player_info = f"\n⏭️ Следующий ход: {next_player.full_name}"
-
-                                await context.bot.send_message(
-                                    chat_id=other_id,
-                                    text=f"🏠 {player.full_name} купил(а) {cell.name} за ${price}!\n"
-                                         f"💰 Баланс игрока: ${player.money}"
-                                         f"{next_player_info}"
-                                )
-                            except Exception as e:
-                                print(f"❌ Не удалось уведомить игрока {other_id}: {e}")
 
-                else:
-                    await query.answer("❌ Не удалось купить", show_alert=True)
-            else:
-                print(f"❌ Неверный формат callback_data для покупки: {data}")
-                await query.answer("❌ Ошибка формата кнопки", show_alert=True)
+# ========== ОБРАБОТКА КНОПКИ ПРОПУСКА ==========
 
-            return
 
-        # ========== ОБРАБОТКА КНОПКИ ПРОПУСКА ==========
-        elif data.startswith("skip_"):
-            print(f"🎯 Кнопка ПРОПУСК нажата")
-            parts = data.split("_")
-            print(f"🔍 Части callback_data: {parts}")
-
-            if len(parts) >= 3:
-                game_id = parts[1]
-                position = int(parts[2])
-
-                print(f"✅ Извлечено: game_id={game_id}, position={position}")
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена", show_alert=True)
-                    return
-
-                player = game.players.get(user.id)
-                if not player:
-                    await query.answer("❌ Вы не в этой игре", show_alert=True)
-                    return
-
-                cell = game.board.get_cell(position)
-                if not cell:
-                    await query.answer("❌ Клетка не найдена", show_alert=True)
-                    return
-
-                # Очищаем предложение покупки
-                key = f'buy_offer_{game_id}_{position}'
-                context.user_data.pop(key, None)
-
-                # Проверяем дубль
-                double = False
-                buy_offer_key = f'buy_offer_{game_id}_{position}'
-                if buy_offer_key in context.user_data:
-                    double = context.user_data[buy_offer_key].get('double', False)
-                    context.user_data.pop(buy_offer_key, None)
-
-                # Формируем текст
-                text_lines = []
-                text_lines.append(f"⏭️ {player.full_name} пропустил(а) покупку {cell.name}")
-                text_lines.append("")
-                text_lines.append(f"💵 Цена: ${cell.price if hasattr(cell, 'price') else 0}")
-                text_lines.append(f"💰 Ваш баланс: ${player.money}")
-                text_lines.append("")
-
-                if not double:
-                    # Переход хода ТОЛЬКО если не дубль
-                    game.next_turn()
-
-                    # Получаем следующего игрока
+async def skip_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, position: int):
+    """Кнопка пропуска покупки"""
+    query = update.callback_query
+    user = query.from_user
+    print(f"🎯 Кнопка ПРОПУСК нажата")
+
+    print(f"✅ Извлечено: game_id={game_id}, position={position}")
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена", show_alert=True)
+        return
+
+    player = game.players.get(user.id)
+    if not player:
+        await query.answer("❌ Вы не в этой игре", show_alert=True)
+        return
+
+    result = game.perform_action(user.id, "skip", position=position)
+    if not result["success"]:
+        await query.answer(f"❌ {result['message']}", show_alert=True)
+        return
+
+    cell = game.board.get_cell(position)
+    double = has_event(result, "double")
+
+    # Формируем текст
+    text_lines = []
+    text_lines.append(f"⏭️ {player.full_name} пропустил(а) покупку {cell.name}")
+    text_lines.append("")
+    text_lines.append(f"💵 Цена: ${cell.price if hasattr(cell, 'price') else 0}")
+    text_lines.append(f"💰 Ваш баланс: ${player.money}")
+
+    # Дубль или передача хода - по событиям движка
+    text_lines.extend(describe_turn_events(
+        game, [event for event in result["events"] if event["type"] in ("double", "turn", "game_over")]))
+    if double:
+        text_lines.append("")
+        text_lines.append("Используйте /roll")
+
+    # Объединяем все строки
+    final_response = "\n".join(text_lines)
+
+    # Обновляем сообщение
+    await query.edit_message_caption(
+        caption=final_response,
+        parse_mode=None,
+        reply_markup=None
+    )
+
+    if double:
+        # При дубле отправляем сообщение игроку
+        await context.bot.send_message(
+            chat_id=user.id,
+            text=f"🎲 ДУБЛЬ!\n🎯 Ходите еще раз!\n\nИспользуйте /roll"
+        )
+    else:
+        try:
+            await announce_turn_result(game, context, user.id, result)
+        except Exception as e:
+            print(f"❌ Не удалось уведомить следующего игрока: {e}")
+
+    game_manager.save_game_state(game_id)
+
+    # Уведомляем других игроков о пропуске
+    for other_id, other_player in game.players.items():
+        if other_id != user.id:
+            try:
+                other_text = f"⏭️ {player.full_name} пропустил(а) покупку {cell.name}"
+
+                # Добавляем информацию о следующем игроке только если ход перешел
+                if has_event(result, "turn"):
                     next_player = game.get_current_player()
                     if next_player:
-                        text_lines.append(f"⏭️ Ход переходит")
-                        text_lines.append(f"🎯 {next_player.full_name}")
+                        other_text += f"\n⏭️ Следующий ход: {next_player.full_name}"
 
-                else:
-                    # При дубле игрок ходит еще раз
-                    text_lines.append("🎲 ДУБЛЬ!")
-                    text_lines.append("🎯 Ходите еще раз!")
-                    text_lines.append("")
-                    text_lines.append("Используйте /roll")
-
-                # Объединяем все строки
-                final_response = "\n".join(text_lines)
-
-                # Обновляем сообщение
-                await query.edit_message_caption(
-                    caption=final_response,
-                    parse_mode=None,
-                    reply_markup=None
+                await context.bot.send_message(
+                    chat_id=other_id,
+                    rate_limit_args=send_args(PRIORITY_INFO),
+                    text=other_text
                 )
+            except Exception as e:
+                print(f"❌ Не удалось уведомить игрока {other_id}: {e}")
 
-                if not double:
-                    # Уведомляем следующего игрока ТОЛЬКО если не дубль
-                    next_player = game.get_current_player()
-                    if next_player and next_player.user_id != user.id:
-                        try:
-                            await notify_next_player(game, context, user.id)
-                        except Exception as e:
-                            print(f"❌ Не удалось уведомить следующего игрока: {e}")
-                else:
-                    # При дубле отправляем сообщение игроку
+
+# ========== ОБРАБОТКА КНОПОК ТОРГОВЛИ ==========
+# 1. Кнопка ПРИНЯТЬ сделку
+
+
+async def trade_accept_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, trade_id: str):
+    """Кнопка принятия сделки"""
+    query = update.callback_query
+    user = query.from_user
+    print(f"🎯 Кнопка ПРИНЯТЬ сделку нажата")
+    print(f"🔍 Trade ID: {trade_id}")
+
+    # Находим игру с этой сделкой
+    game = None
+    for game_obj in game_manager.games.values():
+        if hasattr(game_obj, 'trade_manager'):
+            trade = game_obj.trade_manager.get_trade(trade_id)
+            if trade:
+                game = game_obj
+                break
+
+    if not game:
+        await query.answer("❌ Предложение не найдено или истекло!", show_alert=True)
+        await query.edit_message_text("❌ *Предложение не найдено или истекло!*", parse_mode="Markdown")
+        return
+
+    print(f"✅ Игра найдена: {game.game_id}")
+
+    # Проверяем, что пользователь может принять сделку
+    if trade.to_player_id != user.id:
+        await query.answer("❌ Это предложение не для вас!", show_alert=True)
+        return
+
+    # Принимаем сделку
+    result = game.accept_trade(trade_id, user.id)
+
+    if result.get('success'):
+        # Обновляем сообщение у получателя
+        await query.edit_message_text(
+            f"✅ *СДЕЛКА ПРИНЯТА!*\n\n"
+            f"🎉 Вы приняли предложение об обмене.\n\n"
+            f"📊 *Детали сделки:*\n"
+            f"• Обмен успешно выполнен\n"
+            f"• Деньги и собственность переведены\n"
+            f"• Сделка завершена",
+            parse_mode="Markdown"
+        )
+
+        # Уведомляем отправителя
+        from_player = game.players.get(trade.from_player_id)
+        if from_player:
+            try:
+                await context.bot.send_message(
+                    chat_id=from_player.user_id,
+                    text=f"🎉 *ВАШЕ ПРЕДЛОЖЕНИЕ ПРИНЯТО!*\n\n"
+                         f"👤 Игрок {game.players[trade.to_player_id].full_name} принял(а) ваше предложение.\n\n"
+                         f"📊 *Детали сделки:*\n"
+                         f"• Сделка успешно завершена\n"
+                         f"• Все активности обменяны\n"
+                         f"• ID сделки: `{trade_id}`",
+                    parse_mode="Markdown"
+                )
+            except Exception as e:
+                print(f"❌ Не удалось уведомить отправителя: {e}")
+
+        # Уведомляем всех игроков в игре
+        for player_id, player in game.players.items():
+            if player_id not in [trade.from_player_id, trade.to_player_id]:
+                try:
                     await context.bot.send_message(
-                        chat_id=user.id,
-                        text=f"🎲 ДУБЛЬ!\n🎯 Ходите еще раз!\n\nИспользуйте /roll"
+                        chat_id=player_id,
+                        rate_limit_args=send_args(PRIORITY_INFO),
+                        text=f"🤝 *СДЕЛКА ЗАВЕРШЕНА!*\n\n"
+                             f"🎮 Игроки {game.players[trade.from_player_id].full_name} и "
+                             f"{game.players[trade.to_player_id].full_name} завершили сделку.\n"
+                             f"📊 ID сделки: `{trade_id}`",
+                        parse_mode="Markdown"
                     )
+                except Exception as e:
+                    print(f"❌ Не удалось уведомить игрока {player_id}: {e}")
 
-                game_manager.save_game_state(game_id)
-
-                # Уведомляем других игроков о пропуске
-                for other_id, other_player in game.players.items():
-                    if other_id != user.id:
-                        try:
-                            other_text = f"⏭️ {player.full_name} пропустил(а) покупку {cell.name}"
-
-                            # Добавляем информацию о следующем игроке только если не дубль
-                            if not double:
-                                next_player = game.get_current_player()
-                                if next_player:
-                                    other_text += f"\n⏭️ Следующий ход: {next_player.full_name}"
-
-                            await context.bot.send_message(
-                                chat_id=other_id,
-                                text=other_text
-                            )
-                        except Exception as e:
-                            print(f"❌ Не удалось уведомить игрока {other_id}: {e}")
-            else:
-                print(f"❌ Неверный формат callback_data для пропуска: {data}")
-                await query.answer("❌ Ошибка формата кнопки", show_alert=True)
+    else:
+        error_msg = result.get('error', 'Неизвестная ошибка')
+        await query.answer(f"❌ Ошибка: {error_msg}", show_alert=True)
+        await query.edit_message_text(
+            f"❌ *Не удалось завершить сделку:* {error_msg}",
+            parse_mode="Markdown"
+        )
 
-            return
 
-        # ========== ОБРАБОТКА КНОПОК ТОРГОВЛИ ==========
-
-        # 1. Кнопка ПРИНЯТЬ сделку
-        if data.startswith("trade_accept_"):
-            print(f"🎯 Кнопка ПРИНЯТЬ сделку нажата")
-            trade_id = data.replace("trade_accept_", "")
-            print(f"🔍 Trade ID: {trade_id}")
-
-            # Находим игру с этой сделкой
-            game = None
-            for game_obj in game_manager.games.values():
-                if hasattr(game_obj, 'trade_manager'):
-                    trade = game_obj.trade_manager.get_trade(trade_id)
-                    if trade:
-                        game = game_obj
-                        break
-
-            if not game:
-                await query.answer("❌ Предложение не найдено или истекло!", show_alert=True)
-                await query.edit_message_text("❌ *Предложение не найдено или истекло!*", parse_mode="Markdown")
-                return
+# 2. Кнопка ОТКЛОНИТЬ сделку
 
-            print(f"✅ Игра найдена: {game.game_id}")
 
-            # Проверяем, что пользователь может принять сделку
-            if trade.to_player_id != user.id:
-                await query.answer("❌ Это предложение не для вас!", show_alert=True)
-                return
+async def trade_reject_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, trade_id: str):
+    """Кнопка отклонения сделки"""
+    query = update.callback_query
+    user = query.from_user
+    print(f"🎯 Кнопка ОТКЛОНИТЬ сделку нажата")
+    print(f"🔍 Trade ID: {trade_id}")
+
+    # Находим игру с этой сделкой
+    game = None
+    for game_obj in game_manager.games.values():
+        if hasattr(game_obj, 'trade_manager'):
+            trade = game_obj.trade_manager.get_trade(trade_id)
+            if trade:
+                game = game_obj
+                break
+
+    if not game:
+        await query.answer("❌ Предложение не найдено!", show_alert=True)
+        await query.edit_message_text("❌ *Предложение не найдено!*", parse_mode="Markdown")
+        return
+
+    # Проверяем, что пользователь может отклонить сделку
+    if trade.to_player_id != user.id:
+        await query.answer("❌ Это предложение не для вас!", show_alert=True)
+        return
+
+    # Отклоняем сделку
+    result = game.reject_trade(trade_id, user.id)
+
+    if result.get('success'):
+        # Обновляем сообщение у получателя
+        await query.edit_message_text(
+            f"❌ *СДЕЛКА ОТКЛОНЕНА!*\n\n"
+            f"Вы отклонили предложение об обмене.\n\n"
+            f"📊 *Детали:*\n"
+            f"• Предложение удалено\n"
+            f"• Обмен не состоялся\n"
+            f"• Сделка отменена",
+            parse_mode="Markdown"
+        )
 
-            # Принимаем сделку
-            result = game.accept_trade(trade_id, user.id)
-
-            if result.get('success'):
-                # Обновляем сообщение у получателя
-                await query.edit_message_text(
-                    f"✅ *СДЕЛКА ПРИНЯТА!*\n\n"
-                    f"🎉 Вы приняли предложение об обмене.\n\n"
-                    f"📊 *Детали сделки:*\n"
-                    f"• Обмен успешно выполнен\n"
-                    f"• Деньги и собственность переведены\n"
-                    f"• Сделка завершена",
+        # Уведомляем отправителя
+        from_player = game.players.get(trade.from_player_id)
+        if from_player:
+            try:
+                await context.bot.send_message(
+                    chat_id=from_player.user_id,
+                    text=f"❌ *ВАШЕ ПРЕДЛОЖЕНИЕ ОТКЛОНЕНО!*\n\n"
+                         f"👤 Игрок {game.players[trade.to_player_id].full_name} отклонил(а) ваше предложение.\n\n"
+                         f"📊 *Детали:*\n"
+                         f"• Предложение отклонено\n"
+                         f"• Обмен не состоялся\n"
+                         f"• ID сделки: `{trade_id}`",
                     parse_mode="Markdown"
                 )
+            except Exception as e:
+                print(f"❌ Не удалось уведомить отправителя: {e}")
+    else:
+        error_msg = result.get('error', 'Неизвестная ошибка')
+        await query.answer(f"❌ Ошибка: {error_msg}", show_alert=True)
 
-                # Уведомляем отправителя
-                from_player = game.players.get(trade.from_player_id)
-                if from_player:
-                    try:
-                        await context.bot.send_message(
-                            chat_id=from_player.user_id,
-                            text=f"🎉 *ВАШЕ ПРЕДЛОЖЕНИЕ ПРИНЯТО!*\n\n"
-                                 f"👤 Игрок {game.players[trade.to_player_id].full_name} принял(а) ваше предложение.\n\n"
-                                 f"📊 *Детали сделки:*\n"
-                                 f"• Сделка успешно завершена\n"
-                                 f"• Все активности обменяны\n"
-                                 f"• ID сделки: `{trade_id}`",
-                            parse_mode="Markdown"
+
+# Обработка кнопок тюрьмы
+
+
+async def jail_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str, game_id: str):
+    """Кнопки тюрьмы"""
+    query = update.callback_query
+    user = query.from_user
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена!", show_alert=True)
+        return
+
+    player = game.players.get(user.id)
+    if not player:
+        await query.answer("❌ Вы не в этой игре", show_alert=True)
+        return
+
+    # roll / pay / card / skip -> jail_roll / jail_pay / jail_card / jail_skip
+    result = game.perform_action(user.id, f"jail_{action}")
+    if not result["success"]:
+        await query.answer(f"❌ {result['message']}", show_alert=True)
+        return
+
+    response = "\n".join(describe_turn_events(game, result["events"]))
+    await query.edit_message_text(response)
+    game_manager.save_game_state(game_id)
+
+    # Уведомляем следующего игрока, если ход перешел
+    await announce_turn_result(game, context, user.id, result)
+
+
+# ========== ОБРАБОТКА ТОРГОВЛИ ==========
+# Выбор игрока для торговли
+
+
+async def trade_select_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, to_player_id: int):
+    """Выбор игрока для торговли"""
+    query = update.callback_query
+    user = query.from_user
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.edit_message_text("❌ Игра не найдена!")
+        return
+
+    # Проверяем, что игрок может торговать
+    current_player = game.get_current_player()
+    if not current_player or current_player.user_id != user.id:
+        await query.answer("❌ Сейчас не ваш ход!", show_alert=True)
+        return
+
+    # Сохраняем данные торговли
+    trade_key = f"trade_{user.id}_{to_player_id}"
+    context.user_data[trade_key] = {
+        'game_id': game_id,
+        'from_player_id': user.id,
+        'to_player_id': to_player_id,
+        'step': 'offer',
+        'offer': {'money': 0, 'properties': []},
+        'request': {'money': 0, 'properties': []}
+    }
+
+    # Показываем выбор предложения
+    try:
+        from src.frontend.trade_interface import create_trade_offer_selection
+        text, keyboard = create_trade_offer_selection(
+            game, user.id, to_player_id, 'offer'
+        )
+        await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
+    except ImportError:
+        await query.edit_message_text(
+            f"🤝 *ТОРГОВЛЯ С {game.players[to_player_id].full_name}*\n\n"
+            f"Выберите что предлагаете:",
+            parse_mode="Markdown"
+        )
+
+
+# Выбор денег в сделке
+
+
+async def trade_money_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, from_player_id: int, to_player_id: int, action: str):
+    """Выбор суммы в сделке"""
+    query = update.callback_query
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена!", show_alert=True)
+        return
+
+    # Сохраняем состояние для ввода суммы
+    context.user_data['awaiting_trade_money'] = {
+        'game_id': game_id,
+        'from_player_id': from_player_id,
+        'to_player_id': to_player_id,
+        'action': action,
+        'message_id': query.message.message_id,
+        'chat_id': query.message.chat_id
+    }
+
+    player = game.players[from_player_id] if action == 'offer' else game.players[to_player_id]
+    max_money = player.money
+
+    await query.edit_message_text(
+        f"💰 *ВВЕДИТЕ СУММУ ДЕНЕГ*\n\n"
+        f"Максимально: ${max_money}\n\n"
+        f"📝 *Отправьте число в чат:*\n"
+        f"(например: 100, 500, 1000)\n\n"
+        f"❌ Для отмены используйте /cancel",
+        parse_mode="Markdown"
+    )
+
+
+# Выбор собственности в сделке
+
+
+async def trade_prop_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, from_player_id: int, to_player_id: int, prop_id: int, action: str):
+    """Выбор собственности в сделке"""
+    query = update.callback_query
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена!", show_alert=True)
+        return
+
+    # Получаем данные торговли
+    trade_key = f"trade_{from_player_id}_{to_player_id}"
+    trade_data = context.user_data.get(trade_key)
+
+    if not trade_data:
+        await query.answer("❌ Данные торговли утеряны!", show_alert=True)
+        return
+
+    # Добавляем или удаляем собственность
+    target_dict = trade_data['offer'] if action == 'offer' else trade_data['request']
+
+    if prop_id in target_dict['properties']:
+        target_dict['properties'].remove(prop_id)
+        await query.answer("✅ Собственность удалена из сделки")
+    else:
+        target_dict['properties'].append(prop_id)
+        await query.answer("✅ Собственность добавлена в сделку")
+
+    # Сохраняем изменения
+    context.user_data[trade_key] = trade_data
+
+    # Обновляем интерфейс
+    try:
+        from src.frontend.trade_interface import create_trade_offer_selection
+        text, keyboard = create_trade_offer_selection(
+            game, from_player_id, to_player_id,
+            trade_data['step'], trade_data['offer'], trade_data['request']
+        )
+        await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
+    except ImportError:
+        await query.answer("✅ Собственность обновлена")
+
+
+# Следующий шаг
+
+
+async def trade_next_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, from_player_id: int, to_player_id: int, action: str):
+    """Следующий шаг составления сделки"""
+    query = update.callback_query
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена!", show_alert=True)
+        return
+
+    trade_key = f"trade_{from_player_id}_{to_player_id}"
+    trade_data = context.user_data.get(trade_key)
+
+    if not trade_data:
+        await query.answer("❌ Данные торговли утеряны!", show_alert=True)
+        return
+
+    # Переходим к следующему шагу
+    if trade_data['step'] == 'offer':
+        trade_data['step'] = 'request'
+        try:
+            from src.frontend.trade_interface import create_trade_offer_selection
+            text, keyboard = create_trade_offer_selection(
+                game, from_player_id, to_player_id,
+                'request', trade_data['offer'], trade_data['request']
+            )
+        except ImportError:
+            text = f"🤝 *ЧТО ПРОСИТЕ ВЗАМЕН?*\n\nВыберите что хотите получить от {game.players[to_player_id].full_name}"
+            keyboard = None
+    elif trade_data['step'] == 'request':
+        trade_data['step'] = 'confirm'
+        try:
+            from src.frontend.trade_interface import create_trade_confirmation
+            text, keyboard = create_trade_confirmation(
+                game, from_player_id, to_player_id,
+                trade_data['offer'], trade_data['request']
+            )
+        except ImportError:
+            text = f"🤝 *ПОДТВЕРЖДЕНИЕ СДЕЛКИ*\n\nГотовы отправить предложение?"
+            keyboard = None
+
+    context.user_data[trade_key] = trade_data
+    await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
+
+
+# Назад
+
+
+async def trade_back_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, from_player_id: int, to_player_id: int):
+    """Возврат к предыдущему шагу сделки"""
+    query = update.callback_query
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена!", show_alert=True)
+        return
+
+    trade_key = f"trade_{from_player_id}_{to_player_id}"
+    trade_data = context.user_data.get(trade_key)
+
+    if not trade_data:
+        await query.answer("❌ Данные торговли утеряны!", show_alert=True)
+        return
+
+    # Возвращаемся к предыдущему шагу
+    if trade_data['step'] == 'request':
+        trade_data['step'] = 'offer'
+        try:
+            from src.frontend.trade_interface import create_trade_offer_selection
+            text, keyboard = create_trade_offer_selection(
+                game, from_player_id, to_player_id,
+                'offer', trade_data['offer'], trade_data['request']
+            )
+            await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
+        except ImportError:
+            await query.edit_message_text("↩️ Возврат к выбору предложения")
+
+    context.user_data[trade_key] = trade_data
+
+
+# Сброс
+
+
+async def trade_reset_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, from_player_id: int, to_player_id: int, action: str):
+    """Сброс выбора в сделке"""
+    query = update.callback_query
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена!", show_alert=True)
+        return
+
+    trade_key = f"trade_{from_player_id}_{to_player_id}"
+    trade_data = context.user_data.get(trade_key)
+
+    if not trade_data:
+        await query.answer("❌ Данные торговли утеряны!", show_alert=True)
+        return
+
+    # Сбрасываем текущий шаг
+    if action == 'offer':
+        trade_data['offer'] = {'money': 0, 'properties': []}
+    else:
+        trade_data['request'] = {'money': 0, 'properties': []}
+
+    context.user_data[trade_key] = trade_data
+
+    # Обновляем интерфейс
+    try:
+        from src.frontend.trade_interface import create_trade_offer_selection
+        text, keyboard = create_trade_offer_selection(
+            game, from_player_id, to_player_id,
+            trade_data['step'], trade_data['offer'], trade_data['request']
+        )
+        await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
+    except ImportError:
+        await query.answer("🔄 Текущий выбор сброшен", show_alert=True)
+
+
+# Отправка предложения
+
+
+async def trade_send_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str, from_player_id: int, to_player_id: int):
+    """Отправка предложения сделки"""
+    query = update.callback_query
+
+    game = game_manager.get_game(game_id)
+    if not game:
+        await query.answer("❌ Игра не найдена!", show_alert=True)
+        return
+
+    # Проверяем, что это тот игрок, который создает предложение
+    if query.from_user.id != from_player_id:
+        await query.answer("❌ Вы не можете отправить это предложение!", show_alert=True)
+        return
+
+    trade_key = f"trade_{from_player_id}_{to_player_id}"
+    trade_data = context.user_data.get(trade_key)
+
+    if not trade_data:
+        await query.answer("❌ Данные торговли утеряны!", show_alert=True)
+        return
+
+    # Проверяем, что предложение не пустое
+    offer_empty = (trade_data['offer'].get('money', 0) == 0 and
+                   len(trade_data['offer'].get('properties', [])) == 0)
+    request_empty = (trade_data['request'].get('money', 0) == 0 and
+                     len(trade_data['request'].get('properties', [])) == 0)
+
+    if offer_empty and request_empty:
+        await query.answer("❌ Предложение пустое! Добавьте что-то в сделку.", show_alert=True)
+        return
+
+    try:
+        # Создаем предложение в игре
+        result = game.propose_trade(
+            from_player_id=from_player_id,
+            to_player_id=to_player_id,
+            offer=trade_data['offer'],
+            request=trade_data['request']
+        )
+
+        if result.get('success'):
+            # Удаляем временные данные
+            context.user_data.pop(trade_key, None)
+
+            # Уведомляем получателя
+            try:
+                from_player = game.players[from_player_id]
+                to_player = game.players[to_player_id]
+
+                # ВАЖНО: Получаем trade_id из результата
+                trade_id = result['trade_id']
+                print(f"✅ Создано предложение с ID: {trade_id}")
+
+                # Создаем понятное уведомление
+                notification_text = f"🤝 *НОВОЕ ПРЕДЛОЖЕНИЕ ОБМЕНА!*\n\n"
+                notification_text += f"👤 *От:* {from_player.full_name}\n\n"
+
+                # Форматируем предложение
+                if trade_data['offer'].get('money', 0) > 0:
+                    notification_text += f"💰 *Предлагает деньги:* ${trade_data['offer']['money']}\n"
+
+                if trade_data['offer'].get('properties'):
+                    notification_text += "🏠 *Предлагает собственность:*\n"
+                    for prop_id in trade_data['offer']['properties']:
+                        cell = game.board.get_cell(prop_id)
+                        if cell:
+                            notification_text += f"• {cell.name}\n"
+
+                notification_text += f"\n📥 *Просит взамен:*\n"
+
+                if trade_data['request'].get('money', 0) > 0:
+                    notification_text += f"💰 *Деньги:* ${trade_data['request']['money']}\n"
+
+                if trade_data['request'].get('properties'):
+                    notification_text += "🏠 *Собственность:*\n"
+                    for prop_id in trade_data['request']['properties']:
+                        cell = game.board.get_cell(prop_id)
+                        if cell:
+                            notification_text += f"• {cell.name}\n"
+
+                notification_text += f"\n⏰ *Предложение действует 5 минут*\n"
+                notification_text += f"🎮 *Игра:* {game.game_id}\n\n"
+                notification_text += "*Выберите действие:*"
+
+                # ВАЖНО: Правильно формируем callback_data
+                # ТОЛЬКО trade_id, без лишних параметров
+                keyboard = InlineKeyboardMarkup([
+                    [
+                        InlineKeyboardButton(
+                            "✅ Принять",
+                            callback_data=callback_router.build("trade_accept_", trade_id)
+                        ),
+                        InlineKeyboardButton(
+                            "❌ Отклонить",
+                            callback_data=callback_router.build("trade_reject_", trade_id)
                         )
-                    except Exception as e:
-                        print(f"❌ Не удалось уведомить отправителя: {e}")
-
-                # Уведомляем всех игроков в игре
-                for player_id, player in game.players.items():
-                    if player_id not in [trade.from_player_id, trade.to_player_id]:
-                        try:
-                            await context.bot.send_message(
-                                chat_id=player_id,
-                                text=f"🤝 *СДЕЛКА ЗАВЕРШЕНА!*\n\n"
-                                     f"🎮 Игроки {game.players[trade.from_player_id].full_name} и "
-                                     f"{game.players[trade.to_player_id].full_name} завершили сделку.\n"
-                                     f"📊 ID сделки: `{trade_id}`",
-                                parse_mode="Markdown"
-                            )
-                        except Exception as e:
-                            print(f"❌ Не удалось уведомить игрока {player_id}: {e}")
+                    ]
+                ])
 
-            else:
-                error_msg = result.get('error', 'Неизвестная ошибка')
-                await query.answer(f"❌ Ошибка: {error_msg}", show_alert=True)
-                await query.edit_message_text(
-                    f"❌ *Не удалось завершить сделку:* {error_msg}",
+                print(f"📤 Отправляем уведомление игроку {to_player_id} с кнопками:")
+                print(f"   Принять: trade_accept_{trade_id}")
+                print(f"   Отклонить: trade_reject_{trade_id}")
+
+                # Отправляем уведомление получателю
+                await context.bot.send_message(
+                    chat_id=to_player_id,
+                    text=notification_text,
+                    reply_markup=keyboard,
                     parse_mode="Markdown"
                 )
 
-            return
+                print(f"✅ Уведомление отправлено игроку {to_player_id}")
 
-        # 2. Кнопка ОТКЛОНИТЬ сделку
-        elif data.startswith("trade_reject_"):
-            print(f"🎯 Кнопка ОТКЛОНИТЬ сделку нажата")
-            trade_id = data.replace("trade_reject_", "")
-            print(f"🔍 Trade ID: {trade_id}")
-
-            # Находим игру с этой сделкой
-            game = None
-            for game_obj in game_manager.games.values():
-                if hasattr(game_obj, 'trade_manager'):
-                    trade = game_obj.trade_manager.get_trade(trade_id)
-                    if trade:
-                        game = game_obj
-                        break
-
-            if not game:
-                await query.answer("❌ Предложение не найдено!", show_alert=True)
-                await query.edit_message_text("❌ *Предложение не найдено!*", parse_mode="Markdown")
-                return
+            except Exception as e:
+                print(f"❌ Не удалось отправить уведомление: {e}")
+                import traceback
+                traceback.print_exc()
+                # Но предложение все равно создано
 
-            # Проверяем, что пользователь может отклонить сделку
-            if trade.to_player_id != user.id:
-                await query.answer("❌ Это предложение не для вас!", show_alert=True)
-                return
+            # Уведомляем отправителя об успехе
+            await query.edit_message_text(
+                f"✅ *Предложение успешно отправлено!*\n\n"
+                f"👤 *Кому:* {game.players[to_player_id].full_name}\n"
+                f"📊 *ID предложения:* `{trade_id}`\n"
+                f"⏳ *Действует до:* 5 минут\n\n"
+                f"📤 *Ваше предложение:*\n"
+                f"{format_trade_summary(trade_data['offer'], game, from_player_id)}\n\n"
+                f"📥 *Ваш запрос:*\n"
+                f"{format_trade_summary(trade_data['request'], game, to_player_id)}\n\n"
+                f"ℹ️ *Для управления предложением:*\n"
+                f"• Просмотреть: `/my_trades`\n"
+                f"• Отменить: `/trade_cancel {trade_id}`",
+                parse_mode="Markdown"
+            )
 
-            # Отклоняем сделку
-            result = game.reject_trade(trade_id, user.id)
-
-            if result.get('success'):
-                # Обновляем сообщение у получателя
-                await query.edit_message_text(
-                    f"❌ *СДЕЛКА ОТКЛОНЕНА!*\n\n"
-                    f"Вы отклонили предложение об обмене.\n\n"
-                    f"📊 *Детали:*\n"
-                    f"• Предложение удалено\n"
-                    f"• Обмен не состоялся\n"
-                    f"• Сделка отменена",
-                    parse_mode="Markdown"
-                )
+            # Сохраняем состояние игры
+            game_manager.save_game_state(game_id)
 
-                # Уведомляем отправителя
-                from_player = game.players.get(trade.from_player_id)
-                if from_player:
-                    try:
-                        await context.bot.send_message(
-                            chat_id=from_player.user_id,
-                            text=f"❌ *ВАШЕ ПРЕДЛОЖЕНИЕ ОТКЛОНЕНО!*\n\n"
-                                 f"👤 Игрок {game.players[trade.to_player_id].full_name} отклонил(а) ваше предложение.\n\n"
-                                 f"📊 *Детали:*\n"
-                                 f"• Предложение отклонено\n"
-                                 f"• Обмен не состоялся\n"
-                                 f"• ID сделки: `{trade_id}`",
-                            parse_mode="Markdown"
-                        )
-                    except Exception as e:
-                        print(f"❌ Не удалось уведомить отправителя: {e}")
-            else:
-                error_msg = result.get('error', 'Неизвестная ошибка')
-                await query.answer(f"❌ Ошибка: {error_msg}", show_alert=True)
+        else:
+            # Ошибка при создании предложения
+            error_msg = result.get('error', 'Неизвестная ошибка')
+            await query.edit_message_text(
+                f"❌ *Ошибка отправки:* {error_msg}",
+                parse_mode="Markdown"
+            )
 
-            return
-        # Обработка кнопки "Пропустить"
-        elif data.startswith("skip_"):
-            parts = data.split("_")
-            if len(parts) >= 3:
-                game_id = parts[1]
-                position = int(parts[2])
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена", show_alert=True)
-                    return
-
-                player = game.players.get(user.id)
-                if not player:
-                    await query.answer("❌ Вы не в этой игре", show_alert=True)
-                    return
-
-                cell = game.board.get_cell(position)
-                if not cell:
-                    await query.answer("❌ Клетка не найдена", show_alert=True)
-                    return
-
-                # Очищаем предложение покупки
-                key = f'buy_offer_{game_id}_{position}'
-                context.user_data.pop(key, None)
-
-                # Проверяем дубль
-                double = False
-                buy_offer_key = f'buy_offer_{game_id}_{position}'
-                if buy_offer_key in context.user_data:
-                    double = context.user_data[buy_offer_key].get('double', False)
-                    context.user_data.pop(buy_offer_key, None)
-
-                # Формируем текст
-                text_lines = []
-                text_lines.append(f"⏭️ {player.full_name} пропустил(а) покупку {cell.name}")
-                text_lines.append("")
-                text_lines.append(f"💵 Цена: ${cell.price if hasattr(cell, 'price') else 0}")
-                text_lines.append(f"💰 Ваш баланс: ${player.money}")
-                text_lines.append("")
-
-                if not double:
-                    # Переход хода ТОЛЬКО если не дубль
-                    game.next_turn()
-
-                    # Получаем следующего игрока
-                    next_player = game.get_current_player()
-                    if next_player:
-                        text_lines.append(f"⏭️ Ход переходит")
-                        text_lines.append(f"🎯 {next_player.full_name}")
+    except Exception as e:
+        print(f"❌ Ошибка при отправке предложения: {e}")
+        import traceback
+        traceback.print_exc()
+        await query.edit_message_text(
+            f"❌ *Ошибка:* {str(e)}",
+            parse_mode="Markdown"
+        )
 
-                else:
-                    # При дубле игрок ходит еще раз
-                    text_lines.append("🎲 ДУБЛЬ!")
-                    text_lines.append("🎯 Ходите еще раз!")
-                    text_lines.append("")
-                    text_lines.append("Используйте /roll")
-
-                # Объединяем все строки
-                final_response = "\n".join(text_lines)
-
-                # Обновляем сообщение
-                await query.edit_message_caption(
-                    caption=final_response,
-                    parse_mode=None,
-                    reply_markup=None
-                )
 
-                if not double:
-                    # Уведомляем следующего игрока ТОЛЬКО если не дубль
-                    next_player = game.get_current_player()
-                    if next_player and next_player.user_id != user.id:
-                        try:
-                            await notify_next_player(game, context, user.id)
-                        except Exception as e:
-                            print(f"❌ Не удалось уведомить следующего игрока: {e}")
-                else:
-                    # При дубле отправляем сообщение игроку
-                    await context.bot.send_message(
-                        chat_id=user.id,
-                        text=f"🎲 ДУБЛЬ!\n🎯 Ходите еще раз!\n\nИспользуйте /roll"
-                    )
+# Главное меню (доступно всем)
 
-                game_manager.save_game_state(game_id)
-
-                # Уведомляем других игроков о пропуске
-                for other_id, other_player in game.players.items():
-                    if other_id != user.id:
-                        try:
-                            other_text = f"⏭️ {player.full_name} пропустил(а) покупку {cell.name}"
-
-                            # Добавляем информацию о следующем игроке только если не дубль
-                            if not double:
-                                next_player = game.get_current_player()
-                                if next_player:
-                                    other_text += f"\n⏭️ Следующий ход: {next_player.full_name}"
-
-                            await context.bot.send_message(
-                                chat_id=other_id,
-                                text=other_text
-                            )
-                        except Exception as e:
-                            print(f"❌ Не удалось уведомить игрока {other_id}: {e}")
-
-        # Обработка кнопок тюрьмы
-        elif data.startswith("jail_"):
-            parts = data.split("_")
-            if len(parts) >= 3:
-                action = parts[1]  # roll, pay, card, skip
-                game_id = parts[2]
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена!", show_alert=True)
-                    return
-
-                player = game.players.get(user.id)
-                if not player:
-                    await query.answer("❌ Вы не в этой игре", show_alert=True)
-                    return
-
-                # Проверка на текущего игрока
-                current_player = game.get_current_player()
-                if current_player and current_player.user_id != user.id:
-                    await query.answer(f"❌ Сейчас ходит {current_player.full_name}!", show_alert=True)
-                    return
-
-                if not player.in_jail:
-                    await query.answer("❌ Вы не в тюрьме!", show_alert=True)
-                    return
-
-                # Обработка действий в тюрьме
-                if action == "roll":
-                    dice1, dice2, total = game.roll_dice()
-
-                    if dice1 == dice2:
-                        # Успешный дубль
-                        player.release_from_jail()
-                        response = f"🎲 ДУБЛЬ!\n🎯 {dice1} + {dice2} = {total}\n🔓 Вы вышли из тюрьмы!\n🎲 Теперь ваш ход!"
-                    else:
-                        # Неудачная попытка
-                        player.jail_turns += 1
-                        if player.jail_turns >= 3:
-                            player.release_from_jail()
-                            response = f"🎲 Нет дубля\n🎯 {dice1} + {dice2} = {total}\n⏰ Прошло 3 круга!\n🔓 Вы вышли автоматически!"
-                            game.next_turn()
-                        else:
-                            response = f"🎲 Нет дубля\n🎯 {dice1} + {dice2} = {total}\n🔒 Остаётесь в тюрьме\n📅 Круг: {player.jail_turns}/3"
-                            game.next_turn()
-
-                    await query.edit_message_text(response)
-                    game_manager.save_game_state(game_id)
 
-                    # Уведомляем следующего игрока, если ход перешел
-                    if not (dice1 == dice2) or player.jail_turns >= 3:
-                        next_player = game.get_current_player()
-                        if next_player and next_player.user_id != user.id:
-                            await notify_next_player(game, context, user.id)
-
-                elif action == "pay":
-                    if player.money >= Config.JAIL_FINE:
-                        player.deduct_money(Config.JAIL_FINE)
-                        player.release_from_jail()
-                        response = f"💵 Вы заплатили ${Config.JAIL_FINE}\n🔓 Вы вышли из тюрьмы!\n💰 Баланс: ${player.money}"
-                    else:
-                        player.jail_turns += 1
-                        if player.jail_turns >= 3:
-                            player.release_from_jail()
-                            game.next_turn()
-                            response = f"❌ Недостаточно денег!\n⏰ Прошло 3 круга!\n🔓 Вы вышли автоматически!"
-                        else:
-                            game.next_turn()
-                            response = f"❌ Недостаточно денег!\n🔒 Остаётесь в тюрьме\n📅 Круг: {player.jail_turns}/3"
-
-                    await query.edit_message_text(response)
-                    game_manager.save_game_state(game_id)
+async def menu_new_game_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Меню: новая игра"""
+    query = update.callback_query
+    await newgame_command(query.message, context)
 
-                    # Уведомляем следующего игрока
-                    next_player = game.get_current_player()
-                    if next_player and next_player.user_id != user.id:
-                        await notify_next_player(game, context, user.id)
-
-                elif action == "card":
-                    if player.get_out_of_jail_cards > 0:
-                        player.get_out_of_jail_cards -= 1
-                        player.release_from_jail()
-                        response = f"🎫 Карта использована!\n🔓 Вы вышли из тюрьмы!\n📊 Осталось карт: {player.get_out_of_jail_cards}"
-                    else:
-                        player.jail_turns += 1
-                        if player.jail_turns >= 3:
-                            player.release_from_jail()
-                            game.next_turn()
-                            response = f"❌ Нет карт освобождения!\n⏰ Прошло 3 круга!\n🔓 Вы вышли автоматически!"
-                        else:
-                            game.next_turn()
-                            response = f"❌ Нет карт освобождения!\n🔒 Остаётесь в тюрьме\n📅 Круг: {player.jail_turns}/3"
-
-                    await query.edit_message_text(response)
-                    game_manager.save_game_state(game_id)
 
-                    # Уведомляем следующего игрока
-                    next_player = game.get_current_player()
-                    if next_player and next_player.user_id != user.id:
-                        await notify_next_player(game, context, user.id)
+async def menu_join_game_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Меню: присоединиться к игре"""
+    query = update.callback_query
+    await query.edit_message_text(
+        "👥 Присоединиться к игре\n\n"
+        "Введите команду:\n"
+        "/join КОД_ИГРЫ\n\n"
+        "Или посмотрите доступные игры: /games"
+    )
+
+
+async def menu_rules_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Меню: правила"""
+    query = update.callback_query
+    await help_command(query.message, context)
 
-        # ========== ОБРАБОТКА ТОРГОВЛИ ==========
 
-        # Выбор игрока для торговли
-        elif data.startswith("trade_select_"):
-            parts = data.split("_")
-            if len(parts) >= 4:
-                game_id = parts[2]
-                to_player_id = int(parts[3])
+async def menu_profile_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Меню: профиль"""
+    query = update.callback_query
+    await myid_command(query.message, context)
 
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.edit_message_text("❌ Игра не найдена!")
-                    return
 
-                # Проверяем, что игрок может торговать
-                current_player = game.get_current_player()
-                if not current_player or current_player.user_id != user.id:
-                    await query.answer("❌ Сейчас не ваш ход!", show_alert=True)
-                    return
-
-                # Сохраняем данные торговли
-                trade_key = f"trade_{user.id}_{to_player_id}"
-                context.user_data[trade_key] = {
-                    'game_id': game_id,
-                    'from_player_id': user.id,
-                    'to_player_id': to_player_id,
-                    'step': 'offer',
-                    'offer': {'money': 0, 'properties': []},
-                    'request': {'money': 0, 'properties': []}
-                }
-
-                # Показываем выбор предложения
-                try:
-                    from src.frontend.trade_interface import create_trade_offer_selection
-                    text, keyboard = create_trade_offer_selection(
-                        game, user.id, to_player_id, 'offer'
-                    )
-                    await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
-                except ImportError:
-                    await query.edit_message_text(
-                        f"🤝 *ТОРГОВЛЯ С {game.players[to_player_id].full_name}*\n\n"
-                        f"Выберите что предлагаете:",
-                        parse_mode="Markdown"
-                    )
+# Лобби (доступно участникам лобби)
 
-        # Выбор денег в сделке
-        elif data.startswith("trade_money_"):
-            parts = data.split("_")
-            if len(parts) >= 6:
-                game_id = parts[2]
-                from_player_id = int(parts[3])
-                to_player_id = int(parts[4])
-                action = parts[5]  # offer или request
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена!", show_alert=True)
-                    return
-
-                # Сохраняем состояние для ввода суммы
-                context.user_data['awaiting_trade_money'] = {
-                    'game_id': game_id,
-                    'from_player_id': from_player_id,
-                    'to_player_id': to_player_id,
-                    'action': action,
-                    'message_id': query.message.message_id,
-                    'chat_id': query.message.chat_id
-                }
-
-                player = game.players[from_player_id] if action == 'offer' else game.players[to_player_id]
-                max_money = player.money
-
-                await query.edit_message_text(
-                    f"💰 *ВВЕДИТЕ СУММУ ДЕНЕГ*\n\n"
-                    f"Максимально: ${max_money}\n\n"
-                    f"📝 *Отправьте число в чат:*\n"
-                    f"(например: 100, 500, 1000)\n\n"
-                    f"❌ Для отмены используйте /cancel",
-                    parse_mode="Markdown"
-                )
 
-        # Выбор собственности в сделке
-        elif data.startswith("trade_prop_"):
-            parts = data.split("_")
-            if len(parts) >= 7:
-                game_id = parts[2]
-                from_player_id = int(parts[3])
-                to_player_id = int(parts[4])
-                prop_id = int(parts[5])
-                action = parts[6]  # offer или request
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена!", show_alert=True)
-                    return
-
-                # Получаем данные торговли
-                trade_key = f"trade_{from_player_id}_{to_player_id}"
-                trade_data = context.user_data.get(trade_key)
-
-                if not trade_data:
-                    await query.answer("❌ Данные торговли утеряны!", show_alert=True)
-                    return
-
-                # Добавляем или удаляем собственность
-                target_dict = trade_data['offer'] if action == 'offer' else trade_data['request']
-
-                if prop_id in target_dict['properties']:
-                    target_dict['properties'].remove(prop_id)
-                    await query.answer("✅ Собственность удалена из сделки")
-                else:
-                    target_dict['properties'].append(prop_id)
-                    await query.answer("✅ Собственность добавлена в сделку")
+async def lobby_start_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str):
+    """Лобби: начать игру"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_game(game_id)
 
-                # Сохраняем изменения
-                context.user_data[trade_key] = trade_data
+    if game and user.id == game.creator_id:
+        await startgame_command(query.message, context)
+    else:
+        await query.answer("❌ Только создатель может начать игру!", show_alert=True)
 
-                # Обновляем интерфейс
-                try:
-                    from src.frontend.trade_interface import create_trade_offer_selection
-                    text, keyboard = create_trade_offer_selection(
-                        game, from_player_id, to_player_id,
-                        trade_data['step'], trade_data['offer'], trade_data['request']
-                    )
-                    await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
-                except ImportError:
-                    await query.answer("✅ Собственность обновлена")
-
-        # Следующий шаг
-        elif data.startswith("trade_next_"):
-            parts = data.split("_")
-            if len(parts) >= 6:
-                game_id = parts[2]
-                from_player_id = int(parts[3])
-                to_player_id = int(parts[4])
-                action = parts[5]  # offer или request
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена!", show_alert=True)
-                    return
-
-                trade_key = f"trade_{from_player_id}_{to_player_id}"
-                trade_data = context.user_data.get(trade_key)
-
-                if not trade_data:
-                    await query.answer("❌ Данные торговли утеряны!", show_alert=True)
-                    return
-
-                # Переходим к следующему шагу
-                if trade_data['step'] == 'offer':
-                    trade_data['step'] = 'request'
-                    try:
-                        from src.frontend.trade_interface import create_trade_offer_selection
-                        text, keyboard = create_trade_offer_selection(
-                            game, from_player_id, to_player_id,
-                            'request', trade_data['offer'], trade_data['request']
-                        )
-                    except ImportError:
-                        text = f"🤝 *ЧТО ПРОСИТЕ ВЗАМЕН?*\n\nВыберите что хотите получить от {game.players[to_player_id].full_name}"
-                        keyboard = None
-                elif trade_data['step'] == 'request':
-                    trade_data['step'] = 'confirm'
-                    try:
-                        from src.frontend.trade_interface import create_trade_confirmation
-                        text, keyboard = create_trade_confirmation(
-                            game, from_player_id, to_player_id,
-                            trade_data['offer'], trade_data['request']
-                        )
-                    except ImportError:
-                        text = f"🤝 *ПОДТВЕРЖДЕНИЕ СДЕЛКИ*\n\nГотовы отправить предложение?"
-                        keyboard = None
-
-                context.user_data[trade_key] = trade_data
-                await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
-
-        # Назад
-        elif data.startswith("trade_back_"):
-            parts = data.split("_")
-            if len(parts) >= 5:
-                game_id = parts[2]
-                from_player_id = int(parts[3])
-                to_player_id = int(parts[4])
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена!", show_alert=True)
-                    return
-
-                trade_key = f"trade_{from_player_id}_{to_player_id}"
-                trade_data = context.user_data.get(trade_key)
-
-                if not trade_data:
-                    await query.answer("❌ Данные торговли утеряны!", show_alert=True)
-                    return
-
-                # Возвращаемся к предыдущему шагу
-                if trade_data['step'] == 'request':
-                    trade_data['step'] = 'offer'
-                    try:
-                        from src.frontend.trade_interface import create_trade_offer_selection
-                        text, keyboard = create_trade_offer_selection(
-                            game, from_player_id, to_player_id,
-                            'offer', trade_data['offer'], trade_data['request']
-                        )
-                        await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
-                    except ImportError:
-                        await query.edit_message_text("↩️ Возврат к выбору предложения")
-
-                context.user_data[trade_key] = trade_data
-
-        # Сброс
-        elif data.startswith("trade_reset_"):
-            parts = data.split("_")
-            if len(parts) >= 6:
-                game_id = parts[2]
-                from_player_id = int(parts[3])
-                to_player_id = int(parts[4])
-                action = parts[5]  # offer или request
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена!", show_alert=True)
-                    return
-
-                trade_key = f"trade_{from_player_id}_{to_player_id}"
-                trade_data = context.user_data.get(trade_key)
-
-                if not trade_data:
-                    await query.answer("❌ Данные торговли утеряны!", show_alert=True)
-                    return
-
-                # Сбрасываем текущий шаг
-                if action == 'offer':
-                    trade_data['offer'] = {'money': 0, 'properties': []}
-                else:
-                    trade_data['request'] = {'money': 0, 'properties': []}
 
-                context.user_data[trade_key] = trade_data
+async def lobby_invite_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str):
+    """Лобби: приглашение"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_game(game_id)
 
-                # Обновляем интерфейс
-                try:
-                    from src.frontend.trade_interface import create_trade_offer_selection
-                    text, keyboard = create_trade_offer_selection(
-                        game, from_player_id, to_player_id,
-                        trade_data['step'], trade_data['offer'], trade_data['request']
-                    )
-                    await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
-                except ImportError:
-                    await query.answer("🔄 Текущий выбор сброшен", show_alert=True)
-
-        # Отправка предложения
-        elif data.startswith("trade_send_"):
-            parts = data.split("_")
-            if len(parts) >= 5:
-                game_id = parts[2]
-                from_player_id = int(parts[3])
-                to_player_id = int(parts[4])
-
-                game = game_manager.get_game(game_id)
-                if not game:
-                    await query.answer("❌ Игра не найдена!", show_alert=True)
-                    return
-
-                # Проверяем, что это тот игрок, который создает предложение
-                if query.from_user.id != from_player_id:
-                    await query.answer("❌ Вы не можете отправить это предложение!", show_alert=True)
-                    return
-
-                trade_key = f"trade_{from_player_id}_{to_player_id}"
-                trade_data = context.user_data.get(trade_key)
-
-                if not trade_data:
-                    await query.answer("❌ Данные торговли утеряны!", show_alert=True)
-                    return
-
-                # Проверяем, что предложение не пустое
-                offer_empty = (trade_data['offer'].get('money', 0) == 0 and
-                               len(trade_data['offer'].get('properties', [])) == 0)
-                request_empty = (trade_data['request'].get('money', 0) == 0 and
-                                 len(trade_data['request'].get('properties', [])) == 0)
-
-                if offer_empty and request_empty:
-                    await query.answer("❌ Предложение пустое! Добавьте что-то в сделку.", show_alert=True)
-                    return
+    if game and user.id in game.players:
+        await query.message.reply_text(
+            f"👥 Приглашение в игра\n\n"
+            f"Код игры: {game_id}\n\n"
+            f"Отправьте друзьям эту команду:\n"
+            f"/join {game_id}"
+        )
+    else:
+        await query.answer("❌ Вы не в этой игре!", show_alert=True)
 
-                try:
-                    # Создаем предложение в игре
-                    result = game.propose_trade(
-                        from_player_id=from_player_id,
-                        to_player_id=to_player_id,
-                        offer=trade_data['offer'],
-                        request=trade_data['request']
-                    )
 
-                    if result.get('success'):
-                        # Удаляем временные данные
-                        context.user_data.pop(trade_key, None)
-
-                        # Уведомляем получателя
-                        try:
-                            from_player = game.players[from_player_id]
-                            to_player = game.players[to_player_id]
-
-                            # ВАЖНО: Получаем trade_id из результата
-                            trade_id = result['trade_id']
-                            print(f"✅ Создано предложение с ID: {trade_id}")
-
-                            # Создаем понятное уведомление
-                            notification_text = f"🤝 *НОВОЕ ПРЕДЛОЖЕНИЕ ОБМЕНА!*\n\n"
-                            notification_text += f"👤 *От:* {from_player.full_name}\n\n"
-
-                            # Форматируем предложение
-                            if trade_data['offer'].get('money', 0) > 0:
-                                notification_text += f"💰 *Предлагает деньги:* ${trade_data['offer']['money']}\n"
-
-                            if trade_data['offer'].get('properties'):
-                                notification_text += "🏠 *Предлагает собственность:*\n"
-                                for prop_id in trade_data['offer']['properties']:
-                                    cell = game.board.get_cell(prop_id)
-                                    if cell:
-                                        notification_text += f"• {cell.name}\n"
-
-                            notification_text += f"\n📥 *Просит взамен:*\n"
-
-                            if trade_data['request'].get('money', 0) > 0:
-                                notification_text += f"💰 *Деньги:* ${trade_data['request']['money']}\n"
-
-                            if trade_data['request'].get('properties'):
-                                notification_text += "🏠 *Собственность:*\n"
-                                for prop_id in trade_data['request']['properties']:
-                                    cell = game.board.get_cell(prop_id)
-                                    if cell:
-                                        notification_text += f"• {cell.name}\n"
-
-                            notification_text += f"\n⏰ *Предложение действует 5 минут*\n"
-                            notification_text += f"🎮 *Игра:* {game.game_id}\n\n"
-                            notification_text += "*Выберите действие:*"
-
-                            # ВАЖНО: Правильно формируем callback_data
-                            # ТОЛЬКО trade_id, без лишних параметров
-                            keyboard = InlineKeyboardMarkup([
-                                [
-                                    InlineKeyboardButton(
-                                        "✅ Принять",
-                                        callback_data=f"trade_accept_{trade_id}"  # ← БЕЗ game_id и других параметров
-                                    ),
-                                    InlineKeyboardButton(
-                                        "❌ Отклонить",
-                                        callback_data=f"trade_reject_{trade_id}"  # ← БЕЗ game_id и других параметров
-                                    )
-                                ]
-                            ])
-
-                            print(f"📤 Отправляем уведомление игроку {to_player_id} с кнопками:")
-                            print(f"   Принять: trade_accept_{trade_id}")
-                            print(f"   Отклонить: trade_reject_{trade_id}")
-
-                            # Отправляем уведомление получателю
-                            await context.bot.send_message(
-                                chat_id=to_player_id,
-                                text=notification_text,
-                                reply_markup=keyboard,
-                                parse_mode="Markdown"
-                            )
-
-                            print(f"✅ Уведомление отправлено игроку {to_player_id}")
-
-                        except Exception as e:
-                            print(f"❌ Не удалось отправить уведомление: {e}")
-                            import traceback
-                            traceback.print_exc()
-                            # Но предложение все равно создано
-
-                        # Уведомляем отправителя об успехе
-                        await query.edit_message_text(
-                            f"✅ *Предложение успешно отправлено!*\n\n"
-                            f"👤 *Кому:* {game.players[to_player_id].full_name}\n"
-                            f"📊 *ID предложения:* `{trade_id}`\n"
-                            f"⏳ *Действует до:* 5 минут\n\n"
-                            f"📤 *Ваше предложение:*\n"
-                            f"{format_trade_summary(trade_data['offer'], game, from_player_id)}\n\n"
-                            f"📥 *Ваш запрос:*\n"
-                            f"{format_trade_summary(trade_data['request'], game, to_player_id)}\n\n"
-                            f"ℹ️ *Для управления предложением:*\n"
-                            f"• Просмотреть: `/my_trades`\n"
-                            f"• Отменить: `/trade_cancel {trade_id}`",
-                            parse_mode="Markdown"
-                        )
+async def lobby_stats_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, game_id: str):
+    """Лобби: статистика"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_game(game_id)
 
-                        # Сохраняем состояние игры
-                        game_manager.save_game_state(game_id)
+    if game and user.id in game.players:
+        players_list = "\n".join([
+            f"• {player.full_name}" +
+            (" 👑" if player.user_id == game.creator_id else "")
+            for player in game.players.values()
+        ])
 
-                    else:
-                        # Ошибка при создании предложения
-                        error_msg = result.get('error', 'Неизвестная ошибка')
-                        await query.edit_message_text(
-                            f"❌ *Ошибка отправки:* {error_msg}",
-                            parse_mode="Markdown"
-                        )
+        await query.message.reply_text(
+            f"📊 Статистика лобби\n\n"
+            f"🎮 Игра: {game.game_id}\n"
+            f"👥 Игроков: {len(game.players)}/{Config.MAX_PLAYERS}\n\n"
+            f"Участники:\n{players_list}"
+        )
+    else:
+        await query.answer("❌ Вы не в этой игре!", show_alert=True)
 
-                except Exception as e:
-                    print(f"❌ Ошибка при отправке предложения: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    await query.edit_message_text(
-                        f"❌ *Ошибка:* {str(e)}",
-                        parse_mode="Markdown"
-                    )
 
-        # Главное меню (доступно всем)
-        elif data == "menu_new_game":
-            await newgame_command(query.message, context)
+async def lobby_leave_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Лобби: выйти"""
+    query = update.callback_query
+    await leave_command(query.message, context)
 
-        elif data == "menu_join_game":
-            await query.edit_message_text(
-                "👥 Присоединиться к игре\n\n"
-                "Введите команду:\n"
-                "/join КОД_ИГРЫ\n\n"
-                "Или посмотрите доступные игры: /games"
-            )
 
-        elif data == "menu_rules":
-            await help_command(query.message, context)
+# Игровые действия (проверяем, что игрок в игре)
 
-        elif data == "menu_profile":
-            await myid_command(query.message, context)
 
-        # Лобби (доступно участникам лобби)
-        elif data.startswith("lobby_start_"):
-            game_id = data.replace("lobby_start_", "")
-            game = game_manager.get_game(game_id)
+async def game_roll_dice_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Игра: бросить кубики"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_player_game(user.id)
+    if game:
+        current_player = game.get_current_player()
+        if current_player and current_player.user_id == user.id:
+            await roll_command(query.message, context)
+        else:
+            await query.answer("❌ Не ваш ход!", show_alert=True)
+    else:
+        await query.answer("❌ Вы не в игре!", show_alert=True)
 
-            if game and user.id == game.creator_id:
-                await startgame_command(query.message, context)
-            else:
-                await query.answer("❌ Только создатель может начать игру!", show_alert=True)
-
-        elif data.startswith("lobby_invite_"):
-            game_id = data.replace("lobby_invite_", "")
-            game = game_manager.get_game(game_id)
-
-            if game and user.id in game.players:
-                await query.message.reply_text(
-                    f"👥 Приглашение в игра\n\n"
-                    f"Код игры: {game_id}\n\n"
-                    f"Отправьте друзьям эту команду:\n"
-                    f"/join {game_id}"
-                )
-            else:
-                await query.answer("❌ Вы не в этой игре!", show_alert=True)
 
-        elif data.startswith("lobby_stats_"):
-            game_id = data.replace("lobby_stats_", "")
-            game = game_manager.get_game(game_id)
+async def game_view_board_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Игра: поле"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_player_game(user.id)
+    if game:
+        await board_command(query.message, context)
+    else:
+        await query.answer("❌ Вы не в игре!", show_alert=True)
 
-            if game and user.id in game.players:
-                players_list = "\n".join([
-                    f"• {player.full_name}" +
-                    (" 👑" if player.user_id == game.creator_id else "")
-                    for player in game.players.values()
-                ])
 
-                await query.message.reply_text(
-                    f"📊 Статистика лобби\n\n"
-                    f"🎮 Игра: {game.game_id}\n"
-                    f"👥 Игроков: {len(game.players)}/{Config.MAX_PLAYERS}\n\n"
-                    f"Участники:\n{players_list}"
-                )
-            else:
-                await query.answer("❌ Вы не в этой игре!", show_alert=True)
+async def game_my_properties_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Игра: моя собственность"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_player_game(user.id)
+    if game:
+        await properties_command(query.message, context)
+    else:
+        await query.answer("❌ Вы не в игре!", show_alert=True)
 
-        elif data == "lobby_leave":
-            await leave_command(query.message, context)
 
-        # Игровые действия (проверяем, что игрок в игре)
-        elif data == "game_roll_dice":
-            game = game_manager.get_player_game(user.id)
-            if game:
-                current_player = game.get_current_player()
-                if current_player and current_player.user_id == user.id:
-                    await roll_command(query.message, context)
-                else:
-                    await query.answer("❌ Не ваш ход!", show_alert=True)
-            else:
-                await query.answer("❌ Вы не в игре!", show_alert=True)
+async def game_players_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Игра: игроки"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_player_game(user.id)
+    if game:
+        await status_command(query.message, context)
+    else:
+        await query.answer("❌ Вы не в игре!", show_alert=True)
 
-        elif data == "game_view_board":
-            game = game_manager.get_player_game(user.id)
-            if game:
-                await board_command(query.message, context)
-            else:
-                await query.answer("❌ Вы не в игре!", show_alert=True)
 
-        elif data == "game_my_properties":
-            game = game_manager.get_player_game(user.id)
-            if game:
-                await properties_command(query.message, context)
-            else:
-                await query.answer("❌ Вы не в игре!", show_alert=True)
+async def game_leave_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Игра: выйти"""
+    query = update.callback_query
+    user = query.from_user
+    game = game_manager.get_player_game(user.id)
+    if game:
+        await leave_command(query.message, context)
+    else:
+        await query.answer("❌ Вы не в игре!", show_alert=True)
+
+
+# ========== МАРШРУТЫ КНОПОК ==========
+
+# opcode - короткий код компактного формата кнопок (см. CallbackRouter.build);
+# кнопки старого формата с полным префиксом тоже обрабатываются
+# Длинные данные кнопок хранятся в базе игр: кнопки работают и после перезапуска
+callback_router = CallbackRouter(token_ttl=Config.CALLBACK_TOKEN_TTL, token_backend=game_manager.db)
+callback_router.prefix("buy_", buy_callback, ("game_id", str), ("position", int), opcode="b")
+callback_router.prefix("skip_", skip_callback, ("game_id", str), ("position", int), opcode="s")
+callback_router.prefix("trade_accept_", trade_accept_callback, ("trade_id", str), opcode="ta")
+callback_router.prefix("trade_reject_", trade_reject_callback, ("trade_id", str), opcode="tr")
+callback_router.prefix("jail_", jail_callback, ("action", str), ("game_id", str), opcode="j")
+callback_router.prefix("trade_select_", trade_select_callback, ("game_id", str), ("to_player_id", int), opcode="ts")
+callback_router.prefix("trade_money_", trade_money_callback, ("game_id", str), ("from_player_id", int), ("to_player_id", int), ("action", str), opcode="tm")
+callback_router.prefix("trade_prop_", trade_prop_callback, ("game_id", str), ("from_player_id", int), ("to_player_id", int), ("prop_id", int), ("action", str), opcode="tp")
+callback_router.prefix("trade_next_", trade_next_callback, ("game_id", str), ("from_player_id", int), ("to_player_id", int), ("action", str), opcode="tn")
+callback_router.prefix("trade_back_", trade_back_callback, ("game_id", str), ("from_player_id", int), ("to_player_id", int), opcode="tb")
+callback_router.prefix("trade_reset_", trade_reset_callback, ("game_id", str), ("from_player_id", int), ("to_player_id", int), ("action", str), opcode="tz")
+callback_router.prefix("trade_send_", trade_send_callback, ("game_id", str), ("from_player_id", int), ("to_player_id", int), opcode="tx")
+callback_router.exact("menu_new_game", menu_new_game_callback)
+callback_router.exact("menu_join_game", menu_join_game_callback)
+callback_router.exact("menu_rules", menu_rules_callback)
+callback_router.exact("menu_profile", menu_profile_callback)
+callback_router.prefix("lobby_start_", lobby_start_callback, ("game_id", str), opcode="ls")
+callback_router.prefix("lobby_invite_", lobby_invite_callback, ("game_id", str), opcode="li")
+callback_router.prefix("lobby_stats_", lobby_stats_callback, ("game_id", str), opcode="lt")
+callback_router.exact("lobby_leave", lobby_leave_callback)
+callback_router.exact("game_roll_dice", game_roll_dice_callback)
+callback_router.exact("game_view_board", game_view_board_callback)
+callback_router.exact("game_my_properties", game_my_properties_callback)
+callback_router.exact("game_players", game_players_callback)
+callback_router.exact("game_leave", game_leave_callback)
 
-        elif data == "game_players":
-            game = game_manager.get_player_game(user.id)
-            if game:
-                await status_command(query.message, context)
-            else:
-                await query.answer("❌ Вы не в игре!", show_alert=True)
 
-        elif data == "game_leave":
-            game = game_manager.get_player_game(user.id)
-            if game:
-                await leave_command(query.message, context)
-            else:
-                await query.answer("❌ Вы не в игре!", show_alert=True)
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик всех кнопок"""
+    query = update.callback_query
+    data = query.data
+    user = query.from_user
 
-    except Exception as e:
-        logger.error(f"Ошибка обработки кнопки {data}: {e}")
-        await query.answer("⚠️ Произошла ошибка", show_alert=True)
+    # ДОБАВЬТЕ ЭТОТ ОТЛАДОЧНЫЙ ВЫВОД
+    print(f"\n🔘 ========== КНОПКА НАЖАТА ==========")
+    print(f"👤 Пользователь: {user.id} ({user.full_name})")
+    print(f"📱 Callback_data: {data}")
+    print(f"💬 Chat ID: {query.message.chat_id}")
+    print(f"📄 Message ID: {query.message.message_id}")
+    print(f"=====================================\n")
 
+    # Telegram принимает один ответ на нажатие: отвечаем после обработчика,
+    # чтобы его уведомление (и уведомления об ошибках ниже) дошли до пользователя
+    try:
+        if not await callback_router.dispatch(update, context, data):
+            print(f"⚠️ Нет обработчика для callback_data: {data}")
+        await answer_callback(query)
+    except CallbackExpiredError as e:
+        print(f"⚠️ {e}")
+        await answer_callback(query, "⌛ Кнопка устарела, откройте меню заново", show_alert=True)
+    except CallbackFormatError as e:
+        print(f"❌ Неверный формат callback_data: {e}")
+        await answer_callback(query, "❌ Ошибка формата кнопки", show_alert=True)
     except Exception as e:
         logger.error(f"Ошибка обработки кнопки {data}: {e}")
         import traceback
         traceback.print_exc()
-        await query.answer("⚠️ Произошла ошибка", show_alert=True)
+        await answer_callback(query, "⚠️ Произошла ошибка", show_alert=True)
+
+
+async def answer_callback(query, text: str = None, show_alert: bool = False):
+    """Ответить на нажатие, если обработчик еще не ответил сам"""
+    try:
+        await query.answer(text, show_alert=show_alert)
+    except telegram.error.BadRequest:
+        pass  # на запрос уже ответили
 
 async def properties_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Полная рабочая версия /properties"""
@@ -2760,18 +2502,7 @@ async def build_house_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Проверяем аргументы
         if not context.args:
             # Показываем список доступных для строительства улиц
-            available_properties = []
-
-            for prop_id in player.properties:
-                check_result = game.board.can_build_house(prop_id, player.user_id)
-                if check_result.get("can_build"):
-                    cell = game.board.get_cell(prop_id)
-                    available_properties.append({
-                        "id": prop_id,
-                        "name": cell.name,
-                        "houses": cell.houses,
-                        "price": check_result.get("house_price", 0)
-                    })
+            available_properties = list(game.board.analyze_building(player.user_id)["buildable"].values())
 
             if not available_properties:
                 await update.message.reply_text(
@@ -2852,15 +2583,11 @@ async def build_house_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Строим дом
         cell = game.board.get_cell(property_id)
 
-        # Списываем деньги
-        player.deduct_money(house_price)
-
-        # Строим дом
-        cell.houses += 1
-
-        # Обновляем статистику
-        if hasattr(player, 'houses_built'):
-            player.houses_built += 1
+        # Списываем деньги и строим дом
+        result = game.perform_action(player.user_id, "build", position=property_id)
+        if not result["success"]:
+            await update.message.reply_text(f"❌ {result['message']}")
+            return
 
         # Формируем ответ
         response = f"✅ *ДОМ ПОСТРОЕН!*\n\n"
@@ -2913,17 +2640,7 @@ async def build_hotel_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Проверяем аргументы
         if not context.args:
             # Показываем список доступных для отелей улиц
-            available_hotels = []
-
-            for prop_id in player.properties:
-                check_result = game.board.can_build_hotel(prop_id, player.user_id)
-                if check_result.get("can_build"):
-                    cell = game.board.get_cell(prop_id)
-                    available_hotels.append({
-                        "id": prop_id,
-                        "name": cell.name,
-                        "hotel_price": check_result.get("hotel_price", 0)
-                    })
+            available_hotels = list(game.board.analyze_building(player.user_id)["hotel"].values())
 
             if not available_hotels:
                 await update.message.reply_text(
@@ -2944,7 +2661,7 @@ async def build_hotel_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             for i, prop in enumerate(available_hotels, 1):
                 response += f"{i}. *{prop['name']}*\n"
                 response += f"   📍 Клетка: {prop['id']}\n"
-                response += f"   💵 Стоимость отеля: ${prop['hotel_price']}\n"
+                response += f"   💵 Стоимость отеля: ${prop['price']}\n"
                 response += f"   👉 Команда: `/build_hotel {prop['id']}`\n\n"
 
             await update.message.reply_text(response, parse_mode="Markdown")
@@ -2997,16 +2714,11 @@ async def build_hotel_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Строим отель
         cell = game.board.get_cell(property_id)
 
-        # Списываем деньги
-        player.deduct_money(hotel_price)
-
-        # Строим отель
-        cell.hotel = True
-        cell.houses = 0
-
-        # Обновляем статистику
-        if hasattr(player, 'hotels_built'):
-            player.hotels_built += 1
+        # Списываем деньги и строим отель
+        result = game.perform_action(player.user_id, "build", position=property_id, hotel=True)
+        if not result["success"]:
+            await update.message.reply_text(f"❌ {result['message']}")
+            return
 
         # Формируем ответ
         response = f"🎉 *ОТЕЛЬ ПОСТРОЕН!*\n\n"
@@ -3052,25 +2764,9 @@ async def sell_house_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
             # Показываем список доступных для продажи
             available_sales = []
 
-            for prop_id in player.properties:
-                check_result = game.board.can_sell_house(prop_id, player.user_id)
-                if check_result.get("can_sell"):
-                    cell = game.board.get_cell(prop_id)
-
-                    if check_result.get("is_hotel"):
-                        sale_type = "Отель"
-                        price = check_result.get("sell_price", 0)
-                    else:
-                        sale_type = f"Дом ({cell.houses} шт.)"
-                        price = check_result.get("sell_price", 0)
-
-                    available_sales.append({
-                        "id": prop_id,
-                        "name": cell.name,
-                        "type": sale_type,
-                        "price": price
-                    })
-
+            for sale in game.board.analyze_building(player.user_id)["sellable"].values():
+                sale_type = "Отель" if sale["is_hotel"] else f"Дом ({sale['houses']} шт.)"
+                available_sales.append(dict(sale, type=sale_type))
 
             if not available_sales:
                 await update.message.reply_text(
@@ -3131,21 +2827,17 @@ async def sell_house_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         cell = game.board.get_cell(property_id)
         sell_price = check_result.get("sell_price", 0)
 
-        # Начисляем деньги
-        player.add_money(sell_price)
+        # Продаем дом или отель и начисляем деньги
+        result = game.perform_action(player.user_id, "sell", position=property_id)
+        if not result["success"]:
+            await update.message.reply_text(f"❌ {result['message']}")
+            return
 
         if check_result.get("is_hotel"):
-            # Продаем отель
-            cell.hotel = False
-            cell.houses = 4
-
             response = f"🏨 *ОТЕЛЬ ПРОДАН!*\n\n"
             response += f"💰 *Выручка:* ${sell_price}\n"
             response += f"🏠 *Теперь на {cell.name}:* 4 дома\n"
         else:
-            # Продаем дом
-            cell.houses -= 1
-
             response = f"🏠 *ДОМ ПРОДАН!*\n\n"
             response += f"💰 *Выручка:* ${sell_price}\n"
             response += f"🏠 *Теперь на {cell.name}:* {cell.houses} домов\n"
@@ -3181,20 +2873,14 @@ async def houses_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     response += f"💰 *Баланс:* ${player.money}\n\n"
 
 
-    # Информация о цветовых группах
-    color_groups = {}
-    for prop_id in player.properties:
-        cell = game.board.get_cell(prop_id)
-        if isinstance(cell, PropertyCell):
-            if cell.color_group not in color_groups:
-                color_groups[cell.color_group] = []
-            color_groups[cell.color_group].append(cell)
+    # Информация о цветовых группах и застройке - один анализ поля
+    building = game.board.analyze_building(player.user_id)
 
     response += f"🎨 *ЦВЕТОВЫЕ ГРУППЫ:*\n"
 
-    for color, properties in color_groups.items():
-        total_in_group = len([c for c in game.board.cells
-                              if isinstance(c, PropertyCell) and c.color_group == color])
+    for color, group in building["groups"].items():
+        properties = group["owned"]
+        total_in_group = group["total"]
 
         owned = len(properties)
         houses_count = sum(p.houses for p in properties)
@@ -3217,6 +2903,16 @@ async def houses_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             response += f"  • {prop.name} ({prop.id}) - {house_info} {mortgaged_info}\n"
 
+    # Окупаемость следующего дома по заранее посчитанной таблице
+    buildable = list(building["buildable"].values())
+    if buildable:
+        analytics = {row["position"]: row for row in get_board_analytics()["properties"]}
+        advice = sorted(((next_house_payback(analytics[prop["id"]], prop["houses"]), prop)
+                         for prop in buildable if prop["id"] in analytics), key=lambda item: item[0])
+        response += f"\n💡 *ОКУПАЕМОСТЬ СЛЕДУЮЩЕГО ДОМА:*\n"
+        for turns, prop in advice[:3]:
+            response += f"  • {prop['name']} ({prop['id']}): ${prop['price']}, ~{turns:.0f} ходов соперника\n"
+
     response += f"\n📋 *КОМАНДЫ:*\n"
     response += f"• `/build_house` - показать доступные для строительства\n"
     response += f"• `/build_hotel` - показать доступные для отелей\n"
@@ -3226,6 +2922,38 @@ async def houses_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+async def analytics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик /analytics - частоты попаданий и окупаемость улиц"""
+    analytics = get_board_analytics()
+    board = Board()
+
+    lines = ["📊 АНАЛИТИКА ПОЛЯ", ""]
+    lines.append("📍 Чаще всего попадают на:")
+    landing = analytics["landing"]
+    for position in sorted(range(len(landing)), key=lambda p: -landing[p])[:8]:
+        lines.append(f"  • {board.get_cell(position).name[:30]} ({position}) - {landing[position] * 100:.1f}%")
+
+    lines.append("")
+    lines.append("💰 Рента за ход одного соперника (без домов / 3 дома / отель)")
+    lines.append("и окупаемость отеля в ходах соперника:")
+    for row in analytics["properties"]:
+        expected = row["expected"]
+        lines.append(f"  • {row['name'][:22]} ({row['position']}): "
+                     f"${row['group_expected']:.1f} / ${expected[3]:.1f} / ${expected[5]:.1f}, "
+                     f"~{row['payback'][5]:.0f}")
+
+    lines.append("")
+    lines.append("🏗 Лучший первый дом (при полной группе):")
+    for row in best_investments(5):
+        lines.append(f"  • {row['name']} - ${row['house_price']}, окупится за ~{row['first_house_payback']:.0f} ходов")
+
+    lines.append("")
+    lines.append(f"🔒 В тюрьме проходит {analytics['jail_share'] * 100:.1f}% ходов")
+    lines.append("💡 При нескольких соперниках окупаемость делится на их число")
+
+    await update.message.reply_text("\n".join(lines))
+
+
 # async def my_trades_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 #     """Показать мои активные предложения торговли"""
 #     user = update.effective_user
@@ -3715,10 +3443,10 @@ async def jail_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Создаем клавиатуру для действий в тюрьме
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("🎲 Попытать удачу (бросить кубики)", callback_data=f"jail_roll_{game.game_id}")],
-        [InlineKeyboardButton(f"💵 Заплатить ${Config.JAIL_FINE}", callback_data=f"jail_pay_{game.game_id}")],
-        [InlineKeyboardButton("🎫 Использовать карту освобождения", callback_data=f"jail_card_{game.game_id}")],
-        [InlineKeyboardButton("⏳ Остаться еще ход", callback_data=f"jail_skip_{game.game_id}")],
+        [InlineKeyboardButton("🎲 Попытать удачу (бросить кубики)", callback_data=callback_router.build("jail_", "roll", game.game_id))],
+        [InlineKeyboardButton(f"💵 Заплатить ${Config.JAIL_FINE}", callback_data=callback_router.build("jail_", "pay", game.game_id))],
+        [InlineKeyboardButton("🎫 Использовать карту освобождения", callback_data=callback_router.build("jail_", "card", game.game_id))],
+        [InlineKeyboardButton("⏳ Остаться еще ход", callback_data=callback_router.build("jail_", "skip", game.game_id))],
     ])
 
     await update.message.reply_text(
@@ -3753,51 +3481,25 @@ async def send_game_board(update: Update, context: ContextTypes.DEFAULT_TYPE,
                           game, caption: str = "🎮 Текущее состояние игры"):
     """Отправляет изображение игрового поля"""
     try:
-        # Подготавливаем данные для рендерера
-        players_data = []
-        for player_id, player in game.players.items():
-            players_data.append({
-                "id": player_id,
-                "name": player.full_name,
-                "position": player.position,
-                "color": getattr(player, 'color', '🔴'),
-                "money": player.money
-            })
-
-        # Собираем информацию о собственности
-        properties_data = {}
-        for cell in game.board.cells:
-            if hasattr(cell, 'owner_id') and cell.owner_id:
-                properties_data[cell.id] = {
-                    "owner": cell.owner_id,
-                    "houses": getattr(cell, 'houses', 0),
-                    "hotel": getattr(cell, 'hotel', False)
-                }
-
-        # Генерируем изображение
-        game_data = {
-            "players": players_data,
-            "properties": properties_data
-        }
-
-        board_image = board_renderer.render_board(game_data)
-
-        # Конвертируем в bytes
-        img_bytes = board_renderer.save_to_bytes(board_image)
+        # Подготавливаем данные для отображения
+        game_data = game.render_snapshot()
 
         # Отправляем в Telegram
         if update.callback_query:
-            await update.callback_query.message.reply_photo(
-                photo=img_bytes,
-                caption=caption,
-                parse_mode="Markdown"
-            )
+            reply_photo = update.callback_query.message.reply_photo
         else:
-            await update.message.reply_photo(
-                photo=img_bytes,
-                caption=caption,
-                parse_mode="Markdown"
-            )
+            reply_photo = update.message.reply_photo
+
+        message = await send_board_photo(
+            reply_photo,
+            game_data,
+            caption=caption,
+            parse_mode="Markdown"
+        )
+
+        # Новое поле становится "живым" сообщением чата
+        game.board_messages[message.chat_id] = message.message_id
+        live_boards.seen(message.chat_id, message.message_id)
 
         return True
 
@@ -3865,11 +3567,11 @@ async def jail_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Проверяем доступные опции
     if player.get_out_of_jail_cards > 0:
         keyboard.append(
-            [InlineKeyboardButton("🎫 Использовать карту освобождения", callback_data=f"jail_card_{game.game_id}")])
+            [InlineKeyboardButton("🎫 Использовать карту освобождения", callback_data=callback_router.build("jail_", "card", game.game_id))])
 
     keyboard.append(
-        [InlineKeyboardButton(f"💵 Заплатить ${Config.JAIL_FINE}", callback_data=f"jail_pay_{game.game_id}")])
-    keyboard.append([InlineKeyboardButton("🎲 Попытаться выбросить дубль", callback_data=f"jail_roll_{game.game_id}")])
+        [InlineKeyboardButton(f"💵 Заплатить ${Config.JAIL_FINE}", callback_data=callback_router.build("jail_", "pay", game.game_id))])
+    keyboard.append([InlineKeyboardButton("🎲 Попытаться выбросить дубль", callback_data=callback_router.build("jail_", "roll", game.game_id))])
 
     await update.message.reply_text(
         f"🔒 *ТЮРЬМА - Круг {player.jail_turns + 1}/3*\n\n"
@@ -3885,222 +3587,40 @@ async def jail_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
-async def jail_pay_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def run_jail_command(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str):
+    """Общая часть /jail_pay, /jail_card и /jail_roll"""
     user = update.effective_user
     game = game_manager.get_player_game(user.id)
     if not game:
         await update.message.reply_text("❌ *Вы не в игре!*", parse_mode="Markdown")
         return
 
-    player = game.players.get(user.id)  # ← отдельное присваивание
-    if not player or not player.in_jail:
-        await update.message.reply_text("❌ Вы не в тюрьме!", parse_mode="Markdown")
-        return
-
-    current_player = game.get_current_player()
-    if not current_player or current_player.user_id != user.id:
-        await update.message.reply_text("⏳ *Не ваш ход!*", parse_mode="Markdown")
-        return
-
-    if game.get_current_player().user_id != user.id:
-        await update.message.reply_text("⏳ Ждите своего хода!", parse_mode="Markdown")
-        return
-
-    if player.money >= Config.JAIL_FINE:
-        player.deduct_money(Config.JAIL_FINE)
-        player.release_from_jail()
-        await update.message.reply_text(
-            f"💵 *Вы заплатили за выход!*\n"
-            f"💸 Списан: ${Config.JAIL_FINE}\n"
-            f"🔓 Вы вышли из тюрьмы!\n"
-            f"💰 Баланс: ${player.money}\n"
-            f"🎲 Теперь ваш ход! Используйте /roll.",
-            parse_mode="Markdown"
-        )
-        # ← НЕ передаем ход! Игрок вышел и может ходить сразу
-    else:
-        # ← ДОБАВИТЬ ЗДЕСЬ: увеличиваем круг и передаем ход
-        player.jail_turns += 1
-
-
-        if player.jail_turns >= 3:
-            # Автоматический выход через 3 круга
-            player.release_from_jail()
-            await update.message.reply_text(
-                f"❌ Недостаточно денег!\n"
-                f"⏰ Прошло 3 круга!\n"
-                f"🔓 Вы автоматически вышли из тюрьмы!\n"
-                f"🎲 Теперь ваш ход! Используйте /roll.",
-                parse_mode="Markdown"
-            )
+    result = game.perform_action(user.id, action)
+    if not result["success"]:
+        if result["error"] == "not_your_turn":
+            await update.message.reply_text("⏳ *Не ваш ход!*", parse_mode="Markdown")
         else:
-            await update.message.reply_text(
-                f"❌ Недостаточно денег!\n"
-                f"💸 Нужно: ${Config.JAIL_FINE}\n"
-                f"💰 У вас: ${player.money}\n"
-                f"🔒 Остаётесь в тюрьме.\n"
-                f"📅 Круг: {player.jail_turns}/3\n"
-                f"⏭️ Ход переходит следующему игроку.",
-                parse_mode="Markdown"
-            )
-            # ← ПЕРЕДАЧА ХОДА ЗДЕСЬ:
-            game.next_turn()
-            next_player = game.get_current_player()
-            if next_player:
-                try:
-                    await context.bot.send_message(
-                        chat_id=next_player.user_id,
-                        text=f"🎲 *Ваш ход!*\n\nИспользуйте `/roll`"
-                    )
-                except:
-                    pass
-
-    game_manager.save_game_state(game.game_id)
-
-
-async def jail_card_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
-    game = game_manager.get_player_game(user.id)
-    if not game:
-        await update.message.reply_text("❌ *Вы не в игре!*", parse_mode="Markdown")
-        return
-
-    player = game.players.get(user.id)  # ← отдельное присваивание
-    if not player or not player.in_jail:
-        await update.message.reply_text("❌ Вы не в тюрьме!", parse_mode="Markdown")
-        return
-
-    current_player = game.get_current_player()
-    if not current_player or current_player.user_id != user.id:
-        await update.message.reply_text("⏳ *Не ваш ход!*", parse_mode="Markdown")
-        return
-
-    if game.get_current_player().user_id != user.id:
-        await update.message.reply_text("⏳ Ждите своего хода!", parse_mode="Markdown")
+            await update.message.reply_text(f"❌ {result['message']}")
         return
 
-    if player.get_out_of_jail_cards > 0:
-        player.get_out_of_jail_cards -= 1
-        player.release_from_jail()
-        await update.message.reply_text(
-            f"🎫 *Карта использована!*\n"
-            f"🔓 Вы вышли из тюрьмы!\n"
-            f"📊 Осталось карт: {player.get_out_of_jail_cards}\n"
-            f"🎲 Теперь ваш ход! Используйте /roll.",
-            parse_mode="Markdown"
-        )
-        # ← НЕ передаем ход! Игрок вышел и может ходить сразу
-    else:
-        # ← ДОБАВИТЬ ЗДЕСЬ: увеличиваем круг и передаем ход
-        player.jail_turns += 1
-
-        if player.jail_turns >= 3:
-            # Автоматический выход через 3 круга
-            player.release_from_jail()
-            await update.message.reply_text(
-                f"❌ Нет карт освобождения!\n"
-                f"⏰ Прошло 3 круга!\n"
-                f"🔓 Вы автоматически вышли из тюрьмы!\n"
-                f"🎲 Теперь ваш ход! Используйте /roll.",
-                parse_mode="Markdown"
-            )
-        else:
-            await update.message.reply_text(
-                f"❌ Нет карт освобождения!\n"
-                f"🔒 Остаётесь в тюрьме.\n"
-                f"📅 Круг: {player.jail_turns}/3\n"
-                f"⏭️ Ход переходит следующему игроку.",
-                parse_mode="Markdown"
-            )
-            # ← ПЕРЕДАЧА ХОДА ЗДЕСЬ:
-            game.next_turn()
-            next_player = game.get_current_player()
-            if next_player:
-                try:
-                    await context.bot.send_message(
-                        chat_id=next_player.user_id,
-                        text=f"🎲 *Ваш ход!*\n\nИспользуйте `/roll`"
-                    )
-                except:
-                    pass
-
-
+    await update.message.reply_text("\n".join(describe_turn_events(game, result["events"])))
     game_manager.save_game_state(game.game_id)
-async def jail_roll_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
-    game = game_manager.get_player_game(user.id)
-    if not game:
-        await update.message.reply_text("❌ *Вы не в игре!*", parse_mode="Markdown")
-        return
-
-    player = game.players.get(user.id)  # ← отдельное присваивание
-    if not player or not player.in_jail:
-        await update.message.reply_text("❌ Вы не в тюрьме!", parse_mode="Markdown")
-        return
+    await announce_turn_result(game, context, user.id, result)
 
-    current_player = game.get_current_player()
-    if not current_player or current_player.user_id != user.id:
-        await update.message.reply_text("⏳ *Не ваш ход!*", parse_mode="Markdown")
-        return
 
-    if game.get_current_player().user_id != user.id:
-        await update.message.reply_text("⏳ Ждите своего хода!", parse_mode="Markdown")
-        return
+async def jail_pay_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик /jail_pay - заплатить штраф"""
+    await run_jail_command(update, context, "jail_pay")
 
-    dice1, dice2, total = game.roll_dice()
 
-    if dice1 == dice2:
-        # Успешный дубль — выход
-        player.release_from_jail()
-        await update.message.reply_text(
-            f"🎲 *ДУБЛЬ!*\n"
-            f"🎯 {dice1} + {dice2} = {total}\n"
-            f"🔓 Вы вышли из тюрьме бесплатно!\n"
-            f"🎲 Теперь ваш ход! Используйте /roll для продолжения.",
-            parse_mode="Markdown"
-        )
-        # ← НЕ передаем ход! Игрок вышел и может ходить сразу
-    else:
-        # Неудачная попытка
-        player.jail_turns += 1  # Увеличиваем круг
+async def jail_card_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик /jail_card - карта освобождения"""
+    await run_jail_command(update, context, "jail_card")
 
-        if player.jail_turns >= 3:
-            # 3-й ход — автоматический выход
-            player.release_from_jail()
-            await update.message.reply_text(
-                f"🎲 *Нет дубля*\n"
-                f"🎯 {dice1} + {dice2} = {total}\n"
-                f"⏰ Прошло 3 круга!\n"
-                f"🔓 Вы автоматически вышли из тюрьмы!\n"
-                f"🎲 Теперь ваш ход! Используйте /roll.",
-                parse_mode="Markdown"
-            )
-        else:
-            await update.message.reply_text(
-                f"🎲 *Нет дубля*\n"
-                f"🎯 {dice1} + {dice2} = {total}\n"
-                f"🔒 Остаётесь в тюрьме.\n"
-                f"📅 Круг: {player.jail_turns}/3\n"
-                f"⏭️ Ход переходит следующему игроку.",
-                parse_mode="Markdown"
-            )
-            # ← ПЕРЕДАЧА ХОДА ЗДЕСЬ:
-            game.next_turn()
-            next_player = game.get_current_player()
-            if next_player:
-                try:
-                    await context.bot.send_message(
-                        chat_id=next_player.user_id,
-                        text=f"🎲 *Ваш ход!*\n\n"
-                             f"👤 {next_player.full_name}\n"
-                             f"💰 Баланс: ${next_player.money}\n\n"
-                             f"Используйте `/roll` чтобы бросить кубики",
-                        parse_mode="Markdown"
-                    )
-                except:
-                    pass
 
-    game_manager.save_game_state(game.game_id)
+async def jail_roll_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик /jail_roll - попытка выбросить дубль"""
+    await run_jail_command(update, context, "jail_roll")
 
 async def test_jail_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик /roll с полной обработкой клеток"""
@@ -4669,6 +4189,61 @@ async def cleanup_job(context: ContextTypes.DEFAULT_TYPE):
             game.cleanup_expired_trades()
 # ========== ЗАПУСК БОТА ==========
 
+# Бот обрабатывает только сообщения и нажатия кнопок - остальные обновления Telegram не присылает
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+async def on_startup(application: Application):
+    """Запуск фоновых задач после инициализации бота"""
+    game_manager.start_save_queue()
+
+
+async def on_shutdown(application: Application):
+    """Сохранение несохраненных игр при остановке бота"""
+    await game_manager.stop_save_queue()
+
+    stats = send_scheduler.get_stats()
+    print(f"📤 Отправка: {stats['sent']} запросов, объединено {stats['coalesced']}, RetryAfter {stats['retried']}, "
+          f"ошибок {stats['failed']}, среднее ожидание {stats['avg_wait'] * 1000:.0f} мс, "
+          f"максимум {stats['max_wait'] * 1000:.0f} мс")
+
+    stats = live_boards.get_stats()
+    print(f"🗺️ Живое поле: подпись изменена {stats['edited']}, картинка заменена {stats['media_edited']}, "
+          f"новых сообщений {stats['sent']}")
+
+    # Время обработки кнопок по маршрутам
+    for name, stats in callback_router.get_stats().items():
+        if stats["calls"]:
+            print(f"🔘 {name}: {stats['calls']} нажатий, среднее {stats['avg_time'] * 1000:.1f} мс, "
+                  f"максимум {stats['max_time'] * 1000:.1f} мс, ошибок {stats['errors']}")
+
+
+def run_webhook(app: Application):
+    """
+    Получать обновления через webhook вместо long polling
+
+    HTTP-сервер слушает WEBHOOK_LISTEN:WEBHOOK_PORT/WEBHOOK_PATH, TLS и балансировку
+    берет на себя обратный прокси. Telegram присылает обновления на WEBHOOK_URL
+    (адрес прокси) с секретом WEBHOOK_SECRET в заголовке.
+    """
+    url_path = Config.WEBHOOK_PATH.strip("/")
+    # Без WEBHOOK_URL Telegram будет слать прямо на listen:port (для локальной проверки)
+    webhook_url = f"{Config.WEBHOOK_URL.rstrip('/')}/{url_path}" if Config.WEBHOOK_URL else None
+
+    print(f"🌐 Webhook: слушаем {Config.WEBHOOK_LISTEN}:{Config.WEBHOOK_PORT}/{url_path}")
+    if webhook_url:
+        print(f"🌐 Адрес для Telegram: {webhook_url}")
+
+    app.run_webhook(
+        listen=Config.WEBHOOK_LISTEN,
+        port=Config.WEBHOOK_PORT,
+        url_path=url_path,
+        webhook_url=webhook_url,
+        secret_token=Config.WEBHOOK_SECRET or None,
+        max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=ALLOWED_UPDATES,
+    )
+
+
 def main():
     """Главная функция запуска бота"""
     print("=" * 60)
@@ -4677,7 +4252,18 @@ def main():
     print("=" * 60)
 
     try:
-        app = Application.builder().token(Config.BOT_TOKEN).build()
+        builder = (
+            Application.builder()
+            .token(Config.BOT_TOKEN)
+            .post_init(on_startup)
+            .post_shutdown(on_shutdown)
+            .concurrent_updates(Config.CONCURRENT_UPDATES)
+            .rate_limiter(send_scheduler)
+        )
+        if Config.BOT_API_URL:
+            # Свой сервер Bot API (или локальный тестовый)
+            builder = builder.base_url(Config.BOT_API_URL)
+        app = builder.build()
     except Exception as e:
         print(f"❌ Ошибка создания приложения: {e}")
         return
@@ -4713,6 +4299,7 @@ def main():
         ("build_hotel", build_hotel_command),
         ("sell_house", sell_house_command),
         ("houses", houses_command),
+        ("analytics", analytics_command),
         ("trade", trade_command),  # ← ЭТУ СТРОКУ ДОБАВЬТЕ (если функции нет, создайте её ниже)
         ("cancel", cancel_command),
         ("my_trades", my_trades_command),
@@ -4722,7 +4309,7 @@ def main():
         ("test_trade", test_trade_command), #удалить после тестов
     ]
     print("\n💬 Регистрируем обработчик текстовых сообщений...")
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_input))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, serialized_by_game(handle_text_input)))
     print(f"✅ MessageHandler зарегистрирован")
     job_queue = app.job_queue
     if job_queue:
@@ -4730,13 +4317,15 @@ def main():
 
     # 1. ВСЕ КОМАНДЫ ПЕРВЫМИ
     print("\n📋 Регистрируем команды:")
+    # Команды, которые меняют чужую игру: блокируем и ее
+    command_targets = {"join": join_target}
     for cmd, handler in commands:
-        app.add_handler(CommandHandler(cmd, handler))
+        app.add_handler(CommandHandler(cmd, serialized_by_game(handler, command_targets.get(cmd))))
         print(f"✅ /{cmd}")
 
     # 2. ОБРАБОТЧИК КНОПОК ВТОРЫМ
     print("\n🔘 Регистрируем обработчик кнопок...")
-    app.add_handler(CallbackQueryHandler(button_handler))
+    app.add_handler(CallbackQueryHandler(serialized_by_game(button_handler, callback_target)))
     print(f"✅ CallbackQueryHandler зарегистрирован")
 
 
@@ -4744,7 +4333,13 @@ def main():
     print("📱 Перейдите в Telegram и начните диалог с ботом")
     print("=" * 60)
 
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if Config.BOT_MODE == "webhook":
+        run_webhook(app)
+    else:
+        app.run_polling(allowed_updates=ALLOWED_UPDATES)
+
+    # Останавливаем пул рендеринга
+    render_service.shutdown()
 
 
 if __name__ == "__main__":
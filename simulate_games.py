@@ -0,0 +1,84 @@
+# simulate_games.py
+"""
+Монте-Карло симуляция партий для настройки цен и карточек
+
+Играет партии на движке игры (src/backend/simulator.py) в нескольких
+процессах и печатает частоты попаданий на клетки, ренту по собственности и
+уровню застройки, длину партий и победы стратегий.
+
+Запуск: python simulate_games.py [партий] [стратегии через запятую] [зерно] [процессов] [лимит ходов]
+Пример: python simulate_games.py 2000 buy_all,cautious,builder,never_buy 42 4
+Стратегии: buy_all, cautious, builder, never_buy
+"""
+import logging
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, 'src', 'backend'))
+
+from src.backend.board import Board
+from src.backend.simulator import run_simulation
+
+
+def print_report(stats, elapsed: float, processes: int):
+    board = Board()
+    names = {cell.id: cell.name for cell in board.cells}
+
+    print("=" * 70)
+    print(f"🎲 Партий: {stats.games}, ходов: {stats.turns}, действий: {stats.actions}")
+    print(f"⏱ {elapsed:.2f} с на {processes} проц.: {stats.turns / elapsed:,.0f} ходов/с, "
+          f"{stats.actions / elapsed:,.0f} действий/с")
+    if stats.elapsed:
+        print(f"   на одно ядро: {stats.turns / stats.elapsed:,.0f} ходов/с, "
+              f"{stats.actions / stats.elapsed:,.0f} действий/с")
+
+    print("\n📍 Попадания на клетки:")
+    frequencies = stats.landing_frequencies()
+    for position in sorted(range(len(frequencies)), key=lambda p: -frequencies[p]):
+        print(f"   {position:>2}. {names.get(position, '?')[:32]:<32} {frequencies[position] * 100:5.2f}%")
+
+    print("\n💰 Рента по собственности (уровень: средняя рента × попаданий; 5 - отель):")
+    for position, levels in stats.rent_table().items():
+        cell = board.get_cell(position)
+        parts = [f"{level}: ${row['average']:.0f}×{row['count']}" for level, row in levels.items()]
+        total = sum(row["total"] for row in levels.values())
+        print(f"   {position:>2}. {cell.name[:28]:<28} ${cell.price:<4} всего ${total:<9} " + ", ".join(parts))
+
+    summary = stats.length_summary()
+    print("\n⏳ Длина партий (ходов):")
+    print(f"   среднее {summary['mean']:.0f}, медиана {summary['median']}, "
+          f"10% {summary['p10']}, 90% {summary['p90']}, максимум {summary['max']}")
+    print(f"   доиграно до победителя: {stats.finished}, остановлено по лимиту: {stats.capped}")
+    histogram = stats.length_histogram(bucket=100)
+    peak = max((count for _, count in histogram), default=1)
+    for start, count in histogram:
+        print(f"   {start:>5}-{start + 99:<5} {'█' * max(1, count * 40 // peak)} {count}")
+
+    if stats.wins:
+        print("\n🏆 Победы стратегий:")
+        for name, count in sorted(stats.wins.items(), key=lambda item: -item[1]):
+            print(f"   {name:<12} {count} ({count / stats.games * 100:.1f}%)")
+    print("=" * 70)
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    strategies = sys.argv[2].split(",") if len(sys.argv) > 2 else ["buy_all", "cautious", "builder", "never_buy"]
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    processes = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count() or 1
+    max_turns = int(sys.argv[5]) if len(sys.argv) > 5 else 1000
+
+    logging.disable(logging.INFO)
+    print(f"\n🎲 Симуляция: {games} партий, стратегии {', '.join(strategies)}, зерно {seed}, "
+          f"процессов {processes}")
+
+    started = time.perf_counter()
+    stats = run_simulation(games, strategies, seed=seed, processes=processes, max_turns=max_turns)
+    print_report(stats, time.perf_counter() - started, processes)
+
+
+if __name__ == "__main__":
+    main()
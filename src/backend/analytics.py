@@ -0,0 +1,225 @@
+"""
+Аналитика поля: вероятности попаданий и окупаемость улиц
+
+Марковская цепь по началам ходов: 40 клеток + 3 круга в тюрьме. Для каждого
+начального состояния перебираются все броски хода (дубли, третий дубль,
+клетка "в тюрьму", перемещения карточек из GameConfig.CHANCE_CARDS и
+CHEST_CARDS), из них - переходы к началу следующего хода и ожидаемое число
+попаданий на клетки. Стационарное распределение дает частоту попаданий и
+ожидаемую ренту каждой улицы за ход соперника на каждом уровне застройки.
+
+Поле одинаково во всех играх, поэтому таблица считается один раз и кэшируется.
+NumPy используется, если установлен; без него - тот же расчет на Python.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from board import Board, PropertyCell, CellType, HOTEL_LEVEL
+from game import GameConfig
+
+BOARD_CELLS = 40
+JAIL_POSITION = 10
+JAIL_STATES = 3  # круги в тюрьме (0, 1, 2 неудачные попытки)
+STATES = BOARD_CELLS + JAIL_STATES
+
+# Суммы кубиков: (сумма, вероятность) для дублей и не дублей
+DOUBLE_ROLLS = [(2 * d, 1 / 36) for d in range(1, 7)]
+PLAIN_ROLLS = [(total, sum(1 for d1 in range(1, 7) for d2 in range(1, 7) if d1 != d2 and d1 + d2 == total) / 36)
+               for total in range(3, 12)]
+
+
+def _redirects(board: Board, position: int) -> List[Tuple[int, float, bool]]:
+    """Куда игрок попадает после клетки: [(клетка, вероятность, в тюрьму)]"""
+    cell = board.get_cell(position)
+    if cell.type == CellType.GO_TO_JAIL:
+        return [(JAIL_POSITION, 1.0, True)]
+
+    if cell.type in (CellType.CHANCE, CellType.CHEST):
+        deck = GameConfig.CHANCE_CARDS if cell.type == CellType.CHANCE else GameConfig.CHEST_CARDS
+        share = 1.0 / len(deck)
+        outcomes = []
+        for card in deck:
+            if card.get("action") == "go_to_jail":
+                outcomes.append((JAIL_POSITION, share, True))
+            elif card.get("action") == "move_to" and isinstance(card.get("value"), int):
+                outcomes.append((card["value"], share, False))
+            else:
+                outcomes.append((position, share, False))
+        return outcomes
+
+    return [(position, 1.0, False)]
+
+
+def _turn_outcomes(board: Board, state: int, jail_policy: str):
+    """
+    Один ход из начального состояния
+
+    Returns:
+        (вероятности следующего состояния, попадания на клетки, попадания с броска)
+    """
+    next_state = [0.0] * STATES
+    landings = [0.0] * BOARD_CELLS
+    dice_landings = [0.0] * BOARD_CELLS  # только по броску: рента берется только здесь
+    redirects = {}
+
+    def walk(position: int, doubles: int, prob: float):
+        for rolls, is_double in ((DOUBLE_ROLLS, True), (PLAIN_ROLLS, False)):
+            for total, p in rolls:
+                p *= prob
+                if is_double and doubles == 2:
+                    next_state[BOARD_CELLS] += p  # третий дубль - в тюрьму
+                    continue
+
+                cell = (position + total) % BOARD_CELLS
+                landings[cell] += p
+                dice_landings[cell] += p
+                if cell not in redirects:
+                    redirects[cell] = _redirects(board, cell)
+
+                for target, share, jailed in redirects[cell]:
+                    q = p * share
+                    if jailed:
+                        next_state[BOARD_CELLS] += q
+                        continue
+                    if target != cell:
+                        landings[target] += q
+                    if is_double:
+                        walk(target, doubles + 1, q)
+                    else:
+                        next_state[target] += q
+
+    if state < BOARD_CELLS:
+        walk(state, 0, 1.0)
+    elif jail_policy == "pay":
+        walk(JAIL_POSITION, 0, 1.0)
+    else:
+        # Попытка выбросить дубль; после третьей неудачи - выход и обычный бросок
+        attempt = state - BOARD_CELLS
+        walk(JAIL_POSITION, 0, 1 / 6)
+        if attempt + 1 < JAIL_STATES:
+            next_state[state + 1] += 5 / 6
+        else:
+            walk(JAIL_POSITION, 0, 5 / 6)
+
+    return next_state, landings, dice_landings
+
+
+def _steady_state(matrix: List[List[float]]) -> List[float]:
+    """Стационарное распределение цепи (pi = pi * P, сумма 1)"""
+    size = len(matrix)
+    if np is not None:
+        a = np.array(matrix).T - np.eye(size)
+        a[-1, :] = 1.0
+        b = np.zeros(size)
+        b[-1] = 1.0
+        return np.linalg.solve(a, b).tolist()
+
+    pi = [1.0 / size] * size
+    for _ in range(10000):
+        new = [0.0] * size
+        for i, row in enumerate(matrix):
+            weight = pi[i]
+            if weight:
+                for j, p in enumerate(row):
+                    if p:
+                        new[j] += weight * p
+        delta = max(abs(a - b) for a, b in zip(new, pi))
+        pi = new
+        if delta < 1e-13:
+            break
+    return pi
+
+
+def _weighted(pi: List[float], rows: List[List[float]]) -> List[float]:
+    """pi @ rows"""
+    if np is not None:
+        return (np.array(pi) @ np.array(rows)).tolist()
+    return [sum(pi[s] * rows[s][c] for s in range(len(pi))) for c in range(len(rows[0]))]
+
+
+@lru_cache(maxsize=4)
+def get_board_analytics(jail_policy: str = "roll") -> Dict[str, Any]:
+    """
+    Частоты попаданий и окупаемость улиц (считается один раз)
+
+    Args:
+        jail_policy: "roll" - в тюрьме бросать на дубль, "pay" - сразу платить
+    Returns:
+        {"landing": [доля попаданий по клеткам], "landings_per_turn": попаданий за ход,
+         "jail_share": доля ходов в тюрьме, "properties": [строки по улицам], "backend": "numpy"/"python"}
+    """
+    board = Board()
+    matrix, landings, dice_landings = [], [], []
+    for state in range(STATES):
+        next_state, cell_landings, cell_dice_landings = _turn_outcomes(board, state, jail_policy)
+        matrix.append(next_state)
+        landings.append(cell_landings)
+        dice_landings.append(cell_dice_landings)
+
+    pi = _steady_state(matrix)
+    per_turn = _weighted(pi, landings)
+    dice_per_turn = _weighted(pi, dice_landings)
+    total = sum(per_turn)
+
+    properties = [cell for cell in board.cells if isinstance(cell, PropertyCell)]
+    hits = [dice_per_turn[cell.id] for cell in properties]
+    rents = [cell.rent[:HOTEL_LEVEL + 1] for cell in properties]
+    costs = [[cell.price + cell.house_price * level for level in range(HOTEL_LEVEL)]
+             + [cell.price + cell.house_price * 4 + cell.hotel_price] for cell in properties]
+
+    # Ожидаемая рента за ход соперника и окупаемость (в ходах соперника) по уровням
+    if np is not None:
+        expected = np.array(hits)[:, None] * np.array(rents, dtype=float)
+        payback = np.array(costs, dtype=float) / expected
+        expected, payback = expected.tolist(), payback.tolist()
+    else:
+        expected = [[hit * rent for rent in row] for hit, row in zip(hits, rents)]
+        payback = [[cost / value for cost, value in zip(cost_row, row)] for cost_row, row in zip(costs, expected)]
+
+    rows = []
+    for i, cell in enumerate(properties):
+        rows.append({
+            "position": cell.id,
+            "name": cell.name,
+            "color_group": cell.color_group,
+            "price": cell.price,
+            "house_price": cell.house_price,
+            "hotel_price": cell.hotel_price,
+            "landing": per_turn[cell.id] / total,
+            "hits_per_turn": hits[i],
+            "rent": rents[i],
+            "expected": expected[i],  # по уровням 0-4 дома, 5 - отель
+            "group_expected": hits[i] * rents[i][0] * 2,  # без домов при полной группе
+            "cost": costs[i],
+            "payback": payback[i],
+        })
+
+    return {
+        "landing": [value / total for value in per_turn],
+        "landings_per_turn": total,
+        "jail_share": sum(pi[BOARD_CELLS:]),
+        "properties": rows,
+        "backend": "numpy" if np is not None else "python",
+    }
+
+
+def next_house_payback(row: Dict[str, Any], level: int) -> float:
+    """За сколько ходов соперника окупится следующий дом (или отель) на уровне level"""
+    step = level + 1
+    previous = row["group_expected"] if level == 0 else row["expected"][level]
+    gain = row["expected"][step] - previous
+    price = row["hotel_price"] if step == HOTEL_LEVEL else row["house_price"]
+    return price / gain if gain > 0 else float("inf")
+
+
+def best_investments(limit: int = 5, jail_policy: str = "roll") -> List[Dict[str, Any]]:
+    """Улицы с самой быстрой окупаемостью первого дома при полной группе"""
+    rows = get_board_analytics(jail_policy)["properties"]
+    ranked = sorted(rows, key=lambda row: next_house_payback(row, 0))
+    return [dict(row, first_house_payback=next_house_payback(row, 0)) for row in ranked[:limit]]
@@ -1,5 +1,7 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from array import array
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Optional, Dict, Any, Mapping, Tuple
 from enum import Enum
 import random
 
@@ -17,57 +19,143 @@ class CellType(Enum):
     GO = "go"
 
 
-@dataclass
-class BoardCell:
-    """Базовый класс клетки"""
+@dataclass(frozen=True)
+class CellDefinition:
+    """Неизменяемое описание клетки (одно на все игры)"""
     id: int
     name: str
     type: CellType
     description: str = ""
     price: int = 0
-    owner_id: Optional[int] = None
-    mortgaged: bool = False
-    houses: int = 0  # <-- ДОБАВЛЕНО
-    hotel: bool = False  # <-- ДОБАВЛЕНО
+    color_group: str = ""
+    house_price: int = 0
+    hotel_price: int = 0
+    rent: Tuple[int, ...] = ()
+
+    def __post_init__(self):
+        # Описание общее для всех игр: таблицу ренты нельзя менять на месте
+        object.__setattr__(self, "rent", tuple(self.rent))
+
+
+# Флаги клетки в Board.flags
+FLAG_MORTGAGED = 1
+FLAG_HOTEL = 2
+
+
+class BoardCell:
+    """
+    Клетка поля: общее описание (CellDefinition) + состояние из массивов Board
+
+    Владелец, дома, отель и залог хранятся в Board.owners/houses/flags,
+    клетка только читает и пишет их по своему номеру.
+    """
+
+    __slots__ = ('id', 'definition', '_board')
+
+    def __init__(self, board: "Board", definition: CellDefinition):
+        self.id = definition.id
+        self.definition = definition
+        self._board = board
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id}, name={self.name!r}, owner_id={self.owner_id})"
+
+    @property
+    def name(self) -> str:
+        return self.definition.name
+
+    @property
+    def type(self) -> CellType:
+        return self.definition.type
+
+    @property
+    def description(self) -> str:
+        return self.definition.description
+
+    @property
+    def price(self) -> int:
+        return self.definition.price
+
+    @property
+    def owner_id(self) -> Optional[int]:
+        return self._board.owners[self.id] or None
+
+    @owner_id.setter
+    def owner_id(self, value: Optional[int]):
+        self._board.owners[self.id] = value or 0
+
+    @property
+    def houses(self) -> int:
+        return self._board.houses[self.id]
+
+    @houses.setter
+    def houses(self, value: int):
+        self._board.houses[self.id] = value
+
+    @property
+    def hotel(self) -> bool:
+        return bool(self._board.flags[self.id] & FLAG_HOTEL)
+
+    @hotel.setter
+    def hotel(self, value: bool):
+        self._set_flag(FLAG_HOTEL, value)
+
+    @property
+    def mortgaged(self) -> bool:
+        return bool(self._board.flags[self.id] & FLAG_MORTGAGED)
+
+    @mortgaged.setter
+    def mortgaged(self, value: bool):
+        self._set_flag(FLAG_MORTGAGED, value)
+
+    def _set_flag(self, flag: int, value: bool):
+        flags = self._board.flags
+        flags[self.id] = flags[self.id] | flag if value else flags[self.id] & ~flag
 
     def get_rent(self, dice_roll: int = 0, owner_assets: Dict = None) -> int:
         """Получить стоимость ренты"""
         return 0
 
-@dataclass
+
 class PropertyCell(BoardCell):
     """Клетка улицы (недвижимость)"""
-    color_group: str = ""
-    house_price: int = 0
-    hotel_price: int = 0
-    rent: List[int] = field(default_factory=list)
-    houses: int = 0
-    hotel: bool = False
 
-    def __post_init__(self):
-        self.type = CellType.PROPERTY
+    __slots__ = ()
+
+    @property
+    def color_group(self) -> str:
+        return self.definition.color_group
+
+    @property
+    def house_price(self) -> int:
+        return self.definition.house_price
+
+    @property
+    def hotel_price(self) -> int:
+        return self.definition.hotel_price
+
+    @property
+    def rent(self) -> Tuple[int, ...]:
+        return self.definition.rent
 
     def get_rent(self, dice_roll: int = 0, owner_assets: Dict = None) -> int:
         if not self.owner_id or self.mortgaged:
             return 0
 
+        rent = self.definition.rent
         if self.hotel:
-            return self.rent[5] if len(self.rent) > 5 else self.rent[-1]
+            return rent[5] if len(rent) > 5 else rent[-1]
         elif self.houses > 0:
-            return self.rent[self.houses] if self.houses < len(self.rent) else self.rent[-1]
+            return rent[self.houses] if self.houses < len(rent) else rent[-1]
         else:
             # Если владелец имеет все улицы группы цветов, рента удваивается
             if owner_assets and len(owner_assets.get(self.color_group, [])) == self._get_group_size():
-                return self.rent[0] * 2
-            return self.rent[0]
+                return rent[0] * 2
+            return rent[0]
 
     def _get_group_size(self) -> int:
         """Получить размер группы цветов"""
-        group_sizes = {
-            "brown": 2, "light_blue": 3, "pink": 3, "orange": 3,
-            "red": 3, "yellow": 3, "green": 3, "dark_blue": 2
-        }
-        return group_sizes.get(self.color_group, 2)
+        return GROUP_SIZES.get(self.color_group, 2)
 
     def can_build_house(self, owner_properties: Dict[str, List]) -> bool:
         """Можно ли построить дом"""
@@ -110,13 +198,10 @@ class PropertyCell(BoardCell):
         return False
 
 
-@dataclass
 class StationCell(BoardCell):
     """Клетка вокзала"""
 
-    def __post_init__(self):
-        self.type = CellType.STATION
-        self.price = 200
+    __slots__ = ()
 
     def get_rent(self, dice_roll: int = 0, owner_assets: Dict = None) -> int:
         if not self.owner_id or self.mortgaged:
@@ -128,13 +213,10 @@ class StationCell(BoardCell):
         return rents[min(station_count - 1, 3)]
 
 
-@dataclass
 class UtilityCell(BoardCell):
     """Клетка коммунального предприятия"""
 
-    def __post_init__(self):
-        self.type = CellType.UTILITY
-        self.price = 150
+    __slots__ = ()
 
     def get_rent(self, dice_roll: int = 0, owner_assets: Dict = None) -> int:
         if not self.owner_id or self.mortgaged:
@@ -146,298 +228,426 @@ class UtilityCell(BoardCell):
         return dice_roll * multiplier
 
 
+# Уровень застройки "отель" в компактном состоянии поля
+HOTEL_LEVEL = 5
+
+
+# Клетки поля Монополии (общие для всех игр)
+CELL_DEFINITIONS: Tuple[CellDefinition, ...] = (
+        CellDefinition(0, "Старт", CellType.GO, "Получите 200$ при прохождении"),
+
+        # Коричневые улицы
+        CellDefinition(
+            id=1,
+            name="Дикси",
+            type=CellType.PROPERTY,
+            color_group="brown",
+            price=60,
+            house_price=50,
+            hotel_price=200,
+            rent=[2, 10, 30, 90, 160, 250]
+        ),
+        CellDefinition(2, "Общественная казна", CellType.CHEST),
+        CellDefinition(
+            id=3,
+            name="Красное&белое",
+            type=CellType.PROPERTY,
+            color_group="brown",
+            price=60,
+            house_price=50,
+            hotel_price=200,
+            rent=[4, 20, 60, 180, 320, 450]
+        ),
+        CellDefinition(4, "Взносы МСГ", CellType.TAX, "Заплатите 200$ за проживание", 200),
+
+        # Метро
+        CellDefinition(id=5, name="Ст. метро Московская", type=CellType.STATION, price=200),
+
+        # Голубые улицы
+        CellDefinition(
+            id=6,
+            name="Мед. кабинет",
+            type=CellType.PROPERTY,
+            color_group="light_blue",
+            price=100,
+            house_price=50,
+            hotel_price=250,
+            rent=[6, 30, 90, 270, 400, 550]
+        ),
+        CellDefinition(7, "Шанс", CellType.CHANCE),
+        CellDefinition(
+            id=8,
+            name="2 отдел",
+            type=CellType.PROPERTY,
+            color_group="light_blue",
+            price=100,
+            house_price=50,
+            hotel_price=250,
+            rent=[6, 30, 90, 270, 400, 550]
+        ),
+        CellDefinition(
+            id=9,
+            name="МФЦ",
+            type=CellType.PROPERTY,
+            color_group="light_blue",
+            price=120,
+            house_price=50,
+            hotel_price=250,
+            rent=[8, 40, 100, 300, 450, 600]
+        ),
+
+        # Тюрьма
+        CellDefinition(10, "Деканат. Просто посещение. Попейте чаек с администрацией", CellType.JAIL, "Просто посещение"),
+
+        # Розовые улицы
+        CellDefinition(
+            id=11,
+            name="Исаакиевский сквер",
+            type=CellType.PROPERTY,
+            color_group="pink",
+            price=140,
+            house_price=100,
+            hotel_price=300,
+            rent=[10, 50, 150, 450, 625, 750]
+        ),
+        CellDefinition(id=12, name="Чесменская церковь", type=CellType.UTILITY, price=150),
+        CellDefinition(
+            id=13,
+            name="Парк 300-летия",
+            type=CellType.PROPERTY,
+            color_group="pink",
+            price=140,
+            house_price=100,
+            hotel_price=300,
+            rent=[10, 50, 150, 450, 625, 750]
+        ),
+        CellDefinition(
+            id=14,
+            name="Новая Голландия",
+            type=CellType.PROPERTY,
+            color_group="pink",
+            price=160,
+            house_price=100,
+            hotel_price=300,
+            rent=[12, 60, 180, 500, 700, 900]
+        ),
+        CellDefinition(id=15, name="Ст. метро Театральная", type=CellType.STATION, price=200),
+
+        # Оранжевые улицы
+        CellDefinition(
+            id=16,
+            name="Варшавская",
+            type=CellType.PROPERTY,
+            color_group="orange",
+            price=180,
+            house_price=100,
+            hotel_price=400,
+            rent=[14, 70, 200, 550, 750, 950]
+        ),
+        CellDefinition(17, "Общественная казна", CellType.CHEST),
+        CellDefinition(
+            id=18,
+            name="Передовиков",
+            type=CellType.PROPERTY,
+            color_group="orange",
+            price=180,
+            house_price=100,
+            hotel_price=400,
+            rent=[14, 70, 200, 550, 750, 950]
+        ),
+        CellDefinition(
+            id=19,
+            name="Жукова",
+            type=CellType.PROPERTY,
+            color_group="orange",
+            price=200,
+            house_price=100,
+            hotel_price=400,
+            rent=[16, 80, 220, 600, 800, 1000]
+        ),
+
+        # Бесплатная стоянка
+        CellDefinition(20, "Коворкинг с космонавтом. Просто отдохните во время окна", CellType.FREE_PARKING),
+
+        # Красные улицы
+        CellDefinition(
+            id=21,
+            name="Точка кипения",
+            type=CellType.PROPERTY,
+            color_group="red",
+            price=220,
+            house_price=150,
+            hotel_price=500,
+            rent=[18, 90, 250, 700, 875, 1050]
+        ),
+        CellDefinition(22, "Шанс", CellType.CHANCE),
+        CellDefinition(
+            id=23,
+            name="Актовый зал",
+            type=CellType.PROPERTY,
+            color_group="red",
+            price=220,
+            house_price=150,
+            hotel_price=500,
+            rent=[18, 90, 250, 700, 875, 1050]
+        ),
+        CellDefinition(
+            id=24,
+            name="Зал Да Винчи",
+            type=CellType.PROPERTY,
+            color_group="red",
+            price=240,
+            house_price=150,
+            hotel_price=500,
+            rent=[20, 100, 300, 750, 925, 1100]
+        ),
+        CellDefinition(id=25, name="Ст. метро Сенная площадь", type=CellType.STATION, price=200),
+
+        # Желтые улицы
+        CellDefinition(
+            id=26,
+            name="Ленсовета, 14",
+            type=CellType.PROPERTY,
+            color_group="yellow",
+            price=260,
+            house_price=150,
+            hotel_price=600,
+            rent=[22, 110, 330, 800, 975, 1150]
+        ),
+        CellDefinition(
+            id=27,
+            name="Гастелло, 15",
+            type=CellType.PROPERTY,
+            color_group="yellow",
+            price=260,
+            house_price=150,
+            hotel_price=600,
+            rent=[22, 110, 330, 800, 975, 1150]
+        ),
+        CellDefinition(id=28, name="Шавермечная", type=CellType.UTILITY, price=150),
+        CellDefinition(
+            id=29,
+            name="Большая Морская, 67",
+            type=CellType.PROPERTY,
+            color_group="yellow",
+            price=280,
+            house_price=150,
+            hotel_price=600,
+            rent=[24, 120, 360, 850, 1025, 1200]
+        ),
+
+        # Отправка в тюрьму
+        CellDefinition(30, "Вы не закрыли сессию и попадаете на комиссию. Отправляйтесь в деканат решать этот вопрос", CellType.GO_TO_JAIL),
+
+        # Зеленые улицы
+        CellDefinition(
+            id=31,
+            name="Вольчека",
+            type=CellType.PROPERTY,
+            color_group="green",
+            price=300,
+            house_price=200,
+            hotel_price=750,
+            rent=[26, 130, 390, 900, 1100, 1275]
+        ),
+        CellDefinition(
+            id=32,
+            name="Люди любят",
+            type=CellType.PROPERTY,
+            color_group="green",
+            price=300,
+            house_price=200,
+            hotel_price=750,
+            rent=[26, 130, 390, 900, 1100, 1275]
+        ),
+        CellDefinition(33, "Общественная казна", CellType.CHEST),
+        CellDefinition(
+            id=34,
+            name="Цех 85",
+            type=CellType.PROPERTY,
+            color_group="green",
+            price=320,
+            house_price=200,
+            hotel_price=750,
+            rent=[28, 150, 450, 1000, 1200, 1400]
+        ),
+        CellDefinition(id=35, name="Ст. метро Адмиралтейская", type=CellType.STATION, price=200),
+
+        # Темно-синие улицы
+        CellDefinition(36, "Шанс", CellType.CHANCE),
+        CellDefinition(
+            id=37,
+            name="Профбюро 4",
+            type=CellType.PROPERTY,
+            color_group="dark_blue",
+            price=350,
+            house_price=200,
+            hotel_price=1000,
+            rent=[35, 175, 500, 1100, 1300, 1500]
+        ),
+        CellDefinition(38, "Взносы в профсоюз", CellType.TAX, "Заплатите 100$", 100),
+        CellDefinition(
+            id=39,
+            name="Усы лисы",
+            type=CellType.PROPERTY,
+            color_group="dark_blue",
+            price=400,
+            house_price=200,
+            hotel_price=1000,
+            rent=[50, 200, 600, 1400, 1700, 2000]
+        )
+    )
+
+# Класс представления клетки по ее типу
+CELL_CLASSES = {
+    CellType.PROPERTY: PropertyCell,
+    CellType.STATION: StationCell,
+    CellType.UTILITY: UtilityCell,
+}
+
+
+@dataclass(frozen=True)
+class BoardTopology:
+    """
+    Неизменяемое устройство поля: группы, цены и рента по номерам клеток
+
+    Считается один раз при импорте и общее для всех Board.
+    """
+    size: int
+    group_of: Tuple[Optional[str], ...]  # цветовая группа клетки (None - не улица)
+    group_members: Mapping[str, Tuple[int, ...]]  # группа -> номера клеток по порядку
+    group_sizes: Mapping[str, int]
+    group_house_prices: Mapping[str, int]  # самая дешевая цена дома в группе
+    property_positions: Tuple[int, ...]
+    station_positions: Tuple[int, ...]
+    utility_positions: Tuple[int, ...]
+    prices: Tuple[int, ...]
+    house_prices: Tuple[int, ...]
+    hotel_prices: Tuple[int, ...]
+    rents: Tuple[Tuple[int, ...], ...]  # рента по уровням 0-4 дома, 5 - отель (пусто - не улица)
+
+    @classmethod
+    def from_cells(cls, cells: Tuple[CellDefinition, ...]) -> "BoardTopology":
+        members: Dict[str, List[int]] = {}
+        for cell in cells:
+            if cell.type == CellType.PROPERTY:
+                members.setdefault(cell.color_group, []).append(cell.id)
+
+        return cls(
+            size=len(cells),
+            group_of=tuple(cell.color_group if cell.type == CellType.PROPERTY else None for cell in cells),
+            group_members=MappingProxyType({group: tuple(ids) for group, ids in members.items()}),
+            group_sizes=MappingProxyType({group: len(ids) for group, ids in members.items()}),
+            group_house_prices=MappingProxyType({group: min(cells[i].house_price for i in ids)
+                                                 for group, ids in members.items()}),
+            property_positions=tuple(cell.id for cell in cells if cell.type == CellType.PROPERTY),
+            station_positions=tuple(cell.id for cell in cells if cell.type == CellType.STATION),
+            utility_positions=tuple(cell.id for cell in cells if cell.type == CellType.UTILITY),
+            prices=tuple(cell.price for cell in cells),
+            house_prices=tuple(cell.house_price for cell in cells),
+            hotel_prices=tuple(cell.hotel_price for cell in cells),
+            rents=tuple(tuple(cell.rent) for cell in cells),
+        )
+
+
+BOARD_TOPOLOGY = BoardTopology.from_cells(CELL_DEFINITIONS)
+
+# Размеры цветовых групп
+GROUP_SIZES = BOARD_TOPOLOGY.group_sizes
+
+
 class Board:
     """Полное игровое поле"""
 
     def __init__(self):
-        self.cells: List[BoardCell] = []
-        self._init_board()
-
-    def _init_board(self):
-        """Инициализация поля Монополии"""
-        self.cells = [
-            BoardCell(0, "Старт", CellType.GO, "Получите 200$ при прохождении"),
-
-            # Коричневые улицы
-            PropertyCell(
-                id=1,
-                name="Дикси",
-                type=CellType.PROPERTY,
-                color_group="brown",
-                price=60,
-                house_price=50,
-                hotel_price=200,
-                rent=[2, 10, 30, 90, 160, 250]
-            ),
-            BoardCell(2, "Общественная казна", CellType.CHEST),
-            PropertyCell(
-                id=3,
-                name="Красное&белое",
-                type=CellType.PROPERTY,
-                color_group="brown",
-                price=60,
-                house_price=50,
-                hotel_price=200,
-                rent=[4, 20, 60, 180, 320, 450]
-            ),
-            BoardCell(4, "Взносы МСГ", CellType.TAX, "Заплатите 200$ за проживание", 200),
-
-            # Метро
-            StationCell(id=5, name="Ст. метро Московская", type=CellType.STATION),
-
-            # Голубые улицы
-            PropertyCell(
-                id=6,
-                name="Мед. кабинет",
-                type=CellType.PROPERTY,
-                color_group="light_blue",
-                price=100,
-                house_price=50,
-                hotel_price=250,
-                rent=[6, 30, 90, 270, 400, 550]
-            ),
-            BoardCell(7, "Шанс", CellType.CHANCE),
-            PropertyCell(
-                id=8,
-                name="2 отдел",
-                type=CellType.PROPERTY,
-                color_group="light_blue",
-                price=100,
-                house_price=50,
-                hotel_price=250,
-                rent=[6, 30, 90, 270, 400, 550]
-            ),
-            PropertyCell(
-                id=9,
-                name="МФЦ",
-                type=CellType.PROPERTY,
-                color_group="light_blue",
-                price=120,
-                house_price=50,
-                hotel_price=250,
-                rent=[8, 40, 100, 300, 450, 600]
-            ),
-
-            # Тюрьма
-            BoardCell(10, "Деканат. Просто посещение. Попейте чаек с администрацией", CellType.JAIL, "Просто посещение"),
-
-            # Розовые улицы
-            PropertyCell(
-                id=11,
-                name="Исаакиевский сквер",
-                type=CellType.PROPERTY,
-                color_group="pink",
-                price=140,
-                house_price=100,
-                hotel_price=300,
-                rent=[10, 50, 150, 450, 625, 750]
-            ),
-            UtilityCell(id=12, name="Чесменская церковь", type=CellType.UTILITY),
-            PropertyCell(
-                id=13,
-                name="Парк 300-летия",
-                type=CellType.PROPERTY,
-                color_group="pink",
-                price=140,
-                house_price=100,
-                hotel_price=300,
-                rent=[10, 50, 150, 450, 625, 750]
-            ),
-            PropertyCell(
-                id=14,
-                name="Новая Голландия",
-                type=CellType.PROPERTY,
-                color_group="pink",
-                price=160,
-                house_price=100,
-                hotel_price=300,
-                rent=[12, 60, 180, 500, 700, 900]
-            ),
-            StationCell(id=15, name="Ст. метро Театральная", type=CellType.STATION),
-
-            # Оранжевые улицы
-            PropertyCell(
-                id=16,
-                name="Варшавская",
-                type=CellType.PROPERTY,
-                color_group="orange",
-                price=180,
-                house_price=100,
-                hotel_price=400,
-                rent=[14, 70, 200, 550, 750, 950]
-            ),
-            BoardCell(17, "Общественная казна", CellType.CHEST),
-            PropertyCell(
-                id=18,
-                name="Передовиков",
-                type=CellType.PROPERTY,
-                color_group="orange",
-                price=180,
-                house_price=100,
-                hotel_price=400,
-                rent=[14, 70, 200, 550, 750, 950]
-            ),
-            PropertyCell(
-                id=19,
-                name="Жукова",
-                type=CellType.PROPERTY,
-                color_group="orange",
-                price=200,
-                house_price=100,
-                hotel_price=400,
-                rent=[16, 80, 220, 600, 800, 1000]
-            ),
-
-            # Бесплатная стоянка
-            BoardCell(20, "Коворкинг с космонавтом. Просто отдохните во время окна", CellType.FREE_PARKING),
-
-            # Красные улицы
-            PropertyCell(
-                id=21,
-                name="Точка кипения",
-                type=CellType.PROPERTY,
-                color_group="red",
-                price=220,
-                house_price=150,
-                hotel_price=500,
-                rent=[18, 90, 250, 700, 875, 1050]
-            ),
-            BoardCell(22, "Шанс", CellType.CHANCE),
-            PropertyCell(
-                id=23,
-                name="Актовый зал",
-                type=CellType.PROPERTY,
-                color_group="red",
-                price=220,
-                house_price=150,
-                hotel_price=500,
-                rent=[18, 90, 250, 700, 875, 1050]
-            ),
-            PropertyCell(
-                id=24,
-                name="Зал Да Винчи",
-                type=CellType.PROPERTY,
-                color_group="red",
-                price=240,
-                house_price=150,
-                hotel_price=500,
-                rent=[20, 100, 300, 750, 925, 1100]
-            ),
-            StationCell(id=25, name="Ст. метро Сенная площадь", type=CellType.STATION),
-
-            # Желтые улицы
-            PropertyCell(
-                id=26,
-                name="Ленсовета, 14",
-                type=CellType.PROPERTY,
-                color_group="yellow",
-                price=260,
-                house_price=150,
-                hotel_price=600,
-                rent=[22, 110, 330, 800, 975, 1150]
-            ),
-            PropertyCell(
-                id=27,
-                name="Гастелло, 15",
-                type=CellType.PROPERTY,
-                color_group="yellow",
-                price=260,
-                house_price=150,
-                hotel_price=600,
-                rent=[22, 110, 330, 800, 975, 1150]
-            ),
-            UtilityCell(id=28, name="Шавермечная", type=CellType.UTILITY),
-            PropertyCell(
-                id=29,
-                name="Большая Морская, 67",
-                type=CellType.PROPERTY,
-                color_group="yellow",
-                price=280,
-                house_price=150,
-                hotel_price=600,
-                rent=[24, 120, 360, 850, 1025, 1200]
-            ),
-
-            # Отправка в тюрьму
-            BoardCell(30, "Вы не закрыли сессию и попадаете на комиссию. Отправляйтесь в деканат решать этот вопрос", CellType.GO_TO_JAIL),
-
-            # Зеленые улицы
-            PropertyCell(
-                id=31,
-                name="Вольчека",
-                type=CellType.PROPERTY,
-                color_group="green",
-                price=300,
-                house_price=200,
-                hotel_price=750,
-                rent=[26, 130, 390, 900, 1100, 1275]
-            ),
-            PropertyCell(
-                id=32,
-                name="Люди любят",
-                type=CellType.PROPERTY,
-                color_group="green",
-                price=300,
-                house_price=200,
-                hotel_price=750,
-                rent=[26, 130, 390, 900, 1100, 1275]
-            ),
-            BoardCell(33, "Общественная казна", CellType.CHEST),
-            PropertyCell(
-                id=34,
-                name="Цех 85",
-                type=CellType.PROPERTY,
-                color_group="green",
-                price=320,
-                house_price=200,
-                hotel_price=750,
-                rent=[28, 150, 450, 1000, 1200, 1400]
-            ),
-            StationCell(id=35, name="Ст. метро Адмиралтейская", type=CellType.STATION),
-
-            # Темно-синие улицы
-            BoardCell(36, "Шанс", CellType.CHANCE),
-            PropertyCell(
-                id=37,
-                name="Профбюро 4",
-                type=CellType.PROPERTY,
-                color_group="dark_blue",
-                price=350,
-                house_price=200,
-                hotel_price=1000,
-                rent=[35, 175, 500, 1100, 1300, 1500]
-            ),
-            BoardCell(38, "Взносы в профсоюз", CellType.TAX, "Заплатите 100$", 100),
-            PropertyCell(
-                id=39,
-                name="Усы лисы",
-                type=CellType.PROPERTY,
-                color_group="dark_blue",
-                price=400,
-                house_price=200,
-                hotel_price=1000,
-                rent=[50, 200, 600, 1400, 1700, 2000]
-            )
-        ]
+        self.version = 0  # увеличивается при изменении собственности и построек
+        self.event_log = None  # журнал событий игры (EventLog), назначается в Game
+        # Состояние клеток по номерам: владелец (0 - нет), дома, флаги FLAG_*
+        self.owners = array('q', bytes(8 * BOARD_TOPOLOGY.size))
+        self.houses = bytearray(BOARD_TOPOLOGY.size)
+        self.flags = bytearray(BOARD_TOPOLOGY.size)
+        # Индекс собственности: владелец -> активы по категориям (как get_owner_assets)
+        self._owner_assets: Dict[int, Dict[str, List]] = {}
+        self._cells: Optional[List[BoardCell]] = None
+        # Анализ застройки: игрок -> (версия поля, результат analyze_building)
+        self._building_cache: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+
+    @property
+    def cells(self) -> List[BoardCell]:
+        """Клетки поля (создаются при первом обращении: у лобби их нет)"""
+        if self._cells is None:
+            self._cells = [CELL_CLASSES.get(definition.type, BoardCell)(self, definition)
+                           for definition in CELL_DEFINITIONS]
+        return self._cells
+
+    def touch(self):
+        """Отметить изменение собственности или построек на поле"""
+        self.version += 1
+
+    def _record(self, event_type: str, **data):
+        """Записать событие в журнал игры, если он подключен"""
+        if self.event_log is not None:
+            self.event_log.record(event_type, **data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Компактное состояние поля: массивы по номерам клеток
+
+        owners - id владельца (0 - нет), houses - количество домов (5 - отель),
+        mortgaged - номера заложенных клеток.
+        """
+        return {
+            "owners": list(self.owners),
+            "houses": [HOTEL_LEVEL if flags & FLAG_HOTEL else houses for houses, flags in zip(self.houses, self.flags)],
+            "mortgaged": [position for position, flags in enumerate(self.flags) if flags & FLAG_MORTGAGED]
+        }
+
+    def load_state(self, data: Dict[str, Any]):
+        """Восстановить состояние поля из to_dict()"""
+        owners = data.get("owners", [])
+        houses = data.get("houses", [])
+        mortgaged = set(data.get("mortgaged", []))
+
+        for position in range(BOARD_TOPOLOGY.size):
+            level = houses[position] if position < len(houses) else 0
+            self.owners[position] = (owners[position] if position < len(owners) else 0) or 0
+            self.houses[position] = 0 if level == HOTEL_LEVEL else level
+            self.flags[position] = ((FLAG_HOTEL if level == HOTEL_LEVEL else 0)
+                                    | (FLAG_MORTGAGED if position in mortgaged else 0))
+
+        self.rebuild_owner_index()
+        self.touch()
 
     def get_cell(self, position: int) -> BoardCell:
         """Получить клетку по позиции"""
-        return self.cells[position % len(self.cells)]
+        cells = self.cells
+        return cells[position % len(cells)]
 
     def get_property_cells(self) -> List[PropertyCell]:
         """Получить все клетки недвижимости"""
-        return [cell for cell in self.cells if isinstance(cell, PropertyCell)]
+        return [self.cells[i] for i in BOARD_TOPOLOGY.property_positions]
 
     def get_station_cells(self) -> List[StationCell]:
         """Получить все вокзалы"""
-        return [cell for cell in self.cells if isinstance(cell, StationCell)]
+        return [self.cells[i] for i in BOARD_TOPOLOGY.station_positions]
 
     def get_utility_cells(self) -> List[UtilityCell]:
         """Получить все предприятия"""
-        return [cell for cell in self.cells if isinstance(cell, UtilityCell)]
+        return [self.cells[i] for i in BOARD_TOPOLOGY.utility_positions]
 
     def get_owner_assets(self, owner_id: int) -> Dict[str, List]:
-        """Получить активы владельца по категориям"""
+        """
+        Получить активы владельца по категориям (из индекса, без обхода поля)
+
+        Возвращает сам индекс: списки нельзя изменять, владельца меняет set_owner().
+        """
+        assets = self._owner_assets.get(owner_id)
+        if assets is None:
+            return {'properties': [], 'stations': [], 'utilities': []}
+        return assets
+
+    def scan_owner_assets(self, owner_id: int) -> Dict[str, List]:
+        """Собрать активы владельца обходом всех клеток (эталон для проверки индекса)"""
         assets = {
             'properties': [],
             'stations': [],
@@ -458,6 +668,57 @@ class Board:
 
         return assets
 
+    def _index_keys(self, cell: BoardCell) -> List[str]:
+        """Категории индекса, в которые входит клетка"""
+        if isinstance(cell, PropertyCell):
+            return ['properties', cell.color_group]
+        if isinstance(cell, StationCell):
+            return ['stations']
+        if isinstance(cell, UtilityCell):
+            return ['utilities']
+        return []
+
+    def set_owner(self, cell: BoardCell, owner_id: Optional[int]):
+        """Сменить владельца клетки и обновить индекс собственности"""
+        if cell.owner_id == owner_id:
+            return
+
+        keys = self._index_keys(cell)
+        previous = self._owner_assets.get(cell.owner_id)
+        if previous is not None:
+            for key in keys:
+                group = previous[key]
+                group.remove(cell)
+                if not group and key not in ('properties', 'stations', 'utilities'):
+                    del previous[key]
+            if not previous['properties'] and not previous['stations'] and not previous['utilities']:
+                del self._owner_assets[cell.owner_id]
+
+        cell.owner_id = owner_id
+        self.touch()
+        if owner_id is not None and keys:
+            assets = self._owner_assets.setdefault(owner_id, {'properties': [], 'stations': [], 'utilities': []})
+            for key in keys:
+                group = assets.setdefault(key, [])
+                group.append(cell)
+                # Порядок по номеру клетки, как при обходе поля
+                if len(group) > 1 and group[-2].id > cell.id:
+                    group.sort(key=lambda c: c.id)
+
+    def rebuild_owner_index(self):
+        """Пересобрать индекс собственности по владельцам клеток"""
+        self._owner_assets = {}
+        for position, owner_id in enumerate(self.owners):
+            if owner_id:
+                cell = self.cells[position]
+                cell.owner_id = None
+                self.set_owner(cell, owner_id)
+
+    def owns_color_group(self, owner_id: int, color_group: str) -> bool:
+        """Владеет ли игрок всей цветовой группой"""
+        assets = self._owner_assets.get(owner_id)
+        return assets is not None and len(assets.get(color_group, ())) == GROUP_SIZES.get(color_group, 2)
+
     def can_build_on_property(self, property_id: int, owner_id: int) -> bool:
         """Можно ли строить на недвижимости"""
         cell = self.get_cell(property_id)
@@ -484,7 +745,9 @@ class Board:
         player.deduct_money(cell.price)
 
         # Назначение владельца
-        cell.owner_id = player.user_id
+        self.set_owner(cell, player.user_id)
+        self.touch()
+        self._record("purchase", player=player.user_id, cell=position, price=cell.price)
 
         # Добавление в список собственности игрока
         if isinstance(cell, PropertyCell):
@@ -498,6 +761,27 @@ class Board:
             player.increment_properties_bought()
         return True
 
+    def release_assets(self, player) -> List[int]:
+        """Вернуть всю собственность игрока банку (банкротство) и вернуть номера клеток"""
+        released = []
+        for position in list(player.properties) + list(player.stations) + list(player.utilities):
+            cell = self.get_cell(position)
+            if cell.owner_id != player.user_id:
+                continue
+            self.set_owner(cell, None)
+            cell.mortgaged = False
+            if isinstance(cell, PropertyCell):
+                cell.houses = 0
+                cell.hotel = False
+            released.append(position)
+
+        player.properties.clear()
+        player.stations.clear()
+        player.utilities.clear()
+        if released:
+            self.touch()
+        return released
+
     def mortgage_property(self, position: int) -> bool:
         """Заложить собственность"""
         cell = self.get_cell(position)
@@ -509,6 +793,8 @@ class Board:
             return False
 
         cell.mortgaged = True
+        self.touch()
+        self._record("mortgage", cell=position, owner=cell.owner_id)
         return True
 
     def unmortgage_property(self, position: int) -> bool:
@@ -522,6 +808,8 @@ class Board:
             return False
 
         cell.mortgaged = False
+        self.touch()
+        self._record("unmortgage", cell=position, owner=cell.owner_id)
         return True
 
     def get_rent_for_cell(self, position: int, dice_roll: int = 0, owner_id: int = None) -> int:
@@ -606,14 +894,11 @@ class Board:
         if cell.houses >= 4:
             return {"can_build": False, "reason": "Максимум 4 дома"}
 
-        # Проверяем владение всей цветовой группой
+        # Проверяем владение всей цветовой группой (по индексу собственности)
         color_group = cell.color_group
-        group_cells = self.get_color_group_cells(color_group)
-
-        # Проверяем, что все клетки группы принадлежат игроку
-        player_owns_group = all(c.owner_id == owner_id for c in group_cells)
-        if not player_owns_group:
+        if not self.owns_color_group(owner_id, color_group):
             return {"can_build": False, "reason": f"Не владеете всей группой {color_group}"}
+        group_cells = self._owner_assets[owner_id][color_group]
 
         # Проверка равномерности застройки
         group_houses = [c.houses for c in group_cells if not c.hotel]
@@ -651,6 +936,8 @@ class Board:
 
         # Строим дом (проверку денег делаем в bot.py)
         cell.houses += 1
+        self.touch()
+        self._record("build", player=owner_id, cell=property_id, houses=cell.houses, price=house_price)
 
         return {
             "success": True,
@@ -681,10 +968,7 @@ class Board:
 
         # Проверяем владение всей цветовой группой
         color_group = cell.color_group
-        group_cells = self.get_color_group_cells(color_group)
-
-        player_owns_group = all(c.owner_id == owner_id for c in group_cells)
-        if not player_owns_group:
+        if not self.owns_color_group(owner_id, color_group):
             return {"can_build": False, "reason": f"Не владеете всей группой {color_group}"}
 
         # Берем цену отеля из свойства cell.hotel_price
@@ -714,6 +998,8 @@ class Board:
         # Строим отель
         cell.hotel = True
         cell.houses = 0  # Дома заменяются отелем
+        self.touch()
+        self._record("build", player=owner_id, cell=property_id, hotel=True, price=hotel_price)
 
         return {
             "success": True,
@@ -784,6 +1070,8 @@ class Board:
             sell_price = check_result["sell_price"]
             cell.hotel = False
             cell.houses = 4  # Возвращаем 4 дома
+            self.touch()
+            self._record("sell", player=owner_id, cell=property_id, hotel=True, price=sell_price)
 
             return {
                 "success": True,
@@ -796,6 +1084,8 @@ class Board:
             # Продажа дома
             sell_price = check_result["sell_price"]
             cell.houses -= 1
+            self.touch()
+            self._record("sell", player=owner_id, cell=property_id, houses=cell.houses, price=sell_price)
 
             return {
                 "success": True,
@@ -808,100 +1098,112 @@ class Board:
 
     def get_color_group_cells(self, color_group: str) -> List[PropertyCell]:
         """Получить все клетки цветовой группы"""
-        return [cell for cell in self.cells
-                if isinstance(cell, PropertyCell) and cell.color_group == color_group]
-
-    def get_player_buildable_properties(self, player_id: int) -> List[Dict]:
-        """Получить список недвижимости игрока, на которых можно строить"""
-        buildable = []
+        return [self.cells[i] for i in BOARD_TOPOLOGY.group_members.get(color_group, ())]
+
+    def analyze_building(self, player_id: int) -> Dict[str, Any]:
+        """
+        Что игрок может построить и продать - за один проход по его улицам
+
+        Правила те же, что в can_build_house, can_build_hotel и can_sell_house.
+        Результат кэшируется до изменения поля (version) и общий для всех
+        вызовов - его нельзя изменять.
+
+        Returns:
+            {"buildable": {клетка: дом}, "hotel": {клетка: отель},
+             "sellable": {клетка: продажа}, "groups": {группа: {"total", "owned", "complete"}}}
+        """
+        cached = self._building_cache.get(player_id)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        buildable, hotel, sellable, groups = {}, {}, {}, {}
+        assets = self._owner_assets.get(player_id)
+        for cell in (assets['properties'] if assets else ()):
+            color_group = cell.color_group
+            group = groups.get(color_group)
+            if group is None:
+                group_cells = [self.cells[i] for i in BOARD_TOPOLOGY.group_members[color_group]]
+                levels = [c.houses for c in group_cells if not c.hotel]
+                owned = assets[color_group]
+                group = groups[color_group] = {
+                    "total": len(group_cells),
+                    "owned": owned,
+                    "complete": len(owned) == len(group_cells),
+                    "min_houses": min(levels) if levels else 0,
+                    "max_houses": max(levels) if levels else None,
+                }
 
-        for cell in self.cells:
-            if isinstance(cell, PropertyCell) and cell.owner_id == player_id:
-                check_result = self.can_build_house(cell.id, player_id)
-                if check_result.get("can_build"):
-                    buildable.append({
+            if not cell.mortgaged and not cell.hotel and group["complete"]:
+                if cell.houses < 4 and cell.houses <= group["min_houses"]:
+                    buildable[cell.id] = {
                         "id": cell.id,
                         "name": cell.name,
                         "houses": cell.houses,
-                        "color_group": cell.color_group,
-                        "price": check_result.get("house_price", 0)
-                    })
-
-        return buildable
-
-    def get_player_hotel_properties(self, player_id: int) -> List[Dict]:
-        """Получить список недвижимости игрока, на которых можно строить отели"""
-        hotelable = []
-
-        for cell in self.cells:
-            if isinstance(cell, PropertyCell) and cell.owner_id == player_id:
-                check_result = self.can_build_hotel(cell.id, player_id)
-                if check_result.get("can_build"):
-                    hotelable.append({
+                        "color_group": color_group,
+                        "price": cell.house_price
+                    }
+                elif cell.houses == 4:
+                    hotel[cell.id] = {
                         "id": cell.id,
                         "name": cell.name,
                         "houses": cell.houses,
-                        "color_group": cell.color_group,
-                        "price": check_result.get("hotel_price", 0)
-                    })
-
-        return hotelable
-
-    def get_player_sellable_properties(self, player_id: int) -> List[Dict]:
-        """Получить список недвижимости игрока, с которых можно продавать дома"""
-        sellable = []
+                        "color_group": color_group,
+                        "price": cell.hotel_price
+                    }
 
-        for cell in self.cells:
-            if isinstance(cell, PropertyCell) and cell.owner_id == player_id:
-                check_result = self.can_sell_house(cell.id, player_id)
-                if check_result.get("can_sell"):
-                    sellable.append({
+            if (cell.houses or cell.hotel) and not cell.mortgaged:
+                if group["max_houses"] is None or cell.houses <= group["max_houses"] - 1:
+                    sellable[cell.id] = {
                         "id": cell.id,
                         "name": cell.name,
                         "houses": cell.houses,
                         "hotel": cell.hotel,
-                        "color_group": cell.color_group,
-                        "price": check_result.get("sell_price", 0),
-                        "is_hotel": check_result.get("is_hotel", False)
-                    })
+                        "color_group": color_group,
+                        "price": (cell.hotel_price if cell.hotel else cell.house_price) // 2,
+                        "is_hotel": cell.hotel
+                    }
+
+        result = {"buildable": buildable, "hotel": hotel, "sellable": sellable, "groups": groups}
+        self._building_cache[player_id] = (self.version, result)
+        return result
 
-        return sellable
+    def get_player_buildable_properties(self, player_id: int) -> List[Dict]:
+        """Получить список недвижимости игрока, на которых можно строить"""
+        return list(self.analyze_building(player_id)["buildable"].values())
+
+    def get_player_hotel_properties(self, player_id: int) -> List[Dict]:
+        """Получить список недвижимости игрока, на которых можно строить отели"""
+        return list(self.analyze_building(player_id)["hotel"].values())
+
+    def get_player_sellable_properties(self, player_id: int) -> List[Dict]:
+        """Получить список недвижимости игрока, с которых можно продавать дома"""
+        return list(self.analyze_building(player_id)["sellable"].values())
 
     def get_color_group_info(self, player_id: int) -> Dict[str, Dict]:
         """Получить информацию о цветовых группах игрока"""
         color_groups = {}
 
-        for cell in self.cells:
-            if isinstance(cell, PropertyCell) and cell.color_group:
-                color_group = cell.color_group
-
-                if color_group not in color_groups:
-                    # Получаем все клетки этой группы
-                    group_cells = self.get_color_group_cells(color_group)
-                    total_in_group = len(group_cells)
-
-                    # Считаем сколько принадлежит игроку
-                    owned_by_player = [c for c in group_cells if c.owner_id == player_id]
-                    owned_count = len(owned_by_player)
-
-                    # Считаем дома и отели
-                    total_houses = sum(c.houses for c in owned_by_player)
-                    total_hotels = sum(1 for c in owned_by_player if c.hotel)
-
-                    # Получаем самую дешевую цену дома в группе
-                    house_prices = [c.house_price for c in group_cells]
-                    min_house_price = min(house_prices) if house_prices else 0
-
-
-                    color_groups[color_group] = {
-                        "total": total_in_group,
-                        "owned": owned_count,
-                        "complete": owned_count == total_in_group,
-                        "properties": group_cells,
-                        "owned_properties": owned_by_player,
-                        "total_houses": total_houses,
-                        "total_hotels": total_hotels,
-                        "house_price": min_house_price
-                    }
+        for color_group, positions in BOARD_TOPOLOGY.group_members.items():
+            group_cells = [self.cells[i] for i in positions]
+            total_in_group = len(group_cells)
+
+            # Считаем сколько принадлежит игроку
+            owned_by_player = [c for c in group_cells if c.owner_id == player_id]
+            owned_count = len(owned_by_player)
+
+            # Считаем дома и отели
+            total_houses = sum(c.houses for c in owned_by_player)
+            total_hotels = sum(1 for c in owned_by_player if c.hotel)
+
+            color_groups[color_group] = {
+                "total": total_in_group,
+                "owned": owned_count,
+                "complete": owned_count == total_in_group,
+                "properties": group_cells,
+                "owned_properties": owned_by_player,
+                "total_houses": total_houses,
+                "total_hotels": total_hotels,
+                "house_price": BOARD_TOPOLOGY.group_house_prices[color_group]
+            }
 
         return color_groups
@@ -1,219 +1,324 @@
 import sqlite3
 import json
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
 from datetime import datetime
 import os
 
 from game import Game
+from event_log import STATE_EVENT, apply_state_delta
 
 
 class GameDatabase:
     """База данных для сохранения игр"""
 
-    def __init__(self, db_path: str = "data/games.db"):
+    def __init__(self, db_path: str = "data/games.db", snapshot_every: int = 50):
         self.db_path = db_path
+        self.snapshot_every = max(1, snapshot_every)  # событий между полными снимками
+        # Одно долгоживущее соединение вместо connect() на каждый запрос
+        self._lock = threading.RLock()
+        # Игры, удаленные в этом процессе: пачка, собранная до удаления, их не вернет
+        self._deleted: Set[str] = set()
+        self._conn = self._connect()
         self._init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Открыть соединение в режиме WAL"""
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=128  # подготовленные запросы переиспользуются
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=OFF")
+        return conn
+
     def _init_db(self):
         """Инициализировать базу данных"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Таблица игр
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS games (
-                game_id TEXT PRIMARY KEY,
-                creator_id INTEGER,
-                created_at TIMESTAMP,
-                updated_at TIMESTAMP,
-                game_data TEXT,
-                is_active BOOLEAN DEFAULT 1
+        with self._lock, self._conn:
+            cursor = self._conn.cursor()
+
+            # Таблица игр
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS games (
+                    game_id TEXT PRIMARY KEY,
+                    creator_id INTEGER,
+                    created_at TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    game_data TEXT,
+                    is_active BOOLEAN DEFAULT 1,
+                    snapshot_seq INTEGER DEFAULT 0,
+                    state TEXT
+                )
+            ''')
+
+            # Журнал событий игр: снимок в games.game_data + события после него
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS game_events (
+                    game_id TEXT,
+                    seq INTEGER,
+                    event_type TEXT,
+                    event_data TEXT,
+                    PRIMARY KEY (game_id, seq)
+                ) WITHOUT ROWID
+            ''')
+
+            # Таблица игроков в играх (для быстрого поиска игр по player_id)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS game_players (
+                    game_id TEXT,
+                    player_id INTEGER,
+                    username TEXT,
+                    FOREIGN KEY (game_id) REFERENCES games (game_id)
+                )
+            ''')
+
+            # Старые базы: добавляем username для восстановления индексов без загрузки игр
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(game_players)")]
+            if "username" not in columns:
+                cursor.execute("ALTER TABLE game_players ADD COLUMN username TEXT")
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(games)")]
+            if "snapshot_seq" not in columns:
+                cursor.execute("ALTER TABLE games ADD COLUMN snapshot_seq INTEGER DEFAULT 0")
+            # Состояние игры (lobby/in_game/...) - для списка лобби без загрузки game_data
+            if "state" not in columns:
+                cursor.execute("ALTER TABLE games ADD COLUMN state TEXT")
+            # Данные кнопок, не поместившихся в callback_data (CallbackTokenStore)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS callback_tokens (
+                    token TEXT PRIMARY KEY,
+                    data TEXT,
+                    expires_at REAL
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_game_players_game ON game_players (game_id)"
             )
-        ''')
-
-        # Таблица игроков в играх (для быстрого поиска игр по player_id)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS game_players (
-                game_id TEXT,
-                player_id INTEGER,
-                FOREIGN KEY (game_id) REFERENCES games (game_id)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_game_players_player ON game_players (player_id)"
             )
-        ''')
-
-        conn.commit()
-        conn.close()
 
-    def save_game(self, game: Game):
-        """Сохранить игру - ОТЛАДОЧНАЯ ВЕРСИЯ"""
-        print(f"\n=== DEBUG SAVE_GAME START ===")
-        print(f"Game ID: {game.game_id}")
-        print(f"Game state: {game.state}")
-        print(f"Players count: {len(game.players)}")
+    def close(self):
+        """Закрыть соединение с базой"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def serialize_game(self, game: Game) -> Tuple:
+        """
+        Подготовить игру к записи: (строка games, [(id игрока, username)], [события])
+
+        game_data и snapshot_seq заполняются только когда нужен полный снимок,
+        иначе записываются лишь новые события журнала.
+        """
+        state = game.to_dict()
+        events, snapshot = game.event_log.collect(state, self.snapshot_every)
+        row = (
+            game.game_id,
+            game.creator_id,
+            game.created_at.isoformat(),
+            datetime.now().isoformat(),
+            json.dumps(state) if snapshot else None,
+            1 if game.state.value != "finished" else 0,
+            game.event_log.snapshot_seq if snapshot else None,
+            game.state.value
+        )
+        players = [(player_id, player.username) for player_id, player in game.players.items()]
+        return row, players, events
+
+    def write_games(self, serialized: List[Tuple]):
+        """Записать пачку сериализованных игр одной транзакцией"""
+        with self._lock, self._conn:
+            serialized = [item for item in serialized if item[0][0] not in self._deleted]
+            if not serialized:
+                return
+            self._conn.executemany('''
+                INSERT INTO games (game_id, creator_id, created_at, updated_at, game_data, is_active, snapshot_seq,
+                                   state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(game_id) DO UPDATE SET
+                    game_data = COALESCE(excluded.game_data, games.game_data),
+                    updated_at = excluded.updated_at,
+                    is_active = MIN(COALESCE(games.is_active, 1), excluded.is_active),
+                    snapshot_seq = COALESCE(excluded.snapshot_seq, games.snapshot_seq),
+                    state = excluded.state
+            ''', [row for row, _, _ in serialized])
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO game_events (game_id, seq, event_type, event_data) VALUES (?, ?, ?, ?)",
+                [(row[0], seq, event_type, event_data)
+                 for row, _, events in serialized for seq, event_type, event_data in events]
+            )
+            # Компакция: события до снимка больше не нужны
+            self._conn.executemany(
+                "DELETE FROM game_events WHERE game_id = ? AND seq <= ?",
+                [(row[0], row[6]) for row, _, _ in serialized if row[6] is not None]
+            )
 
-        try:
-            # 1. Пытаемся сериализовать
-            print(f"\n[1/4] Сериализация игры...")
-            game_data = json.dumps(game.to_dict())
-            print(f"✓ Сериализовано: {len(game_data)} байт")
-
-            # 2. Подключаемся к БД
-            print(f"[2/4] Подключение к БД...")
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # 3. Проверяем существование
-            print(f"[3/4] Проверка существования игры...")
-            cursor.execute(
-                "SELECT COUNT(*) FROM games WHERE game_id = ?",
-                (game.game_id,)
+            self._conn.executemany(
+                "DELETE FROM game_players WHERE game_id = ?",
+                [(row[0],) for row, _, _ in serialized]
+            )
+            self._conn.executemany(
+                "INSERT INTO game_players (game_id, player_id, username) VALUES (?, ?, ?)",
+                [(row[0], player_id, username) for row, players, _ in serialized for player_id, username in players]
             )
-            exists = cursor.fetchone()[0] > 0
-            print(f"Игра существует в БД: {exists}")
-
-            if exists:
-                print(f"Обновление записи...")
-                cursor.execute('''
-                    UPDATE games 
-                    SET game_data = ?, updated_at = ?, is_active = ?
-                    WHERE game_id = ?
-                ''', (
-                    game_data,
-                    datetime.now().isoformat(),
-                    1 if game.state.value != "finished" else 0,
-                    game.game_id
-                ))
-
-                cursor.execute(
-                    "DELETE FROM game_players WHERE game_id = ?",
-                    (game.game_id,)
-                )
-                print("✓ Запись обновлена")
-            else:
-                print(f"Создание новой записи...")
-                cursor.execute('''
-                    INSERT INTO games (game_id, creator_id, created_at, updated_at, game_data)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    game.game_id,
-                    game.creator_id,
-                    game.created_at.isoformat(),
-                    datetime.now().isoformat(),
-                    game_data
-                ))
-                print("✓ Запись создана")
-
-            # 4. Добавляем игроков
-            print(f"[4/4] Добавление игроков...")
-            player_ids = list(game.players.keys())
-            print(f"Игроки для добавления: {player_ids}")
-
-            for player_id in player_ids:
-                cursor.execute('''
-                    INSERT INTO game_players (game_id, player_id)
-                    VALUES (?, ?)
-                ''', (game.game_id, player_id))
-
-            print(f"✓ Добавлено {len(player_ids)} игроков")
-
-            # Коммит
-            print(f"Коммит изменений...")
-            conn.commit()
-            conn.close()
-
-            print(f"=== DEBUG SAVE_GAME END: УСПЕХ ===\n")
 
+    def save_game(self, game: Game):
+        """Сохранить игру: новые события журнала (или снимок) одной транзакцией"""
+        try:
+            self.write_games([self.serialize_game(game)])
         except Exception as e:
-            print(f"\n❌❌❌ ОШИБКА В SAVE_GAME:")
-            print(f"Тип ошибки: {type(e).__name__}")
-            print(f"Сообщение: {str(e)}")
-            print(f"\nДетали:")
+            # События не записались - следующее сохранение будет полным снимком
+            game.event_log.reset()
+            print(f"❌ Ошибка сохранения игры {game.game_id}: {type(e).__name__}: {e}")
             import traceback
             traceback.print_exc()
-
-            # Пробуем получить больше информации об ошибке сериализации
-            try:
-                test_dict = game.to_dict()
-                print(f"\nТест сериализации to_dict: Успех")
-                test_json = json.dumps(test_dict)
-                print(f"Тест json.dumps: Успех, {len(test_json)} байт")
-            except Exception as e2:
-                print(f"\nТест сериализации провален: {e2}")
-
             raise  # Перебрасываем ошибку дальше
 
     def load_game(self, game_id: str) -> Optional[Game]:
-        """Загрузить игру"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT game_data FROM games WHERE game_id = ? AND is_active = 1",
-            (game_id,)
-        )
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            try:
-                game_dict = json.loads(row[0])
-                return Game.from_dict(game_dict)
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Ошибка загрузки игры: {e}")
+        """Загрузить игру: последний снимок + изменения из хвоста журнала"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT game_data, snapshot_seq FROM games WHERE game_id = ? AND is_active = 1",
+                (game_id,)
+            ).fetchone()
+            if not row:
                 return None
 
-        return None
+            snapshot_seq = row[1] or 0
+            tail = self._conn.execute(
+                "SELECT seq, event_data FROM game_events WHERE game_id = ? AND seq > ? "
+                "AND event_type = ? ORDER BY seq",
+                (game_id, snapshot_seq, STATE_EVENT)
+            ).fetchall()
+            last_seq = self._conn.execute(
+                "SELECT MAX(seq) FROM game_events WHERE game_id = ?", (game_id,)
+            ).fetchone()[0] or snapshot_seq
+
+        try:
+            game_dict = json.loads(row[0])
+            for _, event_data in tail:
+                apply_state_delta(game_dict, json.loads(event_data)["data"])
+
+            game = Game.from_dict(game_dict)
+            game.event_log.restore(game.to_dict(), last_seq, snapshot_seq)
+            return game
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            print(f"Ошибка загрузки игры {game_id}: {e}")
+            return None
+
+    def get_game_events(self, game_id: str, since_seq: int = 0) -> List[Dict[str, Any]]:
+        """События игры после since_seq (для повтора и аудита, только после последнего снимка)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, event_data FROM game_events WHERE game_id = ? AND seq > ? ORDER BY seq",
+                (game_id, since_seq)
+            ).fetchall()
+
+        events = []
+        for seq, event_data in rows:
+            event = json.loads(event_data)
+            event["seq"] = seq
+            events.append(event)
+        return events
+
+    def iter_active_players(self) -> Iterator[Tuple[str, Optional[int], Optional[str]]]:
+        """
+        Потоково отдает (game_id, player_id, username) для всех активных игр
+
+        game_data не читается, поэтому восстановление индексов не зависит
+        от размера сохраненных игр. Игра без игроков отдается с player_id = None.
+        """
+        with self._lock:
+            cursor = self._conn.execute('''
+                SELECT g.game_id, gp.player_id, gp.username
+                FROM games g
+                LEFT JOIN game_players gp ON g.game_id = gp.game_id
+                WHERE g.is_active = 1
+            ''')
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                yield from rows
+
+    def get_lobby_game_ids(self, max_players: int) -> List[str]:
+        """
+        Активные игры в лобби со свободными местами - по колонкам, без game_data
+
+        Игры из старых баз без колонки state тоже отдаются: их состояние
+        известно только после загрузки.
+        """
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT g.game_id
+                FROM games g
+                LEFT JOIN game_players gp ON g.game_id = gp.game_id
+                WHERE g.is_active = 1 AND (g.state = 'lobby' OR g.state IS NULL)
+                GROUP BY g.game_id
+                HAVING COUNT(gp.player_id) < ?
+            ''', (max_players,)).fetchall()
+        return [row[0] for row in rows]
 
     def get_player_games(self, player_id: int) -> list:
-        """Получить все активные игры игрока"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT g.game_data 
-            FROM games g
-            JOIN game_players gp ON g.game_id = gp.game_id
-            WHERE gp.player_id = ? AND g.is_active = 1
-            ORDER BY g.updated_at DESC
-        ''', (player_id,))
+        """Получить все активные игры игрока (снимок + события журнала, как load_game)"""
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT g.game_id
+                FROM games g
+                JOIN game_players gp ON g.game_id = gp.game_id
+                WHERE gp.player_id = ? AND g.is_active = 1
+                ORDER BY g.updated_at DESC
+            ''', (player_id,)).fetchall()
 
         games = []
-        for row in cursor.fetchall():
-            try:
-                game_dict = json.loads(row[0])
-                games.append(Game.from_dict(game_dict))
-            except (json.JSONDecodeError, KeyError):
-                continue
-
-        conn.close()
+        for (game_id,) in rows:
+            game = self.load_game(game_id)
+            if game is not None:
+                games.append(game)
+
         return games
 
     def delete_game(self, game_id: str):
         """Удалить игру"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock, self._conn:
+            self._deleted.add(game_id)
+            self._conn.execute(
+                "UPDATE games SET is_active = 0 WHERE game_id = ?",
+                (game_id,)
+            )
 
-        cursor.execute(
-            "UPDATE games SET is_active = 0 WHERE game_id = ?",
-            (game_id,)
-        )
+    def save_callback_token(self, token: str, data: str, expires_at: float):
+        """Сохранить данные кнопки до expires_at (time.time()), заодно удалить истекшие"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM callback_tokens WHERE expires_at < ?", (time.time(),))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO callback_tokens (token, data, expires_at) VALUES (?, ?, ?)",
+                (token, data, expires_at)
+            )
 
-        conn.commit()
-        conn.close()
+    def load_callback_token(self, token: str) -> Optional[str]:
+        """Данные кнопки по токену (None - неизвестен или истек)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM callback_tokens WHERE token = ? AND expires_at >= ?",
+                (token, time.time())
+            ).fetchone()
+        return row[0] if row else None
 
     def cleanup_old_games(self, days_old: int = 7):
         """Очистить старые завершенные игры"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         cutoff_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        cursor.execute('''
-            UPDATE games 
-            SET is_active = 0 
-            WHERE updated_at < ? AND is_active = 1
-        ''', (cutoff_date.isoformat(),))
-
-        conn.commit()
-        conn.close()
+
+        with self._lock, self._conn:
+            self._conn.execute('''
+                UPDATE games 
+                SET is_active = 0 
+                WHERE updated_at < ? AND is_active = 1
+            ''', (cutoff_date.isoformat(),))
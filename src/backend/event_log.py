@@ -0,0 +1,119 @@
+"""
+Журнал событий игры
+
+Методы Game и Board записывают в журнал события хода (бросок, перемещение,
+покупка, рента, карточка, постройка, сделка). При сохранении в базу
+добавляются только новые события и одно событие "state" с изменившимися
+частями Game.to_dict(). Полный снимок пишется при первом сохранении и
+каждые N событий (компакция), после чего старые события удаляются.
+
+Восстановление: последний снимок + дельты "state" из хвоста журнала.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Событие с изменившимися частями состояния (по нему восстанавливается игра)
+STATE_EVENT = "state"
+
+# Части состояния, которые сравниваются поэлементно, а не целиком
+_NESTED_PARTS = ("players", "board")
+
+
+def flatten_state(state: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Разбить Game.to_dict() на части: ключ части -> JSON
+
+    Игроки и поле разбиваются глубже ("players/<id>", "board/owners"),
+    чтобы изменение денег одного игрока не тянуло за собой всех остальных.
+    """
+    parts = {}
+    for key, value in state.items():
+        if key in _NESTED_PARTS and isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                parts[f"{key}/{sub_key}"] = json.dumps(sub_value, sort_keys=True)
+        else:
+            parts[key] = json.dumps(value, sort_keys=True)
+    return parts
+
+
+def apply_state_delta(state: Dict[str, Any], delta: Dict[str, Any]):
+    """Применить дельту события "state" к словарю Game.to_dict() (None - часть удалена)"""
+    for part, value in delta.items():
+        key, _, sub_key = part.partition("/")
+        if sub_key:
+            target = state.setdefault(key, {})
+            if value is None:
+                target.pop(sub_key, None)
+            else:
+                target[sub_key] = value
+        elif value is None:
+            state.pop(key, None)
+        else:
+            state[key] = value
+
+
+class EventLog:
+    """Журнал событий одной игры и состояние, уже записанное в базу"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled  # False - события не записываются (симуляции)
+        self.pending: List[Dict[str, Any]] = []  # события, еще не записанные в базу
+        self.seq = 0  # номер последнего записанного события
+        self.snapshot_seq = 0  # номер события, на котором сделан последний снимок
+        self._parts: Optional[Dict[str, str]] = None  # записанное состояние (None - снимка нет)
+
+    def record(self, event_type: str, **data):
+        """Добавить событие"""
+        if not self.enabled:
+            return
+        self.pending.append({
+            "type": event_type,
+            "data": data,
+            "ts": datetime.now().isoformat()
+        })
+
+    def collect(self, state: Dict[str, Any], snapshot_every: int) -> Tuple[List[Tuple], bool]:
+        """
+        Забрать новые события для записи
+
+        Args:
+            state: текущий Game.to_dict()
+            snapshot_every: через сколько событий после снимка делать новый снимок
+
+        Returns:
+            ([(seq, тип, JSON события)], нужен ли полный снимок)
+        """
+        parts = flatten_state(state)
+        events, self.pending = self.pending, []
+
+        if self._parts is not None:
+            delta = {part: json.loads(value) for part, value in parts.items()
+                     if self._parts.get(part) != value}
+            delta.update({part: None for part in self._parts if part not in parts})
+            if delta:
+                events.append({"type": STATE_EVENT, "data": delta, "ts": datetime.now().isoformat()})
+
+        rows = []
+        for event in events:
+            self.seq += 1
+            rows.append((self.seq, event["type"], json.dumps(event, ensure_ascii=False)))
+
+        snapshot = self._parts is None or self.seq - self.snapshot_seq >= snapshot_every
+        if snapshot:
+            self.snapshot_seq = self.seq
+
+        self._parts = parts
+        return rows, snapshot
+
+    def reset(self):
+        """Забыть записанное состояние: следующее сохранение будет полным снимком"""
+        self._parts = None
+
+    def restore(self, state: Dict[str, Any], seq: int, snapshot_seq: int):
+        """Отметить состояние, восстановленное из базы, как уже записанное"""
+        self.pending = []
+        self.seq = seq
+        self.snapshot_seq = snapshot_seq
+        self._parts = flatten_state(state)
@@ -10,10 +10,15 @@ from enum import Enum
 # В game.py убедитесь, что у вас нет импорта Player в самом начале
 # Вместо этого используйте только:
 from config import Config
-from board import Board, BoardCell, PropertyCell, StationCell, UtilityCell, CellType
+from board import BOARD_TOPOLOGY, Board, BoardCell, PropertyCell, StationCell, UtilityCell, CellType
 from src.backend.trade_manager import TradeManager
+from event_log import EventLog
+from turn_engine import TurnEngine
 from datetime import datetime, timedelta
 
+# Версия формата сохранения игры (Game.to_dict)
+SNAPSHOT_FORMAT = 2
+
 # Сначала определяем базовые классы и константы
 class GameState(Enum):
     LOBBY = "lobby"
@@ -57,6 +62,14 @@ class GameConfig:
     ]
 
 
+# Тексты для клеток, которые можно купить: (свободна, своя, чужая)
+ASSET_MESSAGES = {
+    CellType.PROPERTY: ("Свободная улица", "Это ваша собственность", "Чужая собственность"),
+    CellType.STATION: ("Свободный вокзал", "Это ваш вокзал", "Чужой вокзал"),
+    CellType.UTILITY: ("Свободное предприятие", "Это ваше предприятие", "Чужое предприятие"),
+}
+
+
 # Сначала определяем Player внутри, чтобы избежать круговых импортов
 class PlayerStatus(Enum):
     ACTIVE = "active"
@@ -78,35 +91,33 @@ PLAYER_COLORS = [
 class SimplePlayer:
     """Упрощенный класс игрока для использования в Game"""
 
+    __slots__ = (
+        "user_id", "username", "full_name", "color", "status",
+        "position", "money", "properties", "stations", "utilities",
+        "in_jail", "jail_turns", "jail_attempts", "get_out_of_jail_cards",
+        "double_count", "properties_bought", "total_rent_received", "total_rent_paid",
+        "total_salary", "total_taxes_paid", "turns_played", "is_ai",
+        "houses_built", "hotels_built",
+    )
+
     def __init__(self, user_id: int, username: str, full_name: str, color_index: int = 0):
         self.user_id = user_id
         self.username = username
         self.full_name = full_name
-        self.position = 0
-        self.money = Config.START_MONEY
+        self.color = PLAYER_COLORS[color_index % len(PLAYER_COLORS)]
+        self.status = PlayerStatus.ACTIVE
+
+        # Основные атрибуты
+        self.position = 0  # текущая позиция на поле
+        self.money = Config.START_MONEY  # стартовый капитал
         self.properties = []
         self.stations = []
         self.utilities = []
         self.in_jail = False
         self.jail_turns = 0
         self.jail_attempts = 0
-        self.get_out_of_jail_cards = 0
-
-        # Назначаем цвет игроку
-        if 0 <= color_index < len(PLAYER_COLORS):
-            self.color = PLAYER_COLORS[color_index]
-        else:
-            self.color = PLAYER_COLORS[color_index % len(PLAYER_COLORS)]
-
-        self.status = PlayerStatus.ACTIVE
-        self.double_count = 0
-        self.total_rent_received = 0
-        self.user_id = user_id
-        # Основные атрибуты
-        self.position = 0  # текущая позиция на поле
-        self.money = 1500  # стартовый капитал
-        self.in_jail = False
         self.get_out_of_jail_cards = 0  # карточки "Выход из тюрьмы"
+        self.double_count = 0  # счетчик дублей
         self.properties_bought = 0  # счетчик купленной недвижимости
 
         # Статистика
@@ -115,10 +126,8 @@ class SimplePlayer:
         self.total_salary = 0  # получено зарплаты
         self.total_taxes_paid = 0  # уплачено налогов
         self.turns_played = 0  # сыграно ходов
-
-        # Временные состояния
-        self.doubles_count = 0  # счетчик дублей
-        self.is_bankrupt = False
+        self.houses_built = 0  # построено домов
+        self.hotels_built = 0  # построено отелей
         self.is_ai = False
 
     def add_money(self, amount: int) -> bool:
@@ -167,6 +176,45 @@ class SimplePlayer:
         """Увеличить счетчик купленной недвижимости"""
         self.properties_bought += 1
 
+    # Счетчики, которые сохраняются как есть
+    _SAVED_FIELDS = (
+        "position", "money", "in_jail", "jail_turns", "jail_attempts", "get_out_of_jail_cards",
+        "double_count", "properties_bought", "total_rent_received",
+        "total_rent_paid", "total_salary", "total_taxes_paid", "turns_played", "is_ai",
+        "houses_built", "hotels_built",
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Конвертировать игрока в словарь для сохранения"""
+        status = self.status.value if isinstance(self.status, PlayerStatus) else str(self.status)
+        data = {
+            "user_id": self.user_id,
+            "username": self.username or "",
+            "full_name": self.full_name or "",
+            "color": self.color,
+            "status": status,
+            "properties": list(self.properties),
+            "stations": list(self.stations),
+            "utilities": list(self.utilities),
+        }
+        for name in self._SAVED_FIELDS:
+            data[name] = getattr(self, name)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SimplePlayer":
+        """Восстановить игрока из словаря"""
+        player = cls(data["user_id"], data.get("username", ""), data.get("full_name", ""))
+        player.color = data.get("color", PLAYER_COLORS[0])
+        player.status = PlayerStatus(data.get("status", "active"))
+        player.properties = list(data.get("properties", []))
+        player.stations = list(data.get("stations", []))
+        player.utilities = list(data.get("utilities", []))
+        for name in cls._SAVED_FIELDS:
+            if name in data:
+                setattr(player, name, data[name])
+        return player
+
 
 # Теперь класс Game
 class Game:
@@ -191,9 +239,72 @@ class Game:
         random.shuffle(self.chance_deck)
         random.shuffle(self.chest_deck)
         self.used_colors = set()
+        self.board_messages: Dict[int, int] = {}  # chat_id -> id "живого" сообщения с полем
+        # Предложение купить клетку, на которую пришел игрок: {player, position, price, double}
+        self.pending_purchase: Optional[Dict[str, Any]] = None
+        self.engine = TurnEngine(self)
         from src.backend.trade_manager import TradeManager
         self.trade_manager = TradeManager()
 
+        # Журнал событий (пишется в базу вместо полного снимка на каждое действие)
+        self.event_log = EventLog()
+        self.board.event_log = self.event_log
+
+        # Версия состояния и кэш данных для рендера поля
+        self.version = 0
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_key = None
+        self._properties_snapshot: Dict[int, Dict[str, Any]] = {}
+        self._properties_version = None
+
+    def touch(self):
+        """Отметить изменение состояния игры"""
+        self.version += 1
+
+    def render_snapshot(self) -> Dict[str, Any]:
+        """
+        Данные для рендера поля: {"game_id", "players", "properties"}
+
+        Собственность пересобирается только при изменении версии поля,
+        весь снимок - при изменении версии игры, позиций или денег игроков
+        (деньги меняются и напрямую из обработчиков). Возвращаемый словарь
+        общий для всех вызовов - его нельзя изменять.
+        """
+        players_key = tuple((p.user_id, p.position, p.money) for p in self.players.values())
+        key = (self.version, self.board.version, players_key)
+        if self._snapshot is not None and self._snapshot_key == key:
+            return self._snapshot
+
+        if self._properties_version != self.board.version:
+            properties = {}
+            for cell in self.board.cells:
+                if cell.owner_id:
+                    properties[cell.id] = {
+                        "owner": cell.owner_id,
+                        "houses": cell.houses,
+                        "hotel": cell.hotel
+                    }
+            self._properties_snapshot = properties
+            self._properties_version = self.board.version
+
+        players = []
+        for player_id, player in self.players.items():
+            players.append({
+                "id": player_id,
+                "name": player.full_name,
+                "position": player.position,
+                "color": getattr(player, 'color', '🔴'),
+                "money": player.money
+            })
+
+        self._snapshot = {
+            "game_id": self.game_id,
+            "players": players,
+            "properties": self._properties_snapshot
+        }
+        self._snapshot_key = key
+        return self._snapshot
+
     def add_player(self, user_id: int, username: str, full_name: str) -> bool:
         """Добавить игрока в игру"""
         if user_id in self.players:
@@ -217,6 +328,8 @@ class Game:
 
         player = SimplePlayer(user_id, username, full_name, color_index)
         self.players[user_id] = player
+        self.touch()
+        self.event_log.record("join", player=user_id)
         return True
 
     def remove_player(self, user_id: int):
@@ -236,6 +349,8 @@ class Game:
                 if self.current_player_index >= len(self.player_order):
                     self.current_player_index = 0
             del self.players[user_id]
+            self.touch()
+            self.event_log.record("leave", player=user_id)
 
     def start_game(self) -> bool:
         """Начать игру"""
@@ -254,6 +369,7 @@ class Game:
         random.shuffle(self.player_order)
         self.current_player_index = 0
         self.turn_count = 1
+        self.event_log.record("start", order=list(self.player_order))
 
         logger.info(f"Game started successfully. New state: {self.state}")
         return True
@@ -272,14 +388,21 @@ class Game:
 
         self.current_player_index = (self.current_player_index + 1) % len(self.player_order)
         self.turn_count += 1
+        current_id = self.player_order[self.current_player_index]
+        # Выключенный журнал проверяем здесь: это горячий путь симуляций
+        if self.event_log.enabled:
+            self.event_log.record("turn", player=current_id, turn=self.turn_count)
 
         # Возвращаем нового текущего игрока
-        return self.get_current_player()
+        return self.players.get(current_id)
 
-    def roll_dice(self) -> Tuple[int, int, int]:
-        """Бросить кубики"""
-        dice1 = random.randint(1, 6)
-        dice2 = random.randint(1, 6)
+    def roll_dice(self, dice: Optional[Tuple[int, int]] = None) -> Tuple[int, int, int]:
+        """Бросить кубики (dice - заданный результат, для симуляций и тестов)"""
+        if dice is None:
+            dice1 = random.randint(1, 6)
+            dice2 = random.randint(1, 6)
+        else:
+            dice1, dice2 = dice
         total = dice1 + dice2
 
         if dice1 == dice2:
@@ -287,21 +410,27 @@ class Game:
         else:
             self.double_count = 0
 
+        if self.event_log.enabled:
+            self.event_log.record("roll", dice=[dice1, dice2])
         return dice1, dice2, total
 
     def move_player(self, player: SimplePlayer, steps: int) -> Dict[str, Any]:
         """Переместить игрока"""
         old_position = player.position
-        new_position = (old_position + steps) % len(self.board.cells)
+        new_position = (old_position + steps) % BOARD_TOPOLOGY.size
         player.position = new_position
 
-        passed_start = (old_position + steps) >= len(self.board.cells)
+        passed_start = (old_position + steps) >= BOARD_TOPOLOGY.size
         salary = Config.SALARY if passed_start else 0
 
         if passed_start:
-            player.add_money(salary)
+            player.money += salary
             player.total_salary += salary
 
+        self.version += 1
+        if self.event_log.enabled:
+            self.event_log.record("move", player=player.user_id, to=new_position, salary=salary)
+
         return {
             "old_position": old_position,
             "new_position": new_position,
@@ -323,84 +452,55 @@ class Game:
         }
 
         # Обработка разных типов клеток
-        if cell.type == CellType.GO:
-            result["action"] = "pass_go"
-            result["message"] = "Стартовая клетка!"
-
-        elif cell.type == CellType.PROPERTY:
-            if not cell.owner_id:
+        cell_type = cell.type
+        if cell_type in ASSET_MESSAGES:
+            free, own, foreign = ASSET_MESSAGES[cell_type]
+            owner_id = cell.owner_id
+            if not owner_id:
                 result["action"] = "buy_property"
-                result["message"] = f"Свободная улица: {cell.name}! Цена: ${cell.price}"
-            elif cell.owner_id == player.user_id:
+                result["message"] = f"{free}: {cell.name}! Цена: ${cell.price}"
+            elif owner_id == player.user_id:
                 result["action"] = "own_property"
-                result["message"] = f"Это ваша собственность: {cell.name}"
+                result["message"] = f"{own}: {cell.name}"
             else:
-                owner = self.players.get(cell.owner_id)
-                if owner:
-                    rent = cell.get_rent(dice_roll, self.board.get_owner_assets(cell.owner_id))
-                    result["action"] = "pay_rent"
-                    result["owner_id"] = cell.owner_id
-                    result["rent"] = rent
-                    result["message"] = f"Чужая собственность! Рента {owner.full_name}: ${rent}"
-
-        elif cell.type == CellType.STATION:
-            if not cell.owner_id:
-                result["action"] = "buy_property"
-                result["message"] = f"Свободный вокзал: {cell.name}! Цена: ${cell.price}"
-            elif cell.owner_id == player.user_id:
-                result["action"] = "own_property"
-                result["message"] = f"Это ваш вокзал: {cell.name}"
-            else:
-                owner = self.players.get(cell.owner_id)
+                owner = self.players.get(owner_id)
                 if owner:
-                    rent = cell.get_rent(dice_roll, self.board.get_owner_assets(cell.owner_id))
+                    rent = cell.get_rent(dice_roll, self.board.get_owner_assets(owner_id))
                     result["action"] = "pay_rent"
-                    result["owner_id"] = cell.owner_id
+                    result["owner_id"] = owner_id
                     result["rent"] = rent
-                    result["message"] = f"Чужой вокзал! Рента {owner.full_name}: ${rent}"
+                    result["message"] = f"{foreign}! Рента {owner.full_name}: ${rent}"
 
-        elif cell.type == CellType.UTILITY:
-            if not cell.owner_id:
-                result["action"] = "buy_property"
-                result["message"] = f"Свободное предприятие: {cell.name}! Цена: ${cell.price}"
-            elif cell.owner_id == player.user_id:
-                result["action"] = "own_property"
-                result["message"] = f"Это ваше предприятие: {cell.name}"
-            else:
-                owner = self.players.get(cell.owner_id)
-                if owner:
-                    rent = cell.get_rent(dice_roll, self.board.get_owner_assets(cell.owner_id))
-                    result["action"] = "pay_rent"
-                    result["owner_id"] = cell.owner_id
-                    result["rent"] = rent
-                    result["message"] = f"Чужое предприятие! Рента {owner.full_name}: ${rent}"
+        elif cell_type == CellType.GO:
+            result["action"] = "pass_go"
+            result["message"] = "Стартовая клетка!"
 
-        elif cell.type == CellType.TAX:
+        elif cell_type == CellType.TAX:
             result["action"] = "pay_tax"
             result["amount"] = cell.price
             result["message"] = f"Налог: {cell.description}. Заплатите ${cell.price}"
 
-        elif cell.type == CellType.CHANCE:
+        elif cell_type == CellType.CHANCE:
             card = self.draw_card("chance")
             result["action"] = "chance_card"
             result["card"] = card
             result["message"] = f"Шанс: {card['text']}"
 
-        elif cell.type == CellType.CHEST:
+        elif cell_type == CellType.CHEST:
             card = self.draw_card("chest")
             result["action"] = "chest_card"
             result["card"] = card
             result["message"] = f"Казна: {card['text']}"
 
-        elif cell.type == CellType.JAIL:
+        elif cell_type == CellType.JAIL:
             result["action"] = "jail_visit"
             result["message"] = "Тюрьма (просто посещение)"
 
-        elif cell.type == CellType.GO_TO_JAIL:
+        elif cell_type == CellType.GO_TO_JAIL:
             result["action"] = "go_to_jail"
             result["message"] = "Отправляйтесь в тюрьму!"
 
-        elif cell.type == CellType.FREE_PARKING:
+        elif cell_type == CellType.FREE_PARKING:
             result["action"] = "free_parking"
             result["message"] = "Бесплатная стоянка!"
 
@@ -432,6 +532,9 @@ class Game:
                     owner.add_money(rent)
                     owner.total_rent_received += rent
                     player.total_rent_paid += rent
+                if self.event_log.enabled:
+                    self.event_log.record("rent", player=player.user_id, owner=owner_id,
+                                          cell=player.position, amount=rent)
 
                 result["message"] = f"Уплачена рента: ${rent}"
                 result["player_money_changed"] = True
@@ -446,6 +549,8 @@ class Game:
             if player.deduct_money(amount):
                 self.free_parking_pot += amount
                 player.total_taxes_paid += amount
+                if self.event_log.enabled:
+                    self.event_log.record("tax", player=player.user_id, amount=amount)
 
                 result["message"] = f"Уплачен налог: ${amount}"
                 result["player_money_changed"] = True
@@ -462,6 +567,7 @@ class Game:
 
         elif action == "go_to_jail":
             player.go_to_jail()
+            self.event_log.record("jail", player=player.user_id)
             result["message"] = "Вы отправлены в тюрьму!"
 
         elif action == "free_parking":
@@ -469,6 +575,7 @@ class Game:
                 amount = self.free_parking_pot
                 player.add_money(amount)
                 self.free_parking_pot = 0
+                self.event_log.record("parking", player=player.user_id, amount=amount)
 
                 result["message"] = f"🎉 Вы получаете все деньги с бесплатной парковки: ${amount}!"
                 result["player_money_changed"] = True
@@ -478,9 +585,66 @@ class Game:
 
         return result
 
+    def perform_action(self, player_id: int, action: str, **params) -> Dict[str, Any]:
+        """
+        Выполнить игровое действие без Telegram (см. turn_engine)
+
+        Args:
+            action: roll, buy, skip, jail_roll, jail_pay, jail_card, jail_skip, build, sell, trade
+            params: dice=(d1, d2) для roll/jail_roll, position для buy/skip/build/sell,
+                    hotel для build, trade_id для trade
+        Returns:
+            {"success", "error", "message", "events", "current_player", "pending"}
+        """
+        return self.engine.perform(player_id, action, **params)
+
+    def get_active_player_ids(self) -> List[int]:
+        """Игроки в порядке хода, кроме банкротов"""
+        return [pid for pid in self.player_order if not self.is_player_bankrupt(self.players[pid])]
+
+    def count_active_players(self) -> int:
+        """Сколько игроков еще не выбыло (без списка - проверяется каждый ход)"""
+        bankrupt = PlayerStatus.BANKRUPT
+        count = 0
+        for player in self.players.values():
+            if player.status is not bankrupt:
+                count += 1
+        return count
+
+    @staticmethod
+    def is_player_bankrupt(player: SimplePlayer) -> bool:
+        """Игрок выбыл из игры"""
+        return player.status == PlayerStatus.BANKRUPT
+
+    def declare_bankrupt(self, player: SimplePlayer, creditor_id: Optional[int] = None) -> List[int]:
+        """Объявить игрока банкротом: деньги - кредитору, собственность - банку"""
+        creditor = self.players.get(creditor_id) if creditor_id else None
+        if creditor and player.money > 0:
+            creditor.add_money(player.money)
+        player.money = 0
+        player.status = PlayerStatus.BANKRUPT
+
+        released = self.board.release_assets(player)
+        self.touch()
+        self.event_log.record("bankrupt", player=player.user_id, creditor=creditor_id, released=released)
+        return released
+
+    def finish_game(self) -> Optional[int]:
+        """Закончить игру и вернуть id победителя"""
+        active = self.get_active_player_ids()
+        winner = active[0] if len(active) == 1 else None
+        self.state = GameState.FINISHED
+        self.pending_purchase = None
+        self.touch()
+        self.event_log.record("game_over", winner=winner)
+        return winner
+
     def buy_property(self, player: SimplePlayer, position: int) -> bool:
         """Купить собственность на текущей позиции"""
-        return self.board.buy_property(player, position)
+        if self.board.buy_property(player, position):
+            self.touch()
+            return True
+        return False
 
     def force_start(self) -> bool:
         """Принудительный старт игры (для админов)"""
@@ -492,6 +656,7 @@ class Game:
         random.shuffle(self.player_order)
         self.current_player_index = 0
         self.turn_count = 1
+        self.event_log.record("start", order=list(self.player_order), forced=True)
 
         # Если только один игрок - автоматически ходит
         if len(self.players) == 1:
@@ -539,6 +704,7 @@ class Game:
 
         action = card.get("action")
         value = card.get("value")
+        self.event_log.record("card", player=player.user_id, action=action, value=value)
 
         if action == "move_to":
             if isinstance(value, int):
@@ -584,59 +750,32 @@ class Game:
         return None
 
     def to_dict(self) -> Dict:
-        """Конвертировать в словарь для сохранения"""
-        print(f"🔍 DEBUG to_dict: Конвертирую игру {self.game_id}")
-
-        try:
-            result = {
-                "game_id": self.game_id,
-                "creator_id": self.creator_id,
-                "players": {},
-                "player_order": self.player_order,
-                "current_player_index": self.current_player_index,
-                "state": self.state.value,
-                "created_at": self.created_at.isoformat(),
-                "double_count": self.double_count,
-                "turn_count": self.turn_count,
-                "free_parking_pot": self.free_parking_pot
-            }
-
-            print(f"🔍 DEBUG: Добавляю {len(self.players)} игроков...")
-            for k, v in self.players.items():
-                result["players"][str(k)] = self._player_to_dict(v)
-
-            print(f"✅ DEBUG to_dict: Успешно")
-            return result
-
-        except Exception as e:
-            print(f"❌ ОШИБКА в to_dict: {e}")
-            raise
+        """Конвертировать в словарь для сохранения (формат SNAPSHOT_FORMAT)"""
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "game_id": self.game_id,
+            "creator_id": self.creator_id,
+            "players": {str(k): self._player_to_dict(v) for k, v in self.players.items()},
+            "player_order": list(self.player_order),
+            "current_player_index": self.current_player_index,
+            "state": self.state.value,
+            "created_at": self.created_at.isoformat(),
+            "double_count": self.double_count,
+            "turn_count": self.turn_count,
+            "free_parking_pot": self.free_parking_pot,
+            "used_colors": sorted(self.used_colors),
+            # Колоды храним номерами карт в GameConfig
+            "chance_deck": [GameConfig.CHANCE_CARDS.index(card) for card in self.chance_deck],
+            "chest_deck": [GameConfig.CHEST_CARDS.index(card) for card in self.chest_deck],
+            "board": self.board.to_dict(),
+            "trade_manager": self.trade_manager.to_dict(),
+            "board_messages": {str(k): v for k, v in self.board_messages.items()},
+            "pending_purchase": self.pending_purchase
+        }
 
     def _player_to_dict(self, player: SimplePlayer) -> Dict:
         """Конвертировать игрока в словарь"""
-        try:
-            # Проверяем наличие всех атрибутов
-            player_data = {
-                "user_id": player.user_id,
-                "username": player.username if hasattr(player, 'username') else "",
-                "full_name": player.full_name if hasattr(player, 'full_name') else "",
-                "position": player.position if hasattr(player, 'position') else 0,
-                "money": player.money if hasattr(player, 'money') else 0,
-                "properties": player.properties if hasattr(player, 'properties') else [],
-                "stations": player.stations if hasattr(player, 'stations') else [],
-                "utilities": player.utilities if hasattr(player, 'utilities') else [],
-                "in_jail": player.in_jail if hasattr(player, 'in_jail') else False,
-                "jail_turns": player.jail_turns if hasattr(player, 'jail_turns') else 0,
-                "get_out_of_jail_cards": player.get_out_of_jail_cards if hasattr(player,
-                                                                                 'get_out_of_jail_cards') else 0,
-                "color": player.color if hasattr(player, 'color') else "",
-                "status": player.status.value if hasattr(player, 'status') else "active",
-                "double_count": player.double_count if hasattr(player, 'double_count') else 0
-            }
-            return player_data
-        except Exception as e:
-            print(f"❌ ОШИБКА в _player_to_dict для игрока {getattr(player, 'user_id', 'unknown')}: {e}")
-            raise
+        return player.to_dict()
 
     def save_state(self):
         """Сохранить состояние игры (для торговли)"""
@@ -1075,6 +1214,10 @@ class Game:
 
         print(f"✅ Все проверки пройдены, выполняем обмен...")
 
+        # Состояние меняется даже при частично выполненной сделке
+        self.touch()
+        self.board.touch()
+
         try:
             # Получаем игроков
             from_player = self.players.get(trade.from_player_id)
@@ -1130,7 +1273,7 @@ class Game:
                                 print(f"      Предприятие передано")
 
                         # Меняем владельца на клетке
-                        cell.owner_id = to_player.user_id
+                        self.board.set_owner(cell, to_player.user_id)
                         print(f"      Владелец изменен на {to_player.full_name}")
 
             # Запрос: от to_player к from_player
@@ -1165,12 +1308,14 @@ class Game:
                                 print(f"      Предприятие передано")
 
                         # Меняем владельца на клетке
-                        cell.owner_id = from_player.user_id
+                        self.board.set_owner(cell, from_player.user_id)
                         print(f"      Владелец изменен на {from_player.full_name}")
 
             # ========== ОБНОВЛЯЕМ СТАТУС ==========
             trade.status = "accepted"
             trade.processed_at = datetime.now()
+            self.event_log.record("trade", trade=trade_id, offer=trade.offer, request=trade.request,
+                                  **{"from": trade.from_player_id, "to": trade.to_player_id})
             print(f"✅ Статус предложения изменен на: accepted")
 
             # Перемещаем в историю
@@ -1292,38 +1437,14 @@ class Game:
         self.trade_manager.cleanup_expired_trades()
 
     @classmethod
-    def from_dict(cls, data):
-        game = cls(
-            game_id=data['game_id'],
-            creator_id=data['creator_id'],
-            creator_username=data['creator_username'],
-            creator_full_name=data['creator_full_name']
-        )
-        if not hasattr(game, 'used_colors'):
-            game.used_colors = set()
-        game.players = {}
-        for user_id_str, player_data in data["players"].items():
-            user_id = int(user_id_str)
-            player = SimplePlayer(
-                player_data["user_id"],
-                player_data["username"],
-                player_data["full_name"]
-            )
-            player.position = player_data.get("position", 0)
-            player.money = player_data.get("money", GameConfig.START_MONEY)
-            player.properties = player_data.get("properties", [])
-            player.stations = player_data.get("stations", [])
-            player.utilities = player_data.get("utilities", [])
-            player.in_jail = player_data.get("in_jail", False)
-            player.jail_turns = player_data.get("jail_turns", 0)
-            player.get_out_of_jail_cards = player_data.get("get_out_of_jail_cards", 0)
-            player.color = player_data.get("color", "🔴")
-            player.status = PlayerStatus(player_data.get("status", "active"))
-            player.double_count = player_data.get("double_count", 0)
-
-            game.players[user_id] = player
-
-        game.player_order = data.get("player_order", [])
+    def from_dict(cls, data: Dict) -> "Game":
+        """Восстановить игру из to_dict() (читает и старые сохранения без поля format)"""
+        game = cls(game_id=data['game_id'], creator_id=data['creator_id'])
+
+        for user_id_str, player_data in data.get("players", {}).items():
+            game.players[int(user_id_str)] = SimplePlayer.from_dict(player_data)
+
+        game.player_order = [int(pid) for pid in data.get("player_order", [])]
         game.current_player_index = data.get("current_player_index", 0)
         game.state = GameState(data.get("state", "lobby"))
         game.created_at = datetime.fromisoformat(data["created_at"])
@@ -1331,7 +1452,33 @@ class Game:
         game.turn_count = data.get("turn_count", 0)
         game.free_parking_pot = data.get("free_parking_pot", 0)
 
-        if 'trade_manager' in data:
-            game.trade_manager.load_state(data['trade_manager'])
+        if "used_colors" in data:
+            game.used_colors = set(data["used_colors"])
+        else:
+            game.used_colors = {PLAYER_COLORS.index(p.color) for p in game.players.values()
+                                if p.color in PLAYER_COLORS}
+
+        if "chance_deck" in data:
+            game.chance_deck = [GameConfig.CHANCE_CARDS[i] for i in data["chance_deck"]
+                                if 0 <= i < len(GameConfig.CHANCE_CARDS)]
+        if "chest_deck" in data:
+            game.chest_deck = [GameConfig.CHEST_CARDS[i] for i in data["chest_deck"]
+                               if 0 <= i < len(GameConfig.CHEST_CARDS)]
+
+        if "board" in data:
+            game.board.load_state(data["board"])
+        else:
+            # Старый формат: владельцев восстанавливаем по спискам собственности игроков
+            for player in game.players.values():
+                for cell_id in player.properties + player.stations + player.utilities:
+                    game.board.set_owner(game.board.get_cell(cell_id), player.user_id)
+            game.board.touch()
+
+        if "trade_manager" in data:
+            game.trade_manager.load_state(data["trade_manager"])
+
+        game.board_messages = {int(k): v for k, v in data.get("board_messages", {}).items()}
+        game.pending_purchase = data.get("pending_purchase")
 
-        return game
\ No newline at end of file
+        game.touch()
+        return game
@@ -1,12 +1,16 @@
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Set
+import asyncio
 import random
 import string
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 from datetime import datetime
 
 from config import Config
 from game import Game, GameState
 from database import GameDatabase
 from player import Player
+from save_queue import SaveQueue
 
 class GameManager:
     """Полный менеджер игр - работает для всех пользователей"""
@@ -24,8 +28,23 @@ class GameManager:
             return
 
         self.active_games: Dict[str, Game] = {}
+        self._dormant_games: Set[str] = set()  # восстановлены из БД, но еще не загружены
         self.player_to_game: Dict[int, str] = {}  # player_id -> game_id
-        self.db = GameDatabase()
+        self.username_to_player: Dict[str, int] = {}  # username (lower, без @) -> player_id
+        self._player_usernames: Dict[int, str] = {}  # player_id -> ключ username_to_player
+        # Блокировки действий: одна игра обрабатывается последовательно, разные - параллельно
+        self._action_locks: Dict[str, List] = {}  # ключ -> [asyncio.Lock, число ожидающих]
+        self.action_waits = 0  # сколько действий ждали чужое действие в той же игре
+
+        self.db = GameDatabase(snapshot_every=Config.EVENT_SNAPSHOT_INTERVAL)
+
+        # Отложенное сохранение: работает после start_save_queue(), до этого - сразу в БД
+        self.save_queue = SaveQueue(
+            self._serialize_for_queue,
+            self._write_serialized,
+            flush_interval=Config.SAVE_FLUSH_INTERVAL,
+            max_dirty=Config.SAVE_MAX_DIRTY
+        )
 
         # Загрузить активные игры из БД
         self._load_active_games()
@@ -33,17 +52,155 @@ class GameManager:
         self._initialized = True
 
     def _load_active_games(self):
-        """Загрузить активные игры из базы данных"""
+        """
+        Восстановить активные игры из базы данных
+
+        Читаются только связи игрок-игра: индексы строятся сразу, а сами игры
+        загружаются и десериализуются при первом обращении (get_game).
+        """
+        started = time.perf_counter()
         try:
-            print("✅ Менеджер игр инициализирован")
+            for game_id, player_id, username in self.db.iter_active_players():
+                self._dormant_games.add(game_id)
+                if player_id is not None:
+                    self._index_player(game_id, player_id, username)
+
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"✅ Менеджер игр инициализирован: восстановлено игр - {len(self._dormant_games)}, "
+                  f"игроков - {len(self.player_to_game)} за {elapsed:.1f} мс")
         except Exception as e:
             print(f"⚠️ Ошибка загрузки игр: {e}")
 
+    def _hydrate_game(self, game_id: str) -> Optional[Game]:
+        """Загрузить восстановленную игру из БД"""
+        self._dormant_games.discard(game_id)
+
+        started = time.perf_counter()
+        game = self.db.load_game(game_id)
+        if game is None:
+            # Игру не удалось прочитать - убираем ее игроков из индексов
+            for player_id in [p for p, g in self.player_to_game.items() if g == game_id]:
+                self._unindex_player(player_id, game_id)
+            return None
+
+        self.active_games[game_id] = game
+        self._index_game(game)
+        print(f"✅ Игра {game_id} загружена за {(time.perf_counter() - started) * 1000:.1f} мс")
+        return game
+
+    @staticmethod
+    def _normalize_username(username: Optional[str]) -> Optional[str]:
+        """Привести username к ключу индекса"""
+        if not username:
+            return None
+        return username.lower().replace('@', '')
+
+    def _index_player(self, game_id: str, user_id: int, username: Optional[str]):
+        """Добавить игрока в индексы"""
+        self.player_to_game[user_id] = game_id
+        key = self._normalize_username(username)
+        if key:
+            self.username_to_player[key] = user_id
+            self._player_usernames[user_id] = key
+
+    def _unindex_player(self, user_id: int, game_id: Optional[str] = None):
+        """Удалить игрока из индексов (если указан game_id - только связь с этой игрой)"""
+        if game_id is not None and self.player_to_game.get(user_id) != game_id:
+            return
+
+        self.player_to_game.pop(user_id, None)
+        key = self._player_usernames.pop(user_id, None)
+        if key and self.username_to_player.get(key) == user_id:
+            del self.username_to_player[key]
+
+    def _index_game(self, game: Game):
+        """Добавить в индексы всех игроков игры (при создании и восстановлении)"""
+        for player in game.players.values():
+            self._index_player(game.game_id, player.user_id, player.username)
+
+    def _unindex_game(self, game: Game):
+        """Удалить из индексов всех игроков игры"""
+        for player_id in list(game.players.keys()):
+            self._unindex_player(player_id, game.game_id)
+
+    def _serialize_for_queue(self, game_id: str):
+        """Сериализация игры для очереди сохранения (None - игра уже удалена)"""
+        game = self.active_games.get(game_id)
+        if not game:
+            return None
+        return self.db.serialize_game(game)
+
+    def _write_serialized(self, serialized: List):
+        """Запись пачки из очереди сохранения"""
+        try:
+            self.db.write_games(serialized)
+        except Exception:
+            # События не записались - следующее сохранение этих игр будет полным снимком
+            for row, _, _ in serialized:
+                game = self.active_games.get(row[0])
+                if game:
+                    game.event_log.reset()
+            raise
+
+    def start_save_queue(self):
+        """Включить отложенное сохранение (вызывается из работающего event loop)"""
+        self.save_queue.start()
+
+    async def stop_save_queue(self):
+        """Остановить отложенное сохранение и записать все изменения"""
+        await self.save_queue.stop()
+
+    def _action_keys(self, user_id: int, game_id: Optional[str] = None) -> List[str]:
+        """
+        Ключи блокировки: игра пользователя (или сам пользователь, если он не в игре)
+        и игра, которую затрагивает действие (вход в игру, кнопки лобби)
+        """
+        own_game_id = self.player_to_game.get(user_id)
+        keys = {f"game:{own_game_id}" if own_game_id else f"user:{user_id}"}
+        if game_id:
+            keys.add(f"game:{game_id}")
+        # Всегда в одном порядке, чтобы два действия не ждали друг друга по кругу
+        return sorted(keys)
+
+    @asynccontextmanager
+    async def game_action(self, user_id: int, game_id: Optional[str] = None):
+        """
+        Выполнить действие пользователя под блокировкой его игры
+
+        Обработчики меняют игру между await, поэтому действия в одной игре
+        не должны перемежаться. Действия в разных играх не блокируют друг друга.
+        game_id - игра, которую действие меняет, даже если пользователь еще не в ней.
+        """
+        async with AsyncExitStack() as stack:
+            for key in self._action_keys(user_id, game_id):
+                await stack.enter_async_context(self._action_lock(key))
+            yield
+
+    @asynccontextmanager
+    async def _action_lock(self, key: str):
+        """Блокировка по ключу; удаляется, когда ее больше никто не ждет"""
+        entry = self._action_locks.get(key)
+        if entry is None:
+            entry = self._action_locks[key] = [asyncio.Lock(), 0]
+
+        lock = entry[0]
+        if lock.locked():
+            self.action_waits += 1
+
+        entry[1] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._action_locks[key]
+
     def generate_game_id(self) -> str:
         """Сгенерировать уникальный ID игры"""
         while True:
             game_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            if game_id not in self.active_games:
+            if game_id not in self.active_games and game_id not in self._dormant_games:
                 return game_id
 
     def create_game(self, creator_id: int, username: str, full_name: str) -> Optional[str]:
@@ -60,10 +217,10 @@ class GameManager:
             return None
 
         self.active_games[game_id] = game
-        self.player_to_game[creator_id] = game_id
+        self._index_game(game)
 
         # Сохраняем в БД
-        self.db.save_game(game)
+        self.save_game_state(game_id)
 
         return game_id
 
@@ -73,7 +230,7 @@ class GameManager:
         if user_id in self.player_to_game:
             return False
 
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
             return False
 
@@ -87,9 +244,9 @@ class GameManager:
 
         # Добавляем игрока
         if game.add_player(user_id, username, full_name):
-            self.player_to_game[user_id] = game_id
+            self._index_player(game_id, user_id, username)
             # Сохраняем состояние
-            self.db.save_game(game)
+            self.save_game_state(game_id)
             return True
 
         return False
@@ -100,7 +257,7 @@ class GameManager:
         if not game_id:
             return
 
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if game:
             game.remove_player(user_id)
 
@@ -109,27 +266,28 @@ class GameManager:
                 self.delete_game(game_id)
             else:
                 # Сохранить состояние
-                self.db.save_game(game)
+                self.save_game_state(game_id)
 
         # Удаляем связь игрока с игрой
-        if user_id in self.player_to_game:
-            del self.player_to_game[user_id]
+        self._unindex_player(user_id)
 
     def get_game(self, game_id: str) -> Optional[Game]:
-        """Получить игру по ID"""
-        return self.active_games.get(game_id)
+        """Получить игру по ID (восстановленная игра загружается при первом обращении)"""
+        game = self.active_games.get(game_id)
+        if game is None and game_id in self._dormant_games:
+            game = self._hydrate_game(game_id)
+        return game
 
     def get_player_game(self, user_id: int) -> Optional[Game]:
         """Получить игру игрока"""
-        # Ищем игрока во всех активных играх
-        for game in self.active_games.values():
-            if user_id in game.players:
-                return game
-        return None
+        game_id = self.player_to_game.get(user_id)
+        if game_id is None:
+            return None
+        return self.get_game(game_id)
 
     def start_game(self, game_id: str) -> bool:
         """Начать игру"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
             return False
 
@@ -139,34 +297,44 @@ class GameManager:
 
         if game.start_game():
             # Сохранить в БД
-            self.db.save_game(game)
+            self.save_game_state(game_id)
             return True
 
         return False
 
     def save_game_state(self, game_id: str):
-        """Сохранить состояние игры"""
-        game = self.active_games.get(game_id)
-        if game:
+        """Сохранить состояние игры (через очередь, если она запущена)"""
+        game = self.get_game(game_id)
+        if not game:
+            return
+
+        if self.save_queue.running:
+            self.save_queue.mark_dirty(game_id)
+        else:
             self.db.save_game(game)
 
     def delete_game(self, game_id: str):
         """Удалить игру"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if game:
             # Удалить связи игроков
-            for player_id in list(self.player_to_game.keys()):
-                if self.player_to_game[player_id] == game_id:
-                    del self.player_to_game[player_id]
+            self._unindex_game(game)
 
-            # Удалить игру из активных
+            # Удалить игру из активных и отменить отложенное сохранение
             del self.active_games[game_id]
+            self.save_queue.discard(game_id)
 
             # Пометить как неактивную в БД
             self.db.delete_game(game_id)
 
     def get_available_games(self) -> List[Game]:
         """Получить список доступных игр в лобби"""
+        # Незагруженные игры выбираем по колонкам БД и загружаем только подходящие
+        if self._dormant_games:
+            for game_id in self.db.get_lobby_game_ids(Config.MAX_PLAYERS):
+                if game_id in self._dormant_games:
+                    self._hydrate_game(game_id)
+
         return [
             game for game in self.active_games.values()
             if game.state == GameState.LOBBY and len(game.players) < Config.MAX_PLAYERS
@@ -174,7 +342,7 @@ class GameManager:
 
     def end_game(self, game_id: str):
         """Завершить игру"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if game:
             game.state = GameState.FINISHED
 
@@ -207,9 +375,7 @@ class GameManager:
                 )
 
             # Освободить игроков
-            for player_id in list(game.players.keys()):
-                if player_id in self.player_to_game:
-                    del self.player_to_game[player_id]
+            self._unindex_game(game)
 
             # Сохранить и удалить
             self.db.save_game(game)
@@ -229,7 +395,7 @@ class GameManager:
 
     def force_start_game(self, game_id: str, user_id: int) -> bool:
         """Принудительный старт игры (работает для всех создателей)"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
             return False
 
@@ -239,24 +405,19 @@ class GameManager:
 
         # Принудительный старт
         if game.force_start():
-            self.db.save_game(game)
+            self.save_game_state(game_id)
             return True
 
         return False
 
     def get_all_players_in_game(self, game_id: str) -> Dict[int, Player]:
         """Получить всех игроков в игре"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         return game.players if game else {}
 
     def get_user_by_username(self, username: str) -> Optional[int]:
         """Найти ID пользователя по username"""
-        username = username.lower().replace('@', '')
-        for game in self.active_games.values():
-            for player in game.players.values():
-                if player.username and player.username.lower() == username:
-                    return player.user_id
-        return None
+        return self.username_to_player.get(self._normalize_username(username))
 
     def is_player_in_game(self, user_id: int) -> bool:
         """Проверить, находится ли игрок в игре"""
@@ -0,0 +1,148 @@
+"""
+Очередь отложенного сохранения игр (write-behind)
+
+Обработчики только помечают игру как измененную, а фоновая задача
+сохраняет все накопленные игры одной транзакцией: по таймеру или
+когда измененных игр становится слишком много.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class SaveQueue:
+    """Фоновое сохранение измененных игр с объединением повторных сохранений"""
+
+    def __init__(self, serialize: Callable[[str], Optional[Any]],
+                 write: Callable[[List[Any]], None],
+                 flush_interval: float = 2.0, max_dirty: int = 50):
+        """
+        Args:
+            serialize: game_id -> данные для записи (None - игра уже удалена),
+                       вызывается в event loop, чтобы не читать игру из другого потока
+            write: запись пачки сериализованных игр (выполняется в отдельном потоке)
+            flush_interval: максимальная задержка сохранения в секундах
+            max_dirty: сколько измененных игр вызывает досрочное сохранение
+        """
+        self.serialize = serialize
+        self.write = write
+        self.flush_interval = flush_interval
+        self.max_dirty = max(1, max_dirty)
+
+        self._dirty: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+
+        # Метрики
+        self.marked = 0  # вызовов mark_dirty
+        self.written = 0  # реально записанных игр
+        self.flushes = 0
+        self.last_flush_time = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Запущена ли фоновая задача"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Запустить фоновую задачу (нужен работающий event loop)"""
+        if self.running:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        print(f"✅ Очередь сохранения запущена (интервал {self.flush_interval}с)")
+
+    def mark_dirty(self, game_id: str):
+        """Пометить игру как требующую сохранения"""
+        self._dirty.add(game_id)
+        self.marked += 1
+
+        if len(self._dirty) >= self.max_dirty and self._wakeup is not None:
+            self._wakeup.set()
+
+    def discard(self, game_id: str):
+        """Отменить отложенное сохранение (игра удалена)"""
+        self._dirty.discard(game_id)
+
+    @property
+    def pending(self) -> int:
+        """Сколько игр ожидает сохранения"""
+        return len(self._dirty)
+
+    async def _run(self):
+        """Фоновый цикл: ждем таймер или переполнение и сохраняем"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Ошибка фонового сохранения: {e}")
+                import traceback
+                traceback.print_exc()
+
+            if self._stopping:
+                return
+
+    async def flush(self):
+        """Сохранить все измененные игры одной пачкой"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+
+            game_ids, self._dirty = self._dirty, set()
+
+            rows = []
+            for game_id in game_ids:
+                row = self.serialize(game_id)
+                if row is not None:
+                    rows.append(row)
+
+            if not rows:
+                return
+
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.write, rows)
+            except Exception:
+                # Не теряем изменения - попробуем в следующий раз
+                self._dirty.update(game_ids)
+                raise
+
+            self.written += len(rows)
+            self.flushes += 1
+            self.last_flush_time = time.perf_counter() - started
+
+    async def stop(self):
+        """Остановить фоновую задачу и сохранить все, что осталось"""
+        if self._task is not None:
+            # Даем текущей записи завершиться, а не отменяем ее посередине
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        if self._flush_lock is not None:
+            await self.flush()
+        print(f"✅ Очередь сохранения остановлена (записано игр: {self.written})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика очереди"""
+        return {
+            "pending": self.pending,
+            "marked": self.marked,
+            "written": self.written,
+            "flushes": self.flushes,
+            "coalesced": self.marked - self.written - self.pending,
+            "last_flush_time": self.last_flush_time,
+        }
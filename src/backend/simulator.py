@@ -0,0 +1,434 @@
+"""
+Пакетная симуляция партий (Монте-Карло)
+
+Партии играются на настоящих Game/Board через Game.perform_action - те же
+правила, карточки GameConfig.CHANCE_CARDS/CHEST_CARDS и таблицы ренты, что и
+в боте. Решения игроков принимают стратегии (Strategy). Журнал событий в
+симуляции выключен.
+
+Обычный бросок (вне тюрьмы) по умолчанию идет через lean_roll: те же правила
+без словарей событий и текстов сообщений, примерно втрое быстрее. Тюрьма и
+постройки всегда идут через perform_action. Что lean_roll считает то же, что
+движок, проверяет check_simulator.py.
+
+Каждая партия засевается своим зерном (seed:номер партии), поэтому результат
+не зависит от числа процессов. Статистика:
+- частота попаданий на каждую клетку;
+- рента по каждой собственности и уровню застройки (0-4 дома, 5 - отель);
+- распределение длины партий и победы стратегий.
+"""
+
+import random
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional, Tuple
+
+from board import CELL_DEFINITIONS, FLAG_HOTEL, CellType
+from game import Game, GameState
+
+# ========== СТРАТЕГИИ ==========
+
+class Strategy:
+    """Стратегия игрока: покупает все, что может, в тюрьме бросает кубики"""
+
+    name = "buy_all"
+
+    def __init__(self, reserve: int = 0):
+        self.reserve = reserve  # сколько денег оставлять после покупки
+
+    def start_game(self, game):
+        """Начало новой партии (сбросить то, что стратегия помнит о прошлой)"""
+
+    def should_buy(self, game, player, offer: Dict[str, Any]) -> bool:
+        """Покупать ли клетку из предложения"""
+        return player.money - offer["price"] >= self.reserve
+
+    def jail_action(self, game, player) -> str:
+        """Действие в тюрьме: jail_roll, jail_pay, jail_card или jail_skip"""
+        if player.get_out_of_jail_cards > 0:
+            return "jail_card"
+        return "jail_roll"
+
+    def build_actions(self, game, player) -> List[Tuple[int, bool]]:
+        """Что построить перед броском: [(клетка, отель)]"""
+        return []
+
+
+class CautiousStrategy(Strategy):
+    """Покупает, только если остается запас, в тюрьме сидит"""
+
+    name = "cautious"
+
+    def __init__(self, reserve: int = 300):
+        super().__init__(reserve)
+
+
+class NeverBuyStrategy(Strategy):
+    """Ничего не покупает (базовая линия для сравнения)"""
+
+    name = "never_buy"
+
+    def should_buy(self, game, player, offer: Dict[str, Any]) -> bool:
+        return False
+
+
+class BuilderStrategy(Strategy):
+    """Покупает все и застраивает собранные группы, оставляя запас"""
+
+    name = "builder"
+
+    def __init__(self, reserve: int = 150):
+        super().__init__(0)
+        self.build_reserve = reserve
+        # player_id -> версия поля, на которой строить было нечего
+        self._nothing_to_build: Dict[int, int] = {}
+
+    def jail_action(self, game, player) -> str:
+        if player.get_out_of_jail_cards > 0:
+            return "jail_card"
+        # Выйти сразу, пока на поле есть что покупать
+        if player.money > 500:
+            return "jail_pay"
+        return "jail_roll"
+
+    def build_actions(self, game, player) -> List[Tuple[int, bool]]:
+        board = game.board
+        if len(player.properties) < 2 or self._nothing_to_build.get(player.user_id) == board.version:
+            return []
+
+        candidates = [(prop, False) for prop in board.get_player_buildable_properties(player.user_id)]
+        candidates += [(prop, True) for prop in board.get_player_hotel_properties(player.user_id)]
+        if not candidates:
+            # Пока поле не изменится, проверять снова незачем
+            self._nothing_to_build[player.user_id] = board.version
+            return []
+
+        return [(prop["id"], hotel) for prop, hotel in candidates
+                if player.money - prop["price"] >= self.build_reserve]
+
+    def start_game(self, game):
+        self._nothing_to_build.clear()
+
+
+STRATEGIES = {
+    Strategy.name: Strategy,
+    CautiousStrategy.name: CautiousStrategy,
+    NeverBuyStrategy.name: NeverBuyStrategy,
+    BuilderStrategy.name: BuilderStrategy,
+}
+
+
+def make_strategies(names: List[str]) -> List[Strategy]:
+    """Создать стратегии по именам из STRATEGIES"""
+    unknown = [name for name in names if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Неизвестные стратегии: {', '.join(unknown)} (есть: {', '.join(STRATEGIES)})")
+    return [STRATEGIES[name]() for name in names]
+
+
+# ========== СТАТИСТИКА ==========
+
+class SimulationStats:
+    """Счетчики симуляции (складываются между процессами через merge)"""
+
+    def __init__(self, cells: int = 40):
+        self.games = 0
+        self.finished = 0  # партий, доигранных до победителя
+        self.capped = 0  # партий, остановленных по лимиту ходов
+        self.turns = 0  # переходов хода
+        self.actions = 0  # вызовов perform_action
+        self.landings = [0] * cells
+        self.rent_count: Dict[Tuple[int, int], int] = {}  # (клетка, уровень) -> попаданий с рентой
+        self.rent_total: Dict[Tuple[int, int], int] = {}  # (клетка, уровень) -> сумма ренты
+        self.lengths: List[int] = []  # длина каждой партии в ходах
+        self.wins: Dict[str, int] = {}  # стратегия -> побед
+        self.elapsed = 0.0  # секунд работы (сумма по процессам)
+
+    def record_events(self, events: List[Dict[str, Any]]):
+        """Учесть события одного действия"""
+        for event in events:
+            kind = event["type"]
+            if kind == "cell":
+                self.landings[event["position"]] += 1
+            elif kind == "move":
+                if event.get("card"):
+                    self.landings[event["new_position"]] += 1
+            elif kind == "rent":
+                key = (event["position"], event["level"])
+                self.rent_count[key] = self.rent_count.get(key, 0) + 1
+                self.rent_total[key] = self.rent_total.get(key, 0) + event["amount"]
+
+    def merge(self, other: "SimulationStats"):
+        """Добавить счетчики другой симуляции"""
+        self.games += other.games
+        self.finished += other.finished
+        self.capped += other.capped
+        self.turns += other.turns
+        self.actions += other.actions
+        self.landings = [a + b for a, b in zip(self.landings, other.landings)]
+        for key, count in other.rent_count.items():
+            self.rent_count[key] = self.rent_count.get(key, 0) + count
+            self.rent_total[key] = self.rent_total.get(key, 0) + other.rent_total[key]
+        self.lengths.extend(other.lengths)
+        for name, count in other.wins.items():
+            self.wins[name] = self.wins.get(name, 0) + count
+        self.elapsed += other.elapsed
+
+    def landing_frequencies(self) -> List[float]:
+        """Доля попаданий на каждую клетку"""
+        total = sum(self.landings) or 1
+        return [count / total for count in self.landings]
+
+    def rent_table(self) -> Dict[int, Dict[int, Dict[str, float]]]:
+        """{клетка: {уровень: {"count", "total", "average"}}}"""
+        table: Dict[int, Dict[int, Dict[str, float]]] = {}
+        for (position, level), count in sorted(self.rent_count.items()):
+            total = self.rent_total[(position, level)]
+            table.setdefault(position, {})[level] = {
+                "count": count,
+                "total": total,
+                "average": total / count,
+            }
+        return table
+
+    def length_summary(self) -> Dict[str, float]:
+        """Среднее, медиана и перцентили длины партий"""
+        if not self.lengths:
+            return {"mean": 0, "median": 0, "p10": 0, "p90": 0, "max": 0}
+        lengths = sorted(self.lengths)
+        n = len(lengths)
+        return {
+            "mean": sum(lengths) / n,
+            "median": lengths[n // 2],
+            "p10": lengths[int(n * 0.1)],
+            "p90": lengths[min(n - 1, int(n * 0.9))],
+            "max": lengths[-1],
+        }
+
+    def length_histogram(self, bucket: int = 50) -> List[Tuple[int, int]]:
+        """[(начало интервала в ходах, партий)]"""
+        counts: Dict[int, int] = {}
+        for length in self.lengths:
+            start = length // bucket * bucket
+            counts[start] = counts.get(start, 0) + 1
+        return sorted(counts.items())
+
+
+# ========== БЫСТРЫЙ ХОД ==========
+
+# Что делает каждая клетка при броске (по CELL_DEFINITIONS)
+_ASSET, _TAX, _CARD, _TO_JAIL, _PARKING, _NOTHING = range(6)
+_CELL_KINDS = {
+    CellType.PROPERTY: _ASSET, CellType.STATION: _ASSET, CellType.UTILITY: _ASSET,
+    CellType.TAX: _TAX, CellType.CHANCE: _CARD, CellType.CHEST: _CARD,
+    CellType.GO_TO_JAIL: _TO_JAIL, CellType.FREE_PARKING: _PARKING,
+}
+CELL_KINDS = tuple(_CELL_KINDS.get(definition.type, _NOTHING) for definition in CELL_DEFINITIONS)
+CELL_PRICES = tuple(definition.price for definition in CELL_DEFINITIONS)
+CARD_DECKS = tuple("chance" if definition.type == CellType.CHANCE else "chest" for definition in CELL_DEFINITIONS)
+
+
+def lean_roll(game, player, strategy: Strategy, dice: Tuple[int, int], stats: SimulationStats) -> int:
+    """
+    Бросок вне тюрьмы без событий, текстов и предложения покупки
+
+    Те же правила, что TurnEngine._action_roll/_resolve_cell и покупка или
+    отказ сразу после броска, но без словарей событий: попадания и рента
+    сразу идут в stats. Ренту, карточки, покупку и банкротство считает Game/Board.
+    Возвращает число действий движка, которые заменил бросок (с покупкой - 2).
+    """
+    dice1, dice2, total = game.roll_dice(dice)
+    double = dice1 == dice2
+    if double and game.double_count >= 3:
+        player.go_to_jail()
+        lean_end_turn(game, player, False)
+        return 1
+
+    game.move_player(player, total)
+    position = player.position
+    stats.landings[position] += 1
+    kind = CELL_KINDS[position]
+    board = game.board
+    actions = 1
+
+    if kind == _ASSET:
+        owner_id = board.owners[position]
+        if not owner_id:
+            price = CELL_PRICES[position]
+            offer = {"player": player.user_id, "position": position, "price": price, "double": double}
+            actions = 2
+            if strategy.should_buy(game, player, offer) and player.money >= price:
+                game.buy_property(player, position)
+        elif owner_id != player.user_id:
+            cell = board.cells[position]
+            rent = cell.get_rent(total, board.get_owner_assets(owner_id))
+            level = 5 if board.flags[position] & FLAG_HOTEL else board.houses[position]
+            key = (position, level)
+            stats.rent_count[key] = stats.rent_count.get(key, 0) + 1
+            stats.rent_total[key] = stats.rent_total.get(key, 0) + rent
+            if player.money >= rent:
+                owner = game.players[owner_id]
+                player.money -= rent
+                owner.money += rent
+                owner.total_rent_received += rent
+                player.total_rent_paid += rent
+            else:
+                game.declare_bankrupt(player, owner_id)
+
+    elif kind == _TAX:
+        amount = CELL_PRICES[position]
+        if player.money >= amount:
+            player.money -= amount
+            game.free_parking_pot += amount
+            player.total_taxes_paid += amount
+
+    elif kind == _CARD:
+        card_result = game.apply_card_action(player, game.draw_card(CARD_DECKS[position]))
+        if not player.in_jail and card_result["new_position"] is not None:
+            stats.landings[player.position] += 1
+
+    elif kind == _TO_JAIL:
+        player.go_to_jail()
+
+    elif kind == _PARKING:
+        if game.free_parking_pot > 0:
+            player.money += game.free_parking_pot
+            game.free_parking_pot = 0
+
+    lean_end_turn(game, player, double)
+    return actions
+
+
+def lean_end_turn(game, player, double: bool):
+    """Передать ход, как TurnEngine._end_turn"""
+    if len(game.player_order) > 1 and game.count_active_players() <= 1:
+        game.finish_game()
+        return
+
+    if double and not player.in_jail and not game.is_player_bankrupt(player):
+        return
+
+    game.double_count = 0
+    next_player = game.next_turn()
+    for _ in range(len(game.player_order)):
+        if next_player is None or not game.is_player_bankrupt(next_player):
+            break
+        next_player = game.next_turn()
+
+
+# ========== СИМУЛЯЦИЯ ==========
+
+def play_game(strategies: List[Strategy], seed: str, max_turns: int, stats: SimulationStats, lean: bool = True):
+    """Сыграть одну партию и добавить ее в статистику (lean - броски через lean_roll)"""
+    random.seed(seed)
+    game = Game(f"sim-{seed}", 1)
+    game.event_log.enabled = False
+
+    by_player = {}
+    for index, strategy in enumerate(strategies, 1):
+        game.add_player(index, f"bot{index}", f"Бот {index} ({strategy.name})")
+        strategy.start_game(game)
+        by_player[index] = strategy
+    game.start_game()
+
+    # Кубики бросаются здесь: random() заметно быстрее randint()
+    rand = random.random
+    # Горячий цикл: методы и состояние в локальных переменных. Game здесь из
+    # того же модуля game, поэтому состояние можно сравнивать через is
+    perform = game.engine.perform
+    record_events = stats.record_events
+    players = game.players
+    in_game = GameState.IN_PROGRESS
+
+    actions = 0
+    current_id = game.player_order[game.current_player_index]
+    pending = None
+    while game.state is in_game and game.turn_count <= max_turns:
+        player = players[current_id]
+        strategy = by_player[current_id]
+
+        if player.in_jail:
+            action = strategy.jail_action(game, player)
+        elif pending:
+            action = "buy" if strategy.should_buy(game, player, pending) else "skip"
+        else:
+            for position, hotel in strategy.build_actions(game, player):
+                perform(current_id, "build", position=position, hotel=hotel)
+                actions += 1
+            if lean:
+                actions += lean_roll(game, player, strategy, (int(rand() * 6) + 1, int(rand() * 6) + 1), stats)
+                current_id = game.player_order[game.current_player_index]
+                continue
+            action = "roll"
+
+        if action == "roll" or action == "jail_roll":
+            result = perform(current_id, action, dice=(int(rand() * 6) + 1, int(rand() * 6) + 1))
+        else:
+            result = perform(current_id, action)
+        if not result["success"] and action == "buy":
+            # Не хватило денег на покупку
+            result = perform(current_id, "skip")
+        if not result["success"]:
+            raise RuntimeError(f"Партия {seed}: действие {action} отклонено: {result['message']}")
+        actions += 1
+        record_events(result["events"])
+        current_id = result["current_player"]
+        pending = result["pending"]
+
+    stats.games += 1
+    stats.actions += actions
+    stats.turns += game.turn_count
+    stats.lengths.append(game.turn_count)
+    if game.state.value == "in_game":
+        stats.capped += 1
+    else:
+        stats.finished += 1
+        active = game.get_active_player_ids()
+        if len(active) == 1:
+            name = by_player[active[0]].name
+            stats.wins[name] = stats.wins.get(name, 0) + 1
+
+
+def simulate_range(first_game: int, count: int, strategy_names: List[str], seed: int,
+                   max_turns: int, lean: bool = True) -> SimulationStats:
+    """Сыграть партии first_game .. first_game + count - 1"""
+    strategies = make_strategies(strategy_names)
+    stats = SimulationStats()
+    started = time.perf_counter()
+    for index in range(first_game, first_game + count):
+        play_game(strategies, f"{seed}:{index}", max_turns, stats, lean)
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def _simulate_chunk(args) -> SimulationStats:
+    return simulate_range(*args)
+
+
+def run_simulation(games: int, strategy_names: List[str], seed: int = 0, processes: Optional[int] = None,
+                   max_turns: int = 1000, chunk_size: int = 50, lean: bool = True) -> SimulationStats:
+    """
+    Сыграть games партий в нескольких процессах
+
+    Args:
+        strategy_names: стратегии игроков по порядку (имена из STRATEGIES)
+        seed: зерно всей симуляции
+        processes: число процессов (None - по числу ядер, 1 - без пула)
+        max_turns: лимит ходов в партии
+        chunk_size: партий в одном задании процесса
+        lean: броски вне тюрьмы через lean_roll (False - все через perform_action)
+    """
+    make_strategies(strategy_names)  # проверка имен до запуска процессов
+    chunks = [(first, min(chunk_size, games - first), list(strategy_names), seed, max_turns, lean)
+              for first in range(0, games, chunk_size)]
+
+    stats = SimulationStats()
+    if processes == 1:
+        for chunk in chunks:
+            stats.merge(_simulate_chunk(chunk))
+        return stats
+
+    with Pool(processes) as pool:
+        for chunk_stats in pool.imap_unordered(_simulate_chunk, chunks):
+            stats.merge(chunk_stats)
+    return stats
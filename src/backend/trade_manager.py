@@ -10,6 +10,9 @@ from datetime import datetime, timedelta  # ← Добавьте timedelta зд
 class TradeOffer:
     """Предложение торговли"""
 
+    __slots__ = ("trade_id", "from_player_id", "to_player_id", "offer", "request",
+                 "status", "created_at", "expires_at", "processed_at")
+
     def __init__(self, trade_id: str, from_player_id: int, to_player_id: int,
                  offer: Dict[str, Any], request: Dict[str, Any]):
         self.trade_id = trade_id
@@ -19,19 +22,67 @@ class TradeOffer:
         self.request = request  # {money: int, properties: List[int]}
         self.status = "pending"  # pending, accepted, rejected, expired
         self.created_at = datetime.now()
-        self.expires_at = datetime.now() + timedelta(minutes=5)  # 5 минут на ответ
+        self.expires_at = self.created_at + timedelta(minutes=5)  # 5 минут на ответ
+        self.processed_at: Optional[datetime] = None
 
     def __repr__(self):
         return f"TradeOffer(id={self.trade_id}, from={self.from_player_id}, to={self.to_player_id}, status={self.status})"
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Конвертировать в словарь для сохранения"""
+        return {
+            "trade_id": self.trade_id,
+            "from": self.from_player_id,
+            "to": self.to_player_id,
+            "offer": self.offer,
+            "request": self.request,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "expires_at": self.expires_at.isoformat()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TradeOffer":
+        """Восстановить предложение из словаря"""
+        trade = cls(
+            trade_id=data["trade_id"],
+            from_player_id=data["from"],
+            to_player_id=data["to"],
+            offer=data.get("offer", {}),
+            request=data.get("request", {})
+        )
+        trade.status = data.get("status", "pending")
+        trade.created_at = datetime.fromisoformat(data["created_at"])
+        trade.expires_at = datetime.fromisoformat(data["expires_at"])
+        return trade
+
 
 class TradeManager:
     """Менеджер торговли"""
 
+    # Сколько последних сделок из истории сохранять
+    SAVED_HISTORY_SIZE = 50
+
     def __init__(self):
         self.active_trades: Dict[str, TradeOffer] = {}
         self.trade_history: List[TradeOffer] = []
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Конвертировать состояние торговли в словарь для сохранения"""
+        return {
+            "active": [trade.to_dict() for trade in self.active_trades.values()],
+            "history": [trade.to_dict() for trade in self.trade_history[-self.SAVED_HISTORY_SIZE:]]
+        }
+
+    def load_state(self, data: Dict[str, Any]):
+        """Восстановить состояние торговли из to_dict()"""
+        self.active_trades = {}
+        for trade_data in data.get("active", []):
+            trade = TradeOffer.from_dict(trade_data)
+            self.active_trades[trade.trade_id] = trade
+
+        self.trade_history = [TradeOffer.from_dict(t) for t in data.get("history", [])]
+
     def create_trade(self, from_player_id: int, to_player_id: int,
                      offer: Dict[str, Any], request: Dict[str, Any]) -> Optional[str]:
         """Создать новое предложение торговли"""
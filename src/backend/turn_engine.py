@@ -0,0 +1,363 @@
+"""
+Движок хода без Telegram
+
+Game.perform_action(player_id, action, **params) проверяет, может ли игрок
+сделать действие, применяет правила (кубики, дубли, тюрьма, рента, налоги,
+карточки, покупка, постройка, сделки, банкротство, передача хода) и
+возвращает события. Обработчики бота только показывают события, а симуляции
+и бенчмарки вызывают тот же движок без бота.
+
+Результат:
+    {"success": bool, "error": код ошибки или None, "message": текст ошибки,
+     "events": [{"type": ..., ...}], "current_player": id, "pending": предложение покупки}
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+
+# Действия, которые можно делать только в свой ход
+TURN_ACTIONS = ("roll", "buy", "skip", "jail_roll", "jail_pay", "jail_card", "jail_skip")
+# Действия, доступные в любой момент игры
+ANYTIME_ACTIONS = ("build", "sell", "trade")
+ALL_ACTIONS = frozenset(TURN_ACTIONS + ANYTIME_ACTIONS)
+
+# Сколько кругов игрок сидит в тюрьме
+JAIL_MAX_TURNS = 3
+
+
+class TurnEngine:
+    """Правила хода для одной игры"""
+
+    def __init__(self, game):
+        self.game = game
+        self.events: List[Dict[str, Any]] = []
+
+    # ---------- Точка входа ----------
+
+    def perform(self, player_id: int, action: str, **params) -> Dict[str, Any]:
+        """Выполнить действие игрока и вернуть события"""
+        self.events = []
+        game = self.game
+
+        player = game.players.get(player_id)
+        if player is None:
+            return self._error("not_in_game", "Вы не в игре!")
+        # Сравниваем по значению: game.py загружается и как game, и как src.backend.game
+        state = game.state.value
+        if state != "in_game":
+            if state == "finished":
+                return self._error("game_over", "Игра окончена!")
+            return self._error("not_started", "Игра еще не началась!")
+
+        if action not in ALL_ACTIONS:
+            return self._error("unknown_action", f"Неизвестное действие: {action}")
+        handler = getattr(self, "_action_" + action)
+
+        if action in TURN_ACTIONS:
+            order = game.player_order
+            current_id = order[game.current_player_index] if order else None
+            if current_id != player_id:
+                current = game.players.get(current_id)
+                name = current.full_name if current else "другой игрок"
+                return self._error("not_your_turn", f"Сейчас ходит {name}!")
+
+        error = handler(player, **params)
+        if error:
+            return error
+
+        game.version += 1
+        return self._result()
+
+    def _result(self) -> Dict[str, Any]:
+        game = self.game
+        order = game.player_order
+        return {
+            "success": True,
+            "error": None,
+            "message": "",
+            "events": self.events,
+            "current_player": order[game.current_player_index] if order else None,
+            "pending": game.pending_purchase,
+        }
+
+    def _error(self, code: str, message: str) -> Dict[str, Any]:
+        result = self._result()
+        result.update(success=False, error=code, message=message, events=[])
+        return result
+
+    def _emit(self, event_type: str, **data):
+        data["type"] = event_type
+        self.events.append(data)
+
+    # ---------- Бросок и клетка ----------
+
+    def _action_roll(self, player, dice: Optional[Tuple[int, int]] = None):
+        game = self.game
+        if player.in_jail:
+            return self._error("in_jail", "Вы в тюрьме! Выберите действие тюрьмы.")
+        if game.pending_purchase:
+            return self._error("purchase_pending", "Сначала купите собственность или откажитесь от покупки.")
+
+        dice1, dice2, total = game.roll_dice(dice)
+        double = dice1 == dice2
+        self._emit("roll", player=player.user_id, dice=[dice1, dice2], total=total, double=double)
+
+        if double and game.double_count >= 3:
+            player.go_to_jail()
+            if game.event_log.enabled:
+                game.event_log.record("jail", player=player.user_id)
+            self._emit("jail", player=player.user_id, reason="third_double")
+            self._end_turn(player, double=False)
+            return None
+
+        old_position = player.position
+        move = game.move_player(player, total)
+        self._emit("move", player=player.user_id, old_position=old_position,
+                   new_position=move["new_position"], passed_start=move["passed_start"],
+                   salary=move["salary"])
+
+        self._resolve_cell(player, total, double)
+        if game.pending_purchase is None:
+            self._end_turn(player, double)
+        return None
+
+    def _resolve_cell(self, player, dice_total: int, double: bool):
+        """Действие клетки, на которую пришел игрок"""
+        game = self.game
+        action_result = game.process_cell_action(player, dice_total)
+        action = action_result["action"]
+        cell = action_result["cell"]
+        self._emit("cell", player=player.user_id, position=player.position, name=cell.name,
+                   action=action, message=action_result["message"])
+
+        if action == "buy_property":
+            game.pending_purchase = {
+                "player": player.user_id,
+                "position": player.position,
+                "price": cell.price,
+                "double": double,
+            }
+            self._emit("offer", player=player.user_id, position=player.position, name=cell.name,
+                       price=cell.price, can_afford=player.money >= cell.price)
+
+        elif action == "pay_rent":
+            owner_id = action_result["owner_id"]
+            # Уровень застройки: 0-4 дома, 5 - отель
+            level = 5 if getattr(cell, "hotel", False) else getattr(cell, "houses", 0)
+            applied = game.apply_cell_action(player, action_result, dice_total)
+            self._emit("rent", player=player.user_id, owner=owner_id, position=player.position,
+                       level=level, amount=action_result["rent"], paid=applied["success"])
+            if not applied["success"]:
+                self._bankrupt(player, owner_id)
+
+        elif action == "pay_tax":
+            applied = game.apply_cell_action(player, action_result, dice_total)
+            self._emit("tax", player=player.user_id, amount=action_result["amount"], paid=applied["success"])
+
+        elif action == "free_parking":
+            applied = game.apply_cell_action(player, action_result, dice_total)
+            self._emit("parking", player=player.user_id, amount=applied["amount"])
+
+        elif action == "go_to_jail":
+            game.apply_cell_action(player, action_result, dice_total)
+            self._emit("jail", player=player.user_id, reason="cell")
+
+        elif action in ("chance_card", "chest_card"):
+            card = action_result["card"]
+            old_position = player.position
+            card_result = game.apply_card_action(player, card)
+            self._emit("card", player=player.user_id, deck="chance" if action == "chance_card" else "chest",
+                       text=card.get("text", ""), action=card.get("action"), value=card.get("value"),
+                       applied=card_result["applied"], message=card_result["message"])
+
+            if player.in_jail:
+                self._emit("jail", player=player.user_id, reason="card")
+            elif card_result["new_position"] is not None:
+                self._emit("move", player=player.user_id, old_position=old_position,
+                           new_position=player.position, passed_start=False, salary=0, card=True)
+
+    # ---------- Покупка ----------
+
+    def _take_offer(self, player, position: Optional[int]):
+        """Предложение покупки игрока (None - предложения нет)"""
+        offer = self.game.pending_purchase
+        if not offer or offer["player"] != player.user_id:
+            return None
+        if position is not None and position != offer["position"]:
+            return None
+        return offer
+
+    def _action_buy(self, player, position: Optional[int] = None):
+        game = self.game
+        offer = self._take_offer(player, position)
+        if offer is None:
+            return self._error("no_offer", "Нет активного предложения покупки!")
+
+        cell = game.board.get_cell(offer["position"])
+        if player.money < cell.price:
+            return self._error("no_money", f"Недостаточно денег! Нужно ${cell.price}")
+        if not game.buy_property(player, offer["position"]):
+            return self._error("cannot_buy", "Собственность уже куплена")
+
+        game.pending_purchase = None
+        self._emit("buy", player=player.user_id, position=offer["position"], name=cell.name, price=cell.price)
+        self._end_turn(player, offer["double"])
+        return None
+
+    def _action_skip(self, player, position: Optional[int] = None):
+        offer = self._take_offer(player, position)
+        if offer is None:
+            return self._error("no_offer", "Нет активного предложения покупки!")
+
+        cell = self.game.board.get_cell(offer["position"])
+        self.game.pending_purchase = None
+        self._emit("skip", player=player.user_id, position=offer["position"], name=cell.name, price=cell.price)
+        self._end_turn(player, offer["double"])
+        return None
+
+    # ---------- Тюрьма ----------
+
+    def _check_jail(self, player):
+        if not player.in_jail:
+            return self._error("not_in_jail", "Вы не в тюрьме!")
+        return None
+
+    def _release(self, player, method: str, **data):
+        player.release_from_jail()
+        player.jail_attempts = 0
+        self.game.double_count = 0
+        self._emit("jail_release", player=player.user_id, method=method, **data)
+
+    def _stay_in_jail(self, player, reason: str):
+        """Неудачная попытка выйти: круг засчитан, после третьего - выход"""
+        player.jail_turns += 1
+        if player.jail_turns >= JAIL_MAX_TURNS:
+            self._release(player, "time", reason=reason)
+            return
+
+        self._emit("jail_stay", player=player.user_id, reason=reason, turns=player.jail_turns,
+                   max_turns=JAIL_MAX_TURNS)
+        self._end_turn(player, double=False)
+
+    def _action_jail_roll(self, player, dice: Optional[Tuple[int, int]] = None):
+        error = self._check_jail(player)
+        if error:
+            return error
+
+        dice1, dice2, total = self.game.roll_dice(dice)
+        double = dice1 == dice2
+        self._emit("roll", player=player.user_id, dice=[dice1, dice2], total=total, double=double, jail=True)
+
+        if double:
+            self._release(player, "double")
+        else:
+            self._stay_in_jail(player, "no_double")
+        return None
+
+    def _action_jail_pay(self, player):
+        error = self._check_jail(player)
+        if error:
+            return error
+
+        if player.deduct_money(Config.JAIL_FINE):
+            self._release(player, "pay", amount=Config.JAIL_FINE)
+        else:
+            self._stay_in_jail(player, "no_money")
+        return None
+
+    def _action_jail_card(self, player):
+        error = self._check_jail(player)
+        if error:
+            return error
+
+        if player.get_out_of_jail_cards > 0:
+            player.get_out_of_jail_cards -= 1
+            self._release(player, "card", cards_left=player.get_out_of_jail_cards)
+        else:
+            self._stay_in_jail(player, "no_card")
+        return None
+
+    def _action_jail_skip(self, player):
+        error = self._check_jail(player)
+        if error:
+            return error
+
+        self._stay_in_jail(player, "skip")
+        if not player.in_jail:
+            # Отсидел три круга, но ход все равно пропущен
+            self._end_turn(player, double=False)
+        return None
+
+    # ---------- Постройки и сделки ----------
+
+    def _action_build(self, player, position: int, hotel: bool = False):
+        board = self.game.board
+        check = board.can_build_hotel(position, player.user_id) if hotel \
+            else board.can_build_house(position, player.user_id)
+        if not check.get("can_build"):
+            return self._error("cannot_build", check.get("reason", "Нельзя построить"))
+
+        price = check["hotel_price"] if hotel else check["house_price"]
+        if not player.deduct_money(price):
+            return self._error("no_money", f"Недостаточно денег! Нужно ${price}")
+
+        result = board.build_hotel(position, player.user_id) if hotel \
+            else board.build_house(position, player.user_id)
+        if hotel:
+            player.hotels_built += 1
+        else:
+            player.houses_built += 1
+        self._emit("build", player=player.user_id, position=position, name=result["property_name"],
+                   hotel=hotel, houses=board.get_cell(position).houses, price=price)
+        return None
+
+    def _action_sell(self, player, position: int):
+        board = self.game.board
+        result = board.sell_house(position, player.user_id)
+        if not result.get("success"):
+            return self._error("cannot_sell", result.get("reason", "Нельзя продать"))
+
+        player.add_money(result["price"])
+        self._emit("sell", player=player.user_id, position=position, name=result["property_name"],
+                   hotel=result.get("sold_hotel", False), houses=board.get_cell(position).houses,
+                   price=result["price"])
+        return None
+
+    def _action_trade(self, player, trade_id: str):
+        result = self.game.accept_trade(trade_id, player.user_id)
+        if not result.get("success"):
+            return self._error("trade_failed", result.get("error") or result.get("message", "Сделка не выполнена"))
+
+        self._emit("trade", player=player.user_id, trade_id=trade_id, result=result)
+        return None
+
+    # ---------- Банкротство и передача хода ----------
+
+    def _bankrupt(self, player, creditor_id: Optional[int]):
+        """Игрок не может заплатить: деньги - кредитору, собственность - банку"""
+        money = max(player.money, 0)
+        released = self.game.declare_bankrupt(player, creditor_id)
+        self._emit("bankrupt", player=player.user_id, creditor=creditor_id, money=money, released=released)
+
+    def _end_turn(self, player, double: bool):
+        """Передать ход (при дубле игрок ходит еще раз) или закончить игру"""
+        game = self.game
+        if len(game.player_order) > 1 and game.count_active_players() <= 1:
+            winner = game.finish_game()
+            self._emit("game_over", winner=winner)
+            return
+
+        if double and not player.in_jail and not game.is_player_bankrupt(player):
+            self._emit("double", player=player.user_id)
+            return
+
+        game.double_count = 0
+        next_player = game.next_turn()
+        for _ in range(len(game.player_order)):
+            if next_player is None or not game.is_player_bankrupt(next_player):
+                break
+            next_player = game.next_turn()
+
+        if next_player:
+            self._emit("turn", player=next_player.user_id, turn=game.turn_count)
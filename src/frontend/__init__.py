@@ -17,4 +17,9 @@ from .graphics import (
     create_board_image,
     save_board_to_file,
     get_board_bytes
-)
\ No newline at end of file
+)
+from .render_service import RenderService
+from .photo_cache import PhotoCache
+from .callback_router import CallbackRouter, CallbackFormatError, CallbackExpiredError
+from .live_board import LiveBoardTracker
+from .send_scheduler import SendScheduler, send_args, PRIORITY_TURN, PRIORITY_REPLY, PRIORITY_INFO
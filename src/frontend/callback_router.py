@@ -0,0 +1,315 @@
+# src/frontend/callback_router.py
+"""
+Маршрутизатор callback-кнопок
+
+Обработчики регистрируются по точному значению callback_data или по префиксу.
+Поиск - словарь точных значений, затем словари префиксов по длине (от длинных
+к коротким), поэтому время выбора обработчика не зависит от числа кнопок.
+Остаток callback_data после префикса разбирается в типизированные аргументы.
+
+Кнопки строятся через build(): маршрут с коротким кодом (opcode) кодируется
+компактно - "<код>:<поле>:<поле>", целые числа в base36 (id пользователя
+Telegram - 6-7 символов вместо 10). Если данные все равно длиннее лимита
+Telegram (64 байта), в кнопку попадает короткий токен, а сами данные
+хранятся на сервере ограниченное время.
+"""
+
+import itertools
+import secrets
+import string
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[..., Awaitable[Any]]
+Field = Tuple[str, Callable[[str], Any]]
+
+# Лимит Telegram на callback_data
+MAX_CALLBACK_DATA = 64
+# Разделитель полей компактного формата (в старом формате - "_")
+COMPACT_SEPARATOR = ":"
+# Префикс токена данных, сохраненных на сервере
+TOKEN_PREFIX = "~"
+
+_BASE36 = string.digits + string.ascii_lowercase
+
+
+def encode_int(value: int) -> str:
+    """Целое число в base36"""
+    if value < 0:
+        return "-" + encode_int(-value)
+    digits = []
+    while True:
+        value, rest = divmod(value, 36)
+        digits.append(_BASE36[rest])
+        if not value:
+            return "".join(reversed(digits))
+
+
+def decode_int(text: str) -> int:
+    """Целое число из base36"""
+    return int(text, 36)
+
+
+class CallbackFormatError(ValueError):
+    """callback_data не соответствует формату маршрута"""
+
+
+class CallbackExpiredError(CallbackFormatError):
+    """Токен кнопки не найден (истек срок хранения или бот перезапускался)"""
+
+
+class CallbackRoute:
+    """Маршрут: обработчик, поля payload и статистика времени"""
+
+    def __init__(self, name: str, handler: Handler, fields: Tuple[Field, ...] = (),
+                 opcode: Optional[str] = None):
+        self.name = name
+        self.handler = handler
+        self.fields = fields
+        self.opcode = opcode
+
+        # Метрики
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def parse(self, payload: str, compact: bool = False) -> Dict[str, Any]:
+        """
+        Разобрать payload по полям маршрута
+
+        Поля разделены "_" (в компактном формате - ":", целые в base36),
+        последнее поле получает остаток строки (в id сделки тоже есть "_").
+        """
+        if not self.fields:
+            return {}
+
+        separator = COMPACT_SEPARATOR if compact else "_"
+        parts = payload.split(separator, len(self.fields) - 1)
+        if len(parts) < len(self.fields) or not all(parts):
+            raise CallbackFormatError(f"{self.name}: ожидается {len(self.fields)} полей, получено '{payload}'")
+
+        try:
+            return {
+                name: decode_int(part) if compact and kind is int else kind(part)
+                for (name, kind), part in zip(self.fields, parts)
+            }
+        except ValueError as e:
+            raise CallbackFormatError(f"{self.name}: {e}") from e
+
+    def encode(self, values: Tuple[Any, ...]) -> str:
+        """Собрать callback_data из значений полей"""
+        if len(values) != len(self.fields):
+            raise ValueError(f"{self.name}: ожидается {len(self.fields)} значений, передано {len(values)}")
+
+        if self.opcode is None:
+            return self.name + "_".join(str(value) for value in values)
+
+        parts = [self.opcode]
+        for (name, kind), value in zip(self.fields, values):
+            if kind is int:
+                parts.append(encode_int(int(value)))
+            else:
+                part = str(value)
+                if COMPACT_SEPARATOR in part and name != self.fields[-1][0]:
+                    raise ValueError(f"{self.name}: поле {name} не может содержать '{COMPACT_SEPARATOR}'")
+                parts.append(part)
+        # Разделитель в конце отличает код маршрута без полей от точного значения
+        return COMPACT_SEPARATOR.join(parts) if self.fields else self.opcode + COMPACT_SEPARATOR
+
+
+class CallbackTokenStore:
+    """
+    Данные кнопок, не помещающиеся в callback_data: токен -> данные, с TTL
+
+    В памяти хранятся последние max_size токенов. Если задан backend
+    (save_callback_token/load_callback_token, например GameDatabase), токены
+    пишутся и туда, и кнопки работают после перезапуска и в других процессах.
+    Без backend такие кнопки после перезапуска вызывают CallbackExpiredError.
+    """
+
+    def __init__(self, ttl: float = 24 * 3600, max_size: int = 10000, backend=None):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self.backend = backend
+        self._items: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._counter = itertools.count(1)
+        # Случайная часть своя у каждого процесса: новые токены не совпадут с
+        # выданными до перезапуска или другим процессом (и не перезапишут их в базе)
+        self._token_prefix = TOKEN_PREFIX + secrets.token_urlsafe(4)
+
+    def put(self, data: str) -> str:
+        """Сохранить данные и вернуть токен"""
+        token = self._token_prefix + encode_int(next(self._counter))
+        self._items[token] = (data, time.monotonic() + self.ttl)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+        if self.backend is not None:
+            try:
+                self.backend.save_callback_token(token, data, time.time() + self.ttl)
+            except Exception as e:
+                print(f"⚠️ Токен кнопки {token} не сохранен в базе: {e}")
+        return token
+
+    def get(self, token: str) -> Optional[str]:
+        """Данные по токену (None - токен неизвестен или истек)"""
+        item = self._items.get(token)
+        if item is None:
+            return self._load(token)
+
+        data, expires_at = item
+        if time.monotonic() > expires_at:
+            del self._items[token]
+            return None
+        return data
+
+    def _load(self, token: str) -> Optional[str]:
+        """Токен из backend (выдан до перезапуска или другим процессом)"""
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.load_callback_token(token)
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать токен кнопки {token}: {e}")
+            return None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class CallbackRouter:
+    """Таблица маршрутов callback_data -> обработчик"""
+
+    def __init__(self, token_ttl: float = 24 * 3600, max_tokens: int = 10000, token_backend=None):
+        self._exact: Dict[str, CallbackRoute] = {}
+        self._prefixes: Dict[int, Dict[str, CallbackRoute]] = {}  # длина префикса -> {префикс: маршрут}
+        self._prefix_lengths: List[int] = []  # по убыванию: побеждает самый длинный префикс
+        self._opcodes: Dict[str, CallbackRoute] = {}
+        self._by_name: Dict[str, CallbackRoute] = {}
+        self.tokens = CallbackTokenStore(token_ttl, max_tokens, token_backend)
+
+    def _register(self, route: CallbackRoute):
+        """Зарегистрировать короткий код и имя маршрута"""
+        if route.opcode is not None:
+            if COMPACT_SEPARATOR in route.opcode or route.opcode.startswith(TOKEN_PREFIX):
+                raise ValueError(f"Недопустимый код маршрута: {route.opcode}")
+            if route.opcode in self._opcodes:
+                raise ValueError(f"Код {route.opcode} уже зарегистрирован")
+            self._opcodes[route.opcode] = route
+        self._by_name[route.name] = route
+
+    def exact(self, data: str, handler: Handler, opcode: Optional[str] = None):
+        """Маршрут для точного значения callback_data"""
+        if data in self._exact:
+            raise ValueError(f"Значение {data} уже зарегистрировано")
+
+        route = CallbackRoute(data, handler, opcode=opcode)
+        self._register(route)
+        self._exact[data] = route
+
+    def prefix(self, prefix: str, handler: Handler, *fields: Field, opcode: Optional[str] = None):
+        """Маршрут для callback_data, начинающихся с prefix (fields - поля остатка)"""
+        if prefix in self._prefixes.get(len(prefix), {}):
+            raise ValueError(f"Префикс {prefix} уже зарегистрирован")
+
+        route = CallbackRoute(prefix, handler, fields, opcode)
+        self._register(route)
+        self._prefixes.setdefault(len(prefix), {})[prefix] = route
+        self._prefix_lengths = sorted(self._prefixes, reverse=True)
+
+    def build(self, name: str, *values: Any) -> str:
+        """
+        callback_data для кнопки маршрута name (префикс или точное значение)
+
+        Старые кнопки с полным префиксом продолжают обрабатываться.
+        """
+        data = self._by_name[name].encode(values)
+        if len(data.encode("utf-8")) > MAX_CALLBACK_DATA:
+            data = self.tokens.put(data)
+        return data
+
+    def resolve(self, data: str) -> Tuple[Optional[CallbackRoute], str, bool]:
+        """Найти маршрут: (маршрут или None, payload после префикса, компактный ли формат)"""
+        if data.startswith(TOKEN_PREFIX):
+            stored = self.tokens.get(data)
+            if stored is None:
+                raise CallbackExpiredError(f"Токен {data} не найден")
+            data = stored
+
+        opcode, separator, payload = data.partition(COMPACT_SEPARATOR)
+        if separator:
+            route = self._opcodes.get(opcode)
+            if route is not None:
+                return route, payload, True
+
+        route = self._exact.get(data)
+        if route is not None:
+            return route, "", False
+
+        for length in self._prefix_lengths:
+            route = self._prefixes[length].get(data[:length])
+            if route is not None:
+                return route, data[length:], False
+
+        return None, data, False
+
+    def game_id_of(self, data: str) -> Optional[str]:
+        """Поле game_id кнопки (None - у маршрута его нет или данные не разобрать)"""
+        try:
+            route, payload, compact = self.resolve(data)
+            if route is None:
+                return None
+            return route.parse(payload, compact).get("game_id")
+        except CallbackFormatError:
+            return None
+
+    async def dispatch(self, update, context, data: str) -> bool:
+        """
+        Вызвать обработчик для callback_data
+
+        Returns:
+            False, если маршрут не найден
+        Raises:
+            CallbackFormatError: payload не разобран по полям маршрута
+            CallbackExpiredError: токен кнопки больше не хранится
+        """
+        route, payload, compact = self.resolve(data)
+        if route is None:
+            return False
+
+        kwargs = route.parse(payload, compact)
+
+        started = time.perf_counter()
+        try:
+            await route.handler(update, context, **kwargs)
+        except Exception:
+            route.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            route.calls += 1
+            route.total_time += elapsed
+            route.max_time = max(route.max_time, elapsed)
+        return True
+
+    def routes(self) -> List[CallbackRoute]:
+        """Все маршруты"""
+        routes = list(self._exact.values())
+        for length in self._prefix_lengths:
+            routes.extend(self._prefixes[length].values())
+        return routes
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Время обработки по маршрутам"""
+        return {
+            route.name: {
+                "calls": route.calls,
+                "errors": route.errors,
+                "avg_time": route.total_time / route.calls if route.calls else 0.0,
+                "max_time": route.max_time,
+            }
+            for route in self.routes()
+        }
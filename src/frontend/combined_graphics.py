@@ -3,10 +3,9 @@
 Функции для создания совмещенных изображений с текстом и игровым полем
 """
 
-import io
 from PIL import Image, ImageDraw, ImageFont
 from typing import Dict, List, Optional, Tuple
-from .graphics import board_renderer, create_board_image, get_board_bytes
+from .graphics import board_renderer, create_board_image, get_board_bytes, DEFAULT_PROFILE
 
 # Цвета для текста
 TEXT_COLORS = {
@@ -49,7 +48,10 @@ def create_combined_image(game_data: Dict, text_message: str,
     # 1. Создаем изображение поля
     board_image = board_renderer.render_board(game_data, include_legend=show_legend)
 
-
+    # Текст отправляется подписью к фото, поэтому рамка рисуется прямо на поле
+    combined = board_image
+    total_height = combined.height
+    draw = ImageDraw.Draw(combined, 'RGBA')
 
     # 4. Добавляем рамку текущего игрока
     # ИСПРАВЛЕНО: используем PLAYER_COLORS_RGB из текущего файла
@@ -208,18 +210,18 @@ def create_text_image(text: str, width: int, padding: int = 20) -> Image.Image:
 
 
 def get_combined_board_bytes(game_data: Dict, text_message: str,
-                             player_color: str = "🔴") -> bytes:
+                             player_color: str = "🔴",
+                             profile: Optional[str] = None) -> bytes:
     """
     Возвращает байты совмещенного изображения
+
+    Args:
+        profile: профиль вывода из RENDER_PROFILES (по умолчанию - full, PNG)
     """
     combined_image = create_combined_image(game_data, text_message, player_color)
 
     # Конвертируем в bytes для Telegram
-    img_byte_arr = io.BytesIO()
-    combined_image.save(img_byte_arr, format='PNG', optimize=True)
-    img_byte_arr.seek(0)
-
-    return img_byte_arr.getvalue()
+    return board_renderer.save_to_bytes(combined_image, profile=profile or DEFAULT_PROFILE)
 
 
 # Функция для быстрого создания сообщения с полем
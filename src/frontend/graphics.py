@@ -4,6 +4,7 @@ import os
 from typing import Dict, List, Tuple, Optional, Any
 import io
 import math
+from collections import OrderedDict
 
 # Цвета игроков (RGB)
 PLAYER_COLORS_RGB = {
@@ -19,6 +20,21 @@ PLAYER_COLORS_RGB = {
     "🌊": (50, 150, 200),  # Голубой
 }
 
+# Размер клетки, используемый при отрисовке маркеров, домов и фишек
+CELL_SIZE = 160
+
+# Сколько слоев собственности держать в памяти (по одному на игру)
+OWNERSHIP_CACHE_SIZE = 512
+
+# Профили вывода изображения: формат, максимальная сторона и качество
+RENDER_PROFILES = {
+    "full": {"format": "PNG", "max_side": None, "quality": 95, "optimize": True},
+    "preview": {"format": "JPEG", "max_side": 900, "quality": 85, "optimize": False},
+    "preview_webp": {"format": "WEBP", "max_side": 900, "quality": 80, "optimize": False},
+    "thumbnail": {"format": "JPEG", "max_side": 400, "quality": 75, "optimize": False},
+}
+DEFAULT_PROFILE = "full"
+
 
 class BoardRenderer:
     """Класс для отрисовки игрового поля с игроками и домами"""
@@ -41,6 +57,12 @@ class BoardRenderer:
         # Координаты клеток - будем загружать из Python-файла
         self.cell_coordinates = self._load_coordinates()
 
+        # Кэш слоев собственности: ключ игры -> (сигнатура собственности, патчи)
+        self.ownership_cache_size = OWNERSHIP_CACHE_SIZE
+        self._ownership_layers: "OrderedDict[Any, Tuple[Tuple, List]]" = OrderedDict()
+        self.layer_hits = 0
+        self.layer_misses = 0
+
     def _load_board_image(self):
         """Загружаем изображение поля"""
         try:
@@ -510,8 +532,8 @@ class BoardRenderer:
         )
 
     def _draw_property_ownership(self, draw: ImageDraw, properties: Dict, players: List[Dict],
-                                 width: int, height: int):
-        """Рисует обозначения собственности на поле"""
+                                 width: int, height: int, offset: Tuple[int, int] = (0, 0)):
+        """Рисует обозначения собственности на поле (offset - сдвиг системы координат)"""
         # Создаем словарь игроков для быстрого доступа
         players_dict = {p['id']: p for p in players}
 
@@ -521,6 +543,7 @@ class BoardRenderer:
         for cell_id, prop_data in properties.items():
             if cell_id in self.cell_coordinates:
                 x, y = self.cell_coordinates[cell_id]
+                x, y = x - offset[0], y - offset[1]
                 owner_id = prop_data.get('owner')
 
                 if owner_id and owner_id in players_dict:
@@ -556,24 +579,110 @@ class BoardRenderer:
                     except:
                         pass
 
+    def _ownership_signature(self, properties: Dict, players: List[Dict]) -> Tuple:
+        """Сигнатура слоя собственности - меняется только вместе с его содержимым"""
+        players_dict = {p.get('id'): p for p in players}
+        signature = []
+        for cell_id in sorted(properties):
+            prop_data = properties[cell_id]
+            owner = players_dict.get(prop_data.get('owner'))
+            signature.append((
+                cell_id,
+                prop_data.get('owner'),
+                prop_data.get('houses', 0),
+                bool(prop_data.get('hotel', False)),
+                owner.get('color', '🔴') if owner else None,
+                (owner.get('name') or '?')[:1] if owner else None,
+            ))
+        return tuple(signature)
+
+    def _build_ownership_layer(self, properties: Dict, players: List[Dict]) -> List:
+        """
+        Строит слой собственности: маркеры владельцев и дома/отели
+
+        Слой хранится как набор маленьких прозрачных патчей (по одному на клетку),
+        чтобы не держать в памяти полноразмерное изображение на каждую игру.
+        """
+        patches = []
+        half = CELL_SIZE // 2 + 20
+
+        for cell_id, prop_data in properties.items():
+            if cell_id not in self.cell_coordinates:
+                continue
+
+            x, y = self.cell_coordinates[cell_id]
+            left, top = x - half, y - half
+            patch = Image.new('RGBA', (half * 2, half * 2), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(patch, 'RGBA')
+
+            # Рисуем в локальных координатах патча
+            self._draw_property_ownership(
+                draw, {cell_id: prop_data}, players, patch.width, patch.height,
+                offset=(left, top)
+            )
+
+            houses = prop_data.get("houses", 0)
+            hotel = prop_data.get("hotel", False)
+            if houses > 0 or hotel:
+                self._draw_houses(draw, x - left, y - top, houses, hotel, CELL_SIZE)
+
+            bbox = patch.getbbox()
+            if bbox:
+                patches.append((patch.crop(bbox), (left + bbox[0], top + bbox[1])))
+
+        return patches
+
+    def _get_ownership_layer(self, game_key: Any, properties: Dict, players: List[Dict]) -> List:
+        """Возвращает слой собственности из кэша или перестраивает его"""
+        signature = self._ownership_signature(properties, players)
+        cached = self._ownership_layers.get(game_key)
+
+        if cached and cached[0] == signature:
+            self._ownership_layers.move_to_end(game_key)
+            self.layer_hits += 1
+            return cached[1]
+
+        self.layer_misses += 1
+        patches = self._build_ownership_layer(properties, players)
+        self._ownership_layers[game_key] = (signature, patches)
+        self._ownership_layers.move_to_end(game_key)
+
+        while len(self._ownership_layers) > self.ownership_cache_size:
+            self._ownership_layers.popitem(last=False)
+
+        return patches
+
+    def invalidate_game(self, game_id: Any):
+        """Сбросить закэшированный слой собственности игры"""
+        self._ownership_layers.pop(game_id, None)
+
     def render_board(self, game_data: Dict, include_legend: bool = True) -> Image.Image:
         """
         Рендерим поле с игроками и собственностью
 
-        Включает только визуальные элементы:
-        - Игроки с их позициями
-        - Приобретенная собственность (цветные маркеры)
-        - Дома/отели с разными формами
-        - Легенда с информацией об игроках
+        Изображение собирается из слоев:
+        - Статичное поле (загружается один раз)
+        - Собственность и дома/отели (кэшируется по игре, перестраивается
+          только при изменении properties)
+        - Фишки игроков и легенда (рисуются на каждый вызов)
         """
-        # Создаем копию поля
-        board_copy = self.board_image.copy()
-        draw = ImageDraw.Draw(board_copy, 'RGBA')
+        players = game_data.get("players", [])
+        properties = game_data.get("properties", {})
 
+        # 1. Статичная основа
+        board_copy = self.board_image.copy()
         width, height = board_copy.size
 
-        players = game_data.get("players", [])
-        properties = game_data.get("properties", {})
+        # 2. Слой собственности (под фишками)
+        if properties:
+            game_key = game_data.get("game_id")
+            if game_key is None:
+                game_key = self._ownership_signature(properties, players)
+
+            for patch, dest in self._get_ownership_layer(game_key, properties, players):
+                board_copy.alpha_composite(patch, dest=dest)
+
+        draw = ImageDraw.Draw(board_copy, 'RGBA')
 
         # Группируем игроков по клеткам
         players_by_cell = {}
@@ -583,30 +692,14 @@ class BoardRenderer:
                 players_by_cell[pos] = []
             players_by_cell[pos].append(player)
 
-        # 1. Рисуем обозначения собственности (под всем остальным)
-        if properties:
-            self._draw_property_ownership(draw, properties, players, width, height)
-
-        # 2. Рисуем дома/отели с разными формами
-        for cell_id, prop_data in properties.items():
-            if cell_id in self.cell_coordinates:
-                x, y = self.cell_coordinates[cell_id]
-                houses = prop_data.get("houses", 0)
-                hotel = prop_data.get("hotel", False)
-
-                if houses > 0 or hotel:
-                    cell_size = 160
-                    self._draw_houses(draw, x, y, houses, hotel, cell_size)
-
         # 3. Рисуем игроков поверх всего
         for cell_id, cell_players in players_by_cell.items():
             if cell_id in self.cell_coordinates:
                 x, y = self.cell_coordinates[cell_id]
-                cell_size = 160
 
                 for i, player in enumerate(cell_players):
                     color = player.get("color", "🔴")
-                    self._draw_player_icon(draw, x, y, color, i, len(cell_players), cell_size)
+                    self._draw_player_icon(draw, x, y, color, i, len(cell_players), CELL_SIZE)
 
         # 4. Рисуем легенду с игроками
         if include_legend and players:
@@ -614,26 +707,56 @@ class BoardRenderer:
 
         return board_copy
 
-    def save_to_bytes(self, image: Image.Image, format: str = 'PNG', quality: int = 95) -> bytes:
-        """Конвертируем изображение в bytes для отправки в Telegram"""
+    def save_to_bytes(self, image: Image.Image, format: str = 'PNG', quality: int = 95,
+                      profile: Optional[str] = None) -> bytes:
+        """
+        Конвертируем изображение в bytes для отправки в Telegram
+
+        Если указан profile (см. RENDER_PROFILES), формат, размер и качество
+        берутся из профиля, а format и quality игнорируются.
+        """
+        optimize = True
+        if profile is not None:
+            settings = get_render_profile(profile)
+            format = settings["format"]
+            quality = settings["quality"]
+            optimize = settings["optimize"]
+            image = self._resize_for_profile(image, settings["max_side"])
+
         img_byte_arr = io.BytesIO()
 
-        if format.upper() == 'JPEG' or format.upper() == 'JPG':
-            # Для JPEG конвертируем в RGB
+        if format.upper() in ('JPEG', 'JPG', 'WEBP'):
+            # Для JPEG/WebP убираем прозрачность (фон - белый)
             if image.mode in ('RGBA', 'LA', 'P'):
+                if image.mode == 'P':
+                    image = image.convert('RGBA')
                 rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
+                rgb_image.paste(image, mask=image.split()[-1])
                 image_to_save = rgb_image
             else:
                 image_to_save = image
-            image_to_save.save(img_byte_arr, format='JPEG', quality=quality, optimize=True)
+
+            if format.upper() == 'WEBP':
+                image_to_save.save(img_byte_arr, format='WEBP', quality=quality, method=4)
+            else:
+                image_to_save.save(img_byte_arr, format='JPEG', quality=quality, optimize=optimize)
         else:
             # Для PNG сохраняем как есть
-            image.save(img_byte_arr, format='PNG', optimize=True)
+            image.save(img_byte_arr, format='PNG', optimize=optimize)
 
         img_byte_arr.seek(0)
         return img_byte_arr.getvalue()
 
+    @staticmethod
+    def _resize_for_profile(image: Image.Image, max_side: Optional[int]) -> Image.Image:
+        """Уменьшает изображение так, чтобы большая сторона была не больше max_side"""
+        if not max_side or max(image.size) <= max_side:
+            return image
+
+        scale = max_side / max(image.size)
+        new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        return image.resize(new_size, Image.Resampling.LANCZOS)
+
     def save_to_file(self, image: Image.Image, filename: str = "current_board.png") -> str:
         """Сохраняем изображение в файл"""
         os.makedirs("temp", exist_ok=True)
@@ -671,6 +794,15 @@ class BoardRenderer:
         return self.render_board(game_data)
 
 
+def get_render_profile(name: Optional[str]) -> Dict[str, Any]:
+    """Настройки профиля по имени (неизвестное имя - профиль по умолчанию)"""
+    if name not in RENDER_PROFILES:
+        if name is not None:
+            print(f"⚠️ Неизвестный профиль рендера '{name}', использую '{DEFAULT_PROFILE}'")
+        name = DEFAULT_PROFILE
+    return RENDER_PROFILES[name]
+
+
 # Глобальный экземпляр рендерера
 board_renderer = BoardRenderer()
 
@@ -695,7 +827,7 @@ def save_board_to_file(players: List[Dict], filename: str = "board.png") -> str:
     return board_renderer.save_to_file(image, filename)
 
 
-def get_board_bytes(players: List[Dict], properties: Dict = None) -> bytes:
+def get_board_bytes(players: List[Dict], properties: Dict = None, profile: Optional[str] = None) -> bytes:
     """Возвращает байты изображения доски"""
     if properties is None:
         properties = {}
@@ -706,7 +838,7 @@ def get_board_bytes(players: List[Dict], properties: Dict = None) -> bytes:
     }
 
     image = board_renderer.render_board(game_data)
-    return board_renderer.save_to_bytes(image)
+    return board_renderer.save_to_bytes(image, profile=profile)
 
 
 # Если файл запускается напрямую
@@ -0,0 +1,73 @@
+# src/frontend/live_board.py
+"""
+"Живое" сообщение с полем: одно сообщение на игру в каждом чате
+
+Вместо новой фотографии на каждый ход сообщение с полем редактируется
+(edit_message_media / edit_message_caption). Новое сообщение отправляется,
+только если старое ушло слишком далеко вверх по чату или его нельзя изменить.
+id сообщений хранятся в состоянии игры (Game.board_messages).
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class LiveBoardTracker:
+    """Решает, редактировать ли сообщение с полем или отправить новое"""
+
+    def __init__(self, max_distance: int = 6, max_chats: int = 10000):
+        """
+        Args:
+            max_distance: сколько сообщений может быть после поля, чтобы его еще редактировать
+            max_chats: сколько чатов помнить
+        """
+        self.max_distance = max_distance
+        self.max_chats = max(1, max_chats)
+        self._latest: "OrderedDict[int, int]" = OrderedDict()  # chat_id -> последний известный message_id
+        self._photo_keys: Dict[int, str] = {}  # message_id поля -> ключ показанной картинки
+
+        # Метрики
+        self.edited = 0  # изменена только подпись
+        self.media_edited = 0  # заменена картинка
+        self.sent = 0  # отправлено новое сообщение
+
+    def seen(self, chat_id: int, message_id: int):
+        """Запомнить сообщение в чате (входящее или отправленное ботом)"""
+        if message_id > self._latest.get(chat_id, 0):
+            self._latest[chat_id] = message_id
+            self._latest.move_to_end(chat_id)
+
+        while len(self._latest) > self.max_chats:
+            self._latest.popitem(last=False)
+
+    def can_edit(self, chat_id: int, message_id: Optional[int]) -> bool:
+        """Сообщение с полем есть и находится недалеко от конца чата"""
+        if not message_id:
+            return False
+        latest = self._latest.get(chat_id)
+        if latest is None:
+            # Чат не видели (например, после перезапуска): где конец чата, неизвестно
+            return False
+        return latest - message_id <= self.max_distance
+
+    def photo_key(self, message_id: int) -> Optional[str]:
+        """Ключ картинки, которая сейчас показана в сообщении"""
+        return self._photo_keys.get(message_id)
+
+    def shown(self, chat_id: int, message_id: int, key: str, old_message_id: Optional[int] = None):
+        """Запомнить, какая картинка показана в сообщении с полем"""
+        if old_message_id and old_message_id != message_id:
+            self._photo_keys.pop(old_message_id, None)
+        self._photo_keys[message_id] = key
+        self.seen(chat_id, message_id)
+
+        while len(self._photo_keys) > self.max_chats:
+            self._photo_keys.pop(next(iter(self._photo_keys)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика обновлений поля"""
+        return {
+            "edited": self.edited,
+            "media_edited": self.media_edited,
+            "sent": self.sent,
+        }
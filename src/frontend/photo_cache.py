@@ -0,0 +1,85 @@
+# src/frontend/photo_cache.py
+"""
+Кэш Telegram file_id для уже загруженных изображений поля
+
+Одинаковое состояние игры дает одинаковую картинку, поэтому повторно
+ее можно отправить по file_id без рендера и загрузки в Telegram.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class PhotoCache:
+    """LRU-кэш: хэш данных изображения -> file_id"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max(1, max_size)
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(game_data: Dict, *variant: Any) -> str:
+        """
+        Канонический хэш данных для рендера
+
+        Args:
+            game_data: данные игры (players/properties)
+            variant: все, что еще влияет на картинку (текст, цвет, профиль)
+        """
+        payload = json.dumps(
+            [game_data, variant],
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(',', ':'),
+            default=str
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Получить file_id по ключу"""
+        file_id = self._items.get(key)
+        if file_id is None:
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return file_id
+
+    def put(self, key: str, file_id: str):
+        """Запомнить file_id"""
+        self._items[key] = file_id
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def remember(self, key: str, message) -> Optional[str]:
+        """Запомнить file_id из отправленного сообщения с фото"""
+        photo = getattr(message, 'photo', None)
+        if not photo:
+            return None
+
+        # Берем самую большую версию фото
+        file_id = photo[-1].file_id
+        self.put(key, file_id)
+        return file_id
+
+    def discard(self, key: str):
+        """Удалить запись (например, если Telegram отклонил file_id)"""
+        self._items.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
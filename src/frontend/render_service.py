@@ -0,0 +1,147 @@
+# src/frontend/render_service.py
+"""
+Асинхронный сервис рендеринга игрового поля
+
+Отрисовка и кодирование изображения выполняются в пуле процессов,
+чтобы event loop бота не занимался работой с пикселями.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Any
+
+# Рендерер процесса-воркера (поле и шрифты загружаются один раз на процесс)
+_worker_renderer = None
+
+
+def _init_worker():
+    """Инициализация процесса-воркера: загружаем поле и шрифты"""
+    global _worker_renderer
+    from src.frontend.graphics import board_renderer
+    _worker_renderer = board_renderer
+
+
+def _get_worker_renderer():
+    """Рендерер текущего процесса"""
+    if _worker_renderer is None:
+        _init_worker()
+    return _worker_renderer
+
+
+def _render_board_job(game_data: Dict, include_legend: bool, profile: str) -> bytes:
+    """Рендер поля и кодирование в bytes (выполняется в воркере)"""
+    renderer = _get_worker_renderer()
+    image = renderer.render_board(game_data, include_legend=include_legend)
+    return renderer.save_to_bytes(image, profile=profile)
+
+
+def _render_combined_job(game_data: Dict, text_message: str, player_color: str,
+                         profile: str) -> bytes:
+    """Рендер совмещенного изображения (выполняется в воркере)"""
+    _get_worker_renderer()
+    from src.frontend.combined_graphics import get_combined_board_bytes
+    return get_combined_board_bytes(game_data, text_message, player_color, profile=profile)
+
+
+class RenderService:
+    """Сервис рендеринга с пулом процессов и ограничением очереди"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32, default_profile: str = "full"):
+        """
+        Args:
+            max_workers: количество процессов-воркеров (0 - один фоновый поток)
+            max_pending: максимум задач в работе, остальные ждут своей очереди
+            default_profile: профиль вывода, если он не указан при вызове
+        """
+        self.max_workers = max_workers
+        self.default_profile = default_profile
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Метрики
+        self.waiting = 0  # ждут свободного слота
+        self.in_flight = 0  # выполняются в пуле
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_render_time = 0.0
+
+    def _get_executor(self) -> Executor:
+        """Пул создается лениво при первом рендере"""
+        if self._executor is None:
+            if self.max_workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, initializer=_init_worker)
+            print(f"✅ Пул рендеринга запущен (воркеров: {self.max_workers or 'поток'})")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Текущая глубина очереди: ожидающие + выполняющиеся задачи"""
+        return self.waiting + self.in_flight
+
+    async def _submit(self, func, *args) -> bytes:
+        """Отправить задачу в пул с учетом ограничения очереди"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        self.waiting += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.total_render_time += time.perf_counter() - started
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def render_board_bytes(self, game_data: Dict, include_legend: bool = True,
+                                 profile: Optional[str] = None) -> bytes:
+        """Отрисовать поле и вернуть bytes изображения"""
+        return await self._submit(_render_board_job, game_data, include_legend,
+                                  profile or self.default_profile)
+
+    async def render_combined_bytes(self, game_data: Dict, text_message: str,
+                                    player_color: str = "🔴", profile: Optional[str] = None) -> bytes:
+        """Отрисовать совмещенное изображение и вернуть bytes"""
+        return await self._submit(_render_combined_job, game_data, text_message, player_color,
+                                  profile or self.default_profile)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика сервиса"""
+        finished = self.completed + self.failed
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_render_time": self.total_render_time / finished if finished else 0.0,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Остановить пул воркеров"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            print("✅ Пул рендеринга остановлен")
@@ -0,0 +1,360 @@
+# src/frontend/send_scheduler.py
+"""
+Планировщик исходящих сообщений с учетом лимитов Telegram
+
+Подключается к Application как rate limiter, поэтому через него проходят все
+запросы к Bot API (reply_text, send_photo, edit_message_* и т.д.):
+- у каждого чата свое "ведро" токенов (в личке ~1 сообщение в секунду
+  с небольшим запасом, в группах ~20 в минуту), плюс общий лимит бота;
+- из ожидающих запросов первым уходит запрос с более высоким приоритетом
+  ("ваш ход" раньше информационных уведомлений);
+- RetryAfter (429) блокирует чат на указанное время, запрос повторяется;
+- запрос с тем же ключом объединения (например, правка одного и того же
+  сообщения), пока предыдущий еще ждет в очереди, заменяет его - оба
+  вызова получают результат последнего.
+
+Запросы без chat_id (answerCallbackQuery, getUpdates, getMe) не задерживаются.
+Параметры запроса передаются через rate_limit_args: send_args(priority, coalesce).
+О каждом отправленном сообщении сообщается через on_sent(chat_id, message_id).
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+# Приоритеты (меньше - важнее)
+PRIORITY_TURN = 0  # уведомление "ваш ход"
+PRIORITY_REPLY = 1  # ответ на действие пользователя (по умолчанию)
+PRIORITY_INFO = 2  # информационные уведомления другим игрокам
+
+
+def send_args(priority: int = PRIORITY_REPLY, coalesce: Optional[str] = None) -> Dict[str, Any]:
+    """rate_limit_args для запроса к Bot API"""
+    return {"priority": priority, "coalesce": coalesce}
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # до этого момента запросы запрещены (RetryAfter)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Когда можно будет отправить следующий запрос"""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until
+        if self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        """Израсходовать токен"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until: float):
+        """Запретить запросы до момента until"""
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = 0
+
+
+class _Request:
+    """Запрос в очереди и все вызовы, ждущие его результата"""
+
+    def __init__(self, priority: int, seq: int, chat_id, key: Optional[Tuple],
+                 callback: Callable[..., Coroutine], args: Any, kwargs: Dict[str, Any]):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.key = key
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.retries = 0
+        self.queued_at = time.monotonic()
+        self.waiters: List[asyncio.Future] = []
+
+    def order(self) -> Tuple[int, int]:
+        return self.priority, self.seq
+
+
+class _ChatQueue:
+    """Очередь и ведро токенов одного чата"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.requests: List[_Request] = []  # отсортированы по (приоритет, номер)
+        self.by_key: Dict[Tuple, _Request] = {}
+
+    def push(self, request: _Request):
+        self.requests.append(request)
+        self.requests.sort(key=_Request.order)
+        if request.key is not None:
+            self.by_key[request.key] = request
+
+    def pop(self) -> _Request:
+        request = self.requests.pop(0)
+        if request.key is not None and self.by_key.get(request.key) is request:
+            del self.by_key[request.key]
+        return request
+
+
+class SendScheduler(BaseRateLimiter):
+    """Rate limiter для Application: очереди по чатам, приоритеты, объединение"""
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 group_rate: float = 20 / 60, max_retries: int = 3, drain_timeout: float = 5.0,
+                 on_sent: Optional[Callable[[Any, int], None]] = None):
+        """
+        Args:
+            global_rate: запросов в секунду на весь бот
+            chat_rate: запросов в секунду в личный чат
+            chat_burst: сколько запросов в чат можно отправить подряд без ожидания
+            group_rate: запросов в секунду в группу
+            max_retries: сколько раз повторять запрос после RetryAfter
+            drain_timeout: сколько секунд при остановке ждать отправки очереди
+            on_sent: вызывается с (chat_id, message_id) для каждого сообщения из ответа Bot API
+        """
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.drain_timeout = drain_timeout
+        self.on_sent = on_sent
+
+        self._chats: Dict[Any, _ChatQueue] = {}  # только чаты с запросами в очереди или недавней отправкой
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+
+        # Метрики
+        self.sent = 0
+        self.dispatched = 0  # запусков запросов, включая повторы
+        self.bypassed = 0  # запросы без chat_id
+        self.coalesced = 0
+        self.retried = 0  # получено RetryAfter
+        self.failed = 0
+        self.max_queue = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    # ---------- BaseRateLimiter ----------
+
+    async def initialize(self):
+        """Запустить диспетчер (вызывается при инициализации бота)"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            print(f"✅ Планировщик отправки запущен "
+                  f"(всего {self.global_bucket.rate:g}/с, в чат {self.chat_rate:g}/с)")
+
+    async def shutdown(self):
+        """Дождаться отправки очереди и остановить диспетчер"""
+        if self._task is None:
+            return
+
+        deadline = time.monotonic() + self.drain_timeout
+        while (self.queued or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        for chat in self._chats.values():
+            for request in chat.requests:
+                self._fail(request, RuntimeError("Планировщик отправки остановлен"))
+        self._chats.clear()
+        print(f"✅ Планировщик отправки остановлен (отправлено: {self.sent})")
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        """Поставить запрос в очередь чата и дождаться результата"""
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            self.bypassed += 1
+            return await callback(*args, **kwargs)
+
+        if self._task is None or self._task.done():
+            await self.initialize()
+
+        options = rate_limit_args if isinstance(rate_limit_args, dict) else {}
+        priority = options.get("priority", PRIORITY_REPLY)
+        coalesce = options.get("coalesce")
+        key = (endpoint, coalesce) if coalesce is not None else None
+
+        future = asyncio.get_running_loop().create_future()
+        chat = self._get_chat(chat_id)
+
+        queued = chat.by_key.get(key) if key is not None else None
+        if queued is not None:
+            # Прежний запрос еще не отправлен: отправим только последний
+            queued.callback, queued.args, queued.kwargs = callback, args, kwargs
+            if priority < queued.priority:
+                queued.priority = priority
+                chat.requests.sort(key=_Request.order)
+            queued.waiters.append(future)
+            self.coalesced += 1
+        else:
+            request = _Request(priority, next(self._seq), chat_id, key, callback, args, kwargs)
+            request.waiters.append(future)
+            chat.push(request)
+            self.max_queue = max(self.max_queue, self.queued)
+
+        self._wakeup.set()
+        return await future
+
+    # ---------- Диспетчер ----------
+
+    def _get_chat(self, chat_id) -> _ChatQueue:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            # В группах (отрицательный id или @username канала) лимит строже
+            is_group = not isinstance(chat_id, int) or chat_id < 0
+            rate = self.group_rate if is_group else self.chat_rate
+            chat = _ChatQueue(TokenBucket(rate, self.chat_burst))
+            self._chats[chat_id] = chat
+        return chat
+
+    @property
+    def queued(self) -> int:
+        """Сколько запросов ждет отправки"""
+        return sum(len(chat.requests) for chat in self._chats.values())
+
+    def _next_request(self, now: float) -> Tuple[Optional[_ChatQueue], Optional[float]]:
+        """
+        Выбрать чат, запрос которого уходит следующим
+
+        Returns:
+            (чат или None, когда освободится ближайший чат - если готовых нет)
+        """
+        best = None
+        wake_at = None
+        for chat_id, chat in list(self._chats.items()):
+            if not chat.requests:
+                # Ведро полное - о чате можно забыть
+                if chat.bucket.ready_at(now) <= now and chat.bucket.tokens >= chat.bucket.burst:
+                    del self._chats[chat_id]
+                continue
+
+            ready_at = chat.bucket.ready_at(now)
+            if ready_at > now:
+                wake_at = ready_at if wake_at is None else min(wake_at, ready_at)
+            elif best is None or chat.requests[0].order() < best.requests[0].order():
+                best = chat
+        return best, wake_at
+
+    async def _run(self):
+        """Отправлять запросы, пока есть токены"""
+        while True:
+            now = time.monotonic()
+            chat, wake_at = self._next_request(now)
+
+            if chat is None:
+                timeout = None if wake_at is None else wake_at - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            global_ready = self.global_bucket.ready_at(now)
+            if global_ready > now:
+                await asyncio.sleep(global_ready - now)
+                continue  # за время ожидания мог прийти запрос важнее
+
+            chat.bucket.take(now)
+            self.global_bucket.take(now)
+            request = chat.pop()
+
+            waited = now - request.queued_at
+            self.dispatched += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+            self._in_flight += 1
+            asyncio.get_running_loop().create_task(self._execute(request))
+
+    async def _execute(self, request: _Request):
+        """Выполнить запрос и передать результат всем ожидающим"""
+        try:
+            result = await request.callback(*request.args, **request.kwargs)
+        except RetryAfter as e:
+            self.retried += 1
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") \
+                else float(e.retry_after)
+            print(f"⚠️ RetryAfter для чата {request.chat_id}: {retry_after}с")
+
+            if request.retries >= self.max_retries:
+                self.failed += 1
+                self._fail(request, e)
+                return
+
+            request.retries += 1
+            chat = self._get_chat(request.chat_id)
+            chat.bucket.block(time.monotonic() + retry_after)
+            if request.key is not None and request.key in chat.by_key:
+                # Пока запрос выполнялся, пришел более новый - он и будет отправлен
+                chat.by_key[request.key].waiters.extend(request.waiters)
+            else:
+                request.queued_at = time.monotonic()
+                chat.push(request)
+            self._wakeup.set()
+            return
+        except Exception as e:
+            self.failed += 1
+            self._fail(request, e)
+            return
+        finally:
+            self._in_flight -= 1
+
+        self.sent += 1
+        if self.on_sent is not None:
+            self._report_sent(result)
+        for future in request.waiters:
+            if not future.done():
+                future.set_result(result)
+
+    def _report_sent(self, result):
+        """Передать в on_sent сообщения из ответа (одно сообщение или альбом)"""
+        for message in result if isinstance(result, list) else (result,):
+            if isinstance(message, dict) and "message_id" in message and "chat" in message:
+                self.on_sent(message["chat"]["id"], message["message_id"])
+
+    @staticmethod
+    def _fail(request: _Request, error: BaseException):
+        for future in request.waiters:
+            if not future.done():
+                future.set_exception(error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика отправки"""
+        return {
+            "sent": self.sent,
+            "bypassed": self.bypassed,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "failed": self.failed,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "avg_wait": self.total_wait / self.dispatched if self.dispatched else 0.0,
+            "max_wait": self.max_wait,
+        }
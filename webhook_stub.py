@@ -0,0 +1,148 @@
+# webhook_stub.py
+"""
+Локальная проверка режима webhook без Telegram
+
+1. Фейковый Bot API (отвечает на запросы бота и считает их):
+       python webhook_stub.py api 8081
+2. Бот в режиме webhook, направленный на фейковый API:
+       BOT_MODE=webhook BOT_API_URL=http://127.0.0.1:8081/bot python main.py
+3. Отправка обновлений, как их присылает Telegram:
+       python webhook_stub.py post http://127.0.0.1:8443/telegram 200 [секрет]
+
+Отправляются сообщения /help и /start от разных пользователей и нажатия кнопки
+"Игроки" вне игры - обработчики, которым не нужна игра.
+"""
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ========== ФЕЙКОВЫЙ BOT API ==========
+
+class FakeBotAPIHandler(BaseHTTPRequestHandler):
+    """Отвечает на любой метод Bot API успешным результатом"""
+
+    calls = Counter()
+    lock = threading.Lock()
+    message_id = 0
+
+    def do_POST(self):
+        method = self.path.rsplit("/", 1)[-1]
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8", "replace")
+        with self.lock:
+            self.calls[method] += 1
+            FakeBotAPIHandler.message_id += 1
+            message_id = FakeBotAPIHandler.message_id
+
+        params = {}
+        if "application/json" in self.headers.get("Content-Type", ""):
+            params = json.loads(body or "{}")
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "GUAPoly", "username": "guapoly_bot"}
+        elif method.startswith("send") or method.startswith("edit"):
+            result = {"message_id": message_id, "date": int(time.time()),
+                      "chat": {"id": int(params.get("chat_id", 1)), "type": "private"}, "text": ""}
+        else:
+            result = True
+
+        payload = json.dumps({"ok": True, "result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_fake_api(port: int):
+    """Запустить фейковый Bot API и раз в 5 секунд печатать счетчики методов"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeBotAPIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🤖 Фейковый Bot API: http://127.0.0.1:{port}/bot")
+
+    try:
+        while True:
+            time.sleep(5)
+            with FakeBotAPIHandler.lock:
+                if FakeBotAPIHandler.calls:
+                    print("📨 " + ", ".join(f"{method}: {count}"
+                                           for method, count in sorted(FakeBotAPIHandler.calls.items())))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+# ========== ОТПРАВКА ОБНОВЛЕНИЙ ==========
+
+def make_update(update_id: int) -> dict:
+    """Обновление Telegram: сообщение с командой или нажатие кнопки"""
+    user_id = 100000 + update_id % 50
+    user = {"id": user_id, "is_bot": False, "first_name": f"Игрок {user_id}"}
+    chat = {"id": user_id, "type": "private"}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": user}
+
+    if update_id % 3 == 2:
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": "stub", "data": "game_players",
+            "message": dict(message, text="меню", **{"from": {"id": 1, "is_bot": True, "first_name": "GUAPoly"}})}}
+
+    command = "/help" if update_id % 3 else "/start"
+    message.update(text=command, entities=[{"type": "bot_command", "offset": 0, "length": len(command)}])
+    return {"update_id": update_id, "message": message}
+
+
+def post_update(url: str, update: dict, secret: str):
+    """POST обновления, как это делает Telegram: (HTTP-статус, время в секундах)"""
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+
+    request = urllib.request.Request(url, data=json.dumps(update).encode("utf-8"), headers=headers)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def run_post(url: str, count: int, secret: str = ""):
+    """Отправить count обновлений в 20 потоков и напечатать статистику"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(lambda i: post_update(url, make_update(i), secret), range(1, count + 1)))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(latency for _, latency in results)
+    print(f"📬 Отправлено обновлений: {count} за {elapsed:.2f} с ({count / elapsed:.0f}/с)")
+    print("   Ответы: " + ", ".join(f"{status or 'нет соединения'}: {n}" for status, n in sorted(statuses.items())))
+    print(f"   Задержка: медиана {latencies[len(latencies) // 2] * 1000:.1f} мс, "
+          f"95% {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} мс")
+
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "api":
+        run_fake_api(int(sys.argv[2]))
+    elif len(sys.argv) >= 3 and sys.argv[1] == "post":
+        count = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        secret = sys.argv[4] if len(sys.argv) > 4 else ""
+        run_post(sys.argv[2], count, secret)
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()